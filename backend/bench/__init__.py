@@ -0,0 +1,20 @@
+"""
+Benchmarks and regression checks for the backend.
+
+They are kept out of the production modules and are run from backend/ as
+modules, e.g. `python -m bench.html_parser`:
+
+- bench.code_deltas: request bytes for full code and code deltas in the VAPI webhook
+- bench.html_parser: LeetCode problem parser, old regex parser vs single pass,
+  and the checked-in fixture corpus (`python -m bench.html_parser check`)
+- bench.problem_loader: problem loading and random picks as the pool grows to
+  50,000 problems, in a scratch database like bench.transcript_storage
+- bench.prompt_tokens: rating prompt tokens with and without transcript compaction
+- bench.responses: serialization time and compressed size of a transcript response
+- bench.scraper: async LeetCode scraper against fake_leetcode.py (concurrency,
+  429/5xx retries, batch fallback to one query per slug)
+- bench.transcript_storage: JSON blob vs segment storage of transcripts, in a
+  scratch database (`--db PATH` to choose the file)
+- bench.vapi_load: simulated concurrent calls through the VAPI event pipeline, in
+  a scratch database like bench.transcript_storage
+"""
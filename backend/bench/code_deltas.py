@@ -0,0 +1,48 @@
+"""
+Benchmark of the VAPI webhook code context: full code vs deltas (code_state.py).
+
+    python -m bench.code_deltas [updates]
+"""
+
+import json
+import sys
+
+import code_state
+
+
+def run_benchmark(updates: int = 200):
+    """Compare request bytes for full-code updates and edit deltas while a solution is typed."""
+    solution = (
+        "def twoSum(nums, target):\n"
+        "    seen = {}\n"
+        "    for index, value in enumerate(nums):\n"
+        "        complement = target - value\n"
+        "        if complement in seen:\n"
+        "            return [seen[complement], index]\n"
+        "        seen[value] = index\n"
+        "    return []\n"
+    ) * 4
+    
+    store = code_state.CodeStateStore()
+    store.snapshot("bench", "")
+    full_bytes = delta_bytes = 0
+    step = max(1, len(solution) // updates)
+    
+    for typed in range(step, len(solution) + step, step):
+        before, after = solution[:typed - step], solution[:typed]
+        full_bytes += len(json.dumps({"transcript": "...", "call_id": "bench", "code_context": {"code": after}}))
+        
+        edits = [{"offset": len(before), "delete": 0, "insert": after[len(before):]}]
+        version = store.get("bench").version
+        delta_bytes += len(json.dumps({"transcript": "...", "call_id": "bench",
+                                       "code_delta": {"base_version": version, "edits": edits}}))
+        store.apply_delta("bench", version, edits=edits)
+    
+    assert store.get("bench").code == solution
+    print(f"⌨️  {len(range(step, len(solution) + step, step))} updates while typing {len(solution):,} characters")
+    print(f"   full code    {full_bytes:>10,} bytes")
+    print(f"   deltas       {delta_bytes:>10,} bytes ({full_bytes / delta_bytes:.1f}x less)")
+
+
+if __name__ == "__main__":
+    run_benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else 200)
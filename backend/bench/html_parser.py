@@ -0,0 +1,148 @@
+"""
+Benchmark and regression check for parse_problem_content in leetcode_scraper.py.
+
+    python -m bench.html_parser [file.html ...]    compare with the previous regex parser
+    python -m bench.html_parser check              compare with the expected fixture output
+
+Without files, the benchmark uses the LeetCode problems saved in the database,
+or the fixture corpus in bench/fixtures/leetcode when there are none. Each
+fixture NAME.html has its expected parse_problem_content output in NAME.json.
+"""
+
+import json
+import re
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, List
+
+from leetcode_scraper import clean_html, parse_problem_content
+
+FIXTURES_DIR = Path(__file__).parent / "fixtures" / "leetcode"
+
+
+def _parse_problem_content_regex(html_content: str) -> Dict[str, Any]:
+    """
+    Previous regex-based parser, kept as the baseline for the benchmark.
+    
+    It rescans each example once per field and stops the constraints at the
+    first closing </p>, so it misses constraints in LeetCode's usual
+    <p><strong>Constraints:</strong></p><ul>...</ul> layout.
+    """
+    details = {
+        "examples": [],
+        "constraints": []
+    }
+    
+    example_pattern = r'<strong[^>]*>Example\s+\d+:?</strong>(.*?)(?=<strong[^>]*>Example\s+\d+:?</strong>|<strong[^>]*>Constraints:?</strong>|$)'
+    example_matches = re.finditer(example_pattern, html_content, re.DOTALL | re.IGNORECASE)
+    
+    for match in example_matches:
+        example_text = match.group(1)
+        
+        input_match = re.search(r'<strong>Input:?</strong>\s*(.*?)(?=<strong>|$)', example_text, re.DOTALL)
+        output_match = re.search(r'<strong>Output:?</strong>\s*(.*?)(?=<strong>|$)', example_text, re.DOTALL)
+        explanation_match = re.search(r'<strong>Explanation:?</strong>\s*(.*?)(?=<strong>|$)', example_text, re.DOTALL)
+        
+        details["examples"].append({
+            "input": clean_html(input_match.group(1)) if input_match else "",
+            "output": clean_html(output_match.group(1)) if output_match else "",
+            "explanation": clean_html(explanation_match.group(1)) if explanation_match else ""
+        })
+    
+    constraints_pattern = r'<strong[^>]*>Constraints:?</strong>(.*?)(?=</?(?:p|div|strong)>|$)'
+    constraints_match = re.search(constraints_pattern, html_content, re.DOTALL | re.IGNORECASE)
+    
+    if constraints_match:
+        constraints_text = constraints_match.group(1)
+        constraint_items = re.findall(r'<li>(.*?)</li>', constraints_text, re.DOTALL)
+        
+        if not constraint_items:
+            constraint_items = [line.strip() for line in constraints_text.split('\n') if line.strip()]
+        
+        details["constraints"] = [clean_html(item) for item in constraint_items if clean_html(item)]
+    
+    return details
+
+
+def _fixture_corpus() -> Dict[str, str]:
+    """HTML of the checked-in fixtures by file name."""
+    return {path.name: path.read_text(encoding="utf-8") for path in sorted(FIXTURES_DIR.glob("*.html"))}
+
+
+def run_parser_benchmark(paths: List[str], rounds: int = 200):
+    """
+    Compare the regex and single-pass parsers on saved LeetCode HTML.
+    
+    Args:
+        paths: HTML files to use; when empty, the descriptions of the LeetCode
+            problems saved in the local database, or the fixtures if there are none
+        rounds: Times each document is parsed per parser
+    """
+    if paths:
+        corpus = {path: Path(path).read_text(encoding="utf-8") for path in paths}
+    else:
+        import database
+        corpus = {
+            problem["leetcode_slug"]: problem["description"]
+            for problem in database.get_all_problems()
+            if problem["source"] == "leetcode"
+        } or _fixture_corpus()
+    
+    if not corpus:
+        print("❌ No LeetCode HTML to benchmark - pass .html files or scrape some problems first")
+        return
+    
+    total_bytes = sum(len(content.encode("utf-8")) for content in corpus.values())
+    print(f"📚 Corpus: {len(corpus)} documents, {total_bytes / 1024:.1f} KiB, {rounds} rounds")
+    
+    for label, parser in (("regex (old)", _parse_problem_content_regex), ("single-pass", parse_problem_content)):
+        start = time.perf_counter()
+        for _ in range(rounds):
+            for content in corpus.values():
+                parser(content)
+        elapsed = time.perf_counter() - start
+        parsed = len(corpus) * rounds
+        print(f"   {label:<12} {elapsed * 1000 / parsed:8.3f} ms/doc  "
+              f"{total_bytes * rounds / elapsed / 1024 / 1024:7.2f} MiB/s")
+    
+    for name, content in corpus.items():
+        old, new = _parse_problem_content_regex(content), parse_problem_content(content)
+        notes = []
+        if old["examples"] != new["examples"]:
+            notes.append(f"examples {len(old['examples'])} -> {len(new['examples'])} (content differs)")
+        if old["constraints"] != new["constraints"]:
+            notes.append(f"constraints {len(old['constraints'])} -> {len(new['constraints'])}")
+        print(f"   {'✅' if not notes else '🔀'} {name}: {'; '.join(notes) or 'same examples and constraints'}")
+
+
+def check_fixtures() -> bool:
+    """
+    Parse every fixture and compare with its expected output.
+    
+    Returns:
+        True if all fixtures match
+    """
+    corpus = _fixture_corpus()
+    mismatched = 0
+    for name, content in corpus.items():
+        expected = json.loads((FIXTURES_DIR / name).with_suffix(".json").read_text(encoding="utf-8"))
+        actual = parse_problem_content(content)
+        differing = [key for key in expected if actual.get(key) != expected[key]]
+        if differing:
+            mismatched += 1
+            print(f"   ❌ {name}: {', '.join(differing)} differ")
+            for key in differing:
+                print(f"      expected {key}: {json.dumps(expected[key])}")
+                print(f"      actual   {key}: {json.dumps(actual.get(key))}")
+        else:
+            print(f"   ✅ {name}")
+    
+    print(f"📋 {len(corpus) - mismatched}/{len(corpus)} fixtures match")
+    return mismatched == 0
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "check":
+        sys.exit(0 if check_fixtures() else 1)
+    run_parser_benchmark(sys.argv[1:])
@@ -0,0 +1,123 @@
+"""
+Benchmark of problem loading as the problem pool grows (database.py).
+
+    python -m bench.problem_loader [sizes ...] [--db PATH]
+
+Seeds problems (2 starter code snippets and 2 tags each) into a scratch
+database, a temporary file by default, growing the pool to each size in turn
+(10, 1,000, 10,000 and 50,000 by default), and times get_all_problems,
+get_problem_by_id (with and without the problem cache) and
+pick_random_problem_id. Like bench.transcript_storage, it sets DATABASE_URL
+before importing database, so it must run in its own process and a --db file
+must not exist.
+"""
+
+import argparse
+import io
+import os
+import random
+import sys
+import tempfile
+import time
+from contextlib import redirect_stdout
+from pathlib import Path
+from typing import Callable, List
+
+DEFAULT_SIZES = [10, 1000, 10000, 50000]
+
+_DIFFICULTIES = ["Easy", "Medium", "Hard"]
+_TAGS = ["Array", "Hash Table", "String", "Dynamic Programming", "Math", "Sorting", "Greedy", "Tree"]
+
+
+def _sample_problem(index: int) -> dict:
+    """A LeetCode-like problem with 2 starter code snippets and 2 tags."""
+    return {
+        "title": f"Problem {index}",
+        "description": f"<p>Given an array of integers <code>nums</code>, solve problem {index}.</p>" * 4,
+        "difficulty": _DIFFICULTIES[index % len(_DIFFICULTIES)],
+        "details": {
+            "examples": [{"input": "nums = [2,7,11,15]", "output": "[0,1]", "explanation": ""}],
+            "constraints": ["2 <= nums.length <= 10^4"]
+        },
+        "source": "leetcode",
+        "leetcode_slug": f"problem-{index}",
+        "starter_codes": {
+            "python": f"class Solution:\n    def solve{index}(self, nums):\n        pass\n",
+            "java": f"class Solution {{\n    public int[] solve{index}(int[] nums) {{\n    }}\n}}\n"
+        },
+        "tags": [_TAGS[index % len(_TAGS)], _TAGS[(index * 3 + 1) % len(_TAGS)]]
+    }
+
+
+def run_problem_loader_benchmark(db_path: Path, sizes: List[int], lookups: int = 200):
+    """
+    Time problem loading at each pool size.
+    
+    Args:
+        db_path: Scratch database file to create
+        sizes: Pool sizes to measure, in increasing order
+        lookups: Single-problem lookups and random picks timed per size
+    """
+    if "database" in sys.modules:
+        raise RuntimeError("database was imported before the benchmark could set its path")
+    os.environ["DATABASE_URL"] = str(db_path)
+    with redirect_stdout(io.StringIO()):
+        import database
+    
+    def timed(fn: Callable[[], object], calls: int, passes: int = 1) -> float:
+        """Milliseconds per call, best of the given number of passes."""
+        best = float("inf")
+        for _ in range(passes):
+            start = time.perf_counter()
+            for _ in range(calls):
+                fn()
+            best = min(best, time.perf_counter() - start)
+        return best * 1000 / calls
+    
+    def clear_problem_cache():
+        with database._problem_cache_lock:
+            database._problem_cache.clear()
+    
+    print(f"📚 Problem pool in {db_path} (2 snippets and 2 tags per problem, {lookups} lookups per size)")
+    print(f"   {'problems':>8}  {'get_all_problems':>16}  {'get_problem cold':>16}  {'get_problem warm':>16}  {'random pick':>11}")
+    try:
+        seeded = 0
+        for size in sizes:
+            with redirect_stdout(io.StringIO()):
+                while seeded < size:
+                    chunk = min(size - seeded, 5000)
+                    database.save_problems([_sample_problem(seeded + i) for i in range(chunk)])
+                    seeded += chunk
+            
+            ids = [problem["id"] for problem in database.get_all_problems()]
+            sample_ids = [random.choice(ids) for _ in range(lookups)]
+            all_ms = timed(database.get_all_problems, 1, passes=3)
+            
+            def cold_lookup(problem_ids=iter(sample_ids)):
+                clear_problem_cache()
+                database.get_problem_by_id(next(problem_ids))
+            cold_ms = timed(cold_lookup, lookups)
+            
+            warm_ids = iter(sample_ids * 3)
+            warm_ms = timed(lambda: database.get_problem_by_id(next(warm_ids)), lookups, passes=3)
+            pick_ms = timed(lambda: database.pick_random_problem_id(difficulty="Medium"), lookups, passes=3)
+            
+            print(f"   {len(ids):>8,}  {all_ms:>13.2f} ms  {cold_ms:>13.3f} ms  {warm_ms:>13.3f} ms  {pick_ms:>8.3f} ms")
+    finally:
+        database.close_all_connections()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Time problem loading as the problem pool grows")
+    parser.add_argument("sizes", type=int, nargs="*", default=DEFAULT_SIZES)
+    parser.add_argument("--db", type=Path, help="scratch database file to create (default: a temporary file)")
+    args = parser.parse_args()
+    sizes = sorted(args.sizes)
+    
+    if args.db is not None:
+        if args.db.exists():
+            sys.exit(f"❌ {args.db} already exists - the benchmark needs a new, scratch database")
+        run_problem_loader_benchmark(args.db, sizes)
+    else:
+        with tempfile.TemporaryDirectory() as directory:
+            run_problem_loader_benchmark(Path(directory) / "problems.db", sizes)
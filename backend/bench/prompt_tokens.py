@@ -0,0 +1,107 @@
+"""
+Report on rating prompt size with and without transcript compaction (transcript_compaction.py).
+
+    python -m bench.prompt_tokens [limit]
+
+Uses up to limit transcripts stored in the database, or a synthetic
+speech-to-text corpus when there are none. Model latency is estimated with the
+fake model's GEMINI_FAKE_LATENCY* settings.
+"""
+
+import random
+import statistics
+import sys
+import time
+from typing import Dict, List
+
+import database
+from fake_gemini import FakeGeminiClient
+from gemini_rating_service import GEMINI_TRANSCRIPT_TOKEN_BUDGET, GeminiRatingService
+from transcript_compaction import estimate_tokens
+
+
+def synthetic_stt_transcript(minutes: int, seed: int) -> List[Dict]:
+    """A transcript split into fragments the way speech-to-text stores it, with fillers and partials."""
+    rng = random.Random(seed)
+    sentences = [
+        "Okay so I think I would start by using a hash map to store the values I have already seen",
+        "That sounds reasonable what would the time complexity of that approach be",
+        "It should be O of n time since we only pass over the array once and O of n space for the map",
+        "Good can you walk me through what happens with duplicate values in the input",
+        "Right so if the same number appears twice I would overwrite the index which is fine here",
+        "Let's also think about edge cases what if the array is empty or has a single element",
+    ]
+    segments = [{"type": "call-start", "timestamp": "", "secondsSinceStart": 0}]
+    seconds = 0.0
+    turn = 0
+    while seconds < minutes * 60:
+        role = "user" if turn % 2 == 0 else "assistant"
+        words = sentences[turn % len(sentences)].split()
+        position = 0
+        while position < len(words):
+            if rng.random() < 0.15:
+                seconds += 0.8
+                segments.append({"type": "transcript", "role": role, "text": rng.choice(["Um.", "Uh,", "Hmm.", "Uh huh."]),
+                                 "timestamp": "", "secondsSinceStart": round(seconds, 1)})
+            size = rng.randint(3, 7)
+            fragment = " ".join(words[position:position + size])
+            if rng.random() < 0.2:
+                # A partial stored ahead of its final
+                seconds += 0.5
+                segments.append({"type": "transcript", "role": role, "text": " ".join(fragment.split()[:2]),
+                                 "timestamp": "", "secondsSinceStart": round(seconds, 1)})
+            seconds += 1.5
+            segments.append({"type": "transcript", "role": role, "text": fragment + ("." if position + size >= len(words) else ""),
+                             "timestamp": "", "secondsSinceStart": round(seconds, 1)})
+            position += size
+        turn += 1
+    segments.append({"type": "call-end", "timestamp": "", "secondsSinceStart": seconds})
+    return segments
+
+
+def run_report(limit: int = 200):
+    """Compare rating prompt tokens and estimated model latency with and without compaction."""
+    corpus = []
+    for transcript in database.iter_transcripts():
+        if transcript["transcript"]:
+            corpus.append((transcript["transcript"], transcript["metadata"]))
+        if len(corpus) >= limit:
+            break
+    source = "stored transcripts"
+    if not corpus:
+        corpus = [(synthetic_stt_transcript(minutes, seed), {"problemTitle": "Two Sum"})
+                  for seed, minutes in enumerate([10, 20, 30, 45, 60, 90] * 5)]
+        source = "synthetic speech-to-text transcripts (none stored)"
+    
+    client = FakeGeminiClient()
+    services = {
+        "uncompacted": GeminiRatingService(client=client, compact=False, token_budget=0),
+        "no budget": GeminiRatingService(client=client, token_budget=0),
+        "compacted": GeminiRatingService(client=client)
+    }
+    
+    results = {}
+    for name, service in services.items():
+        tokens, latencies, format_times = [], [], []
+        for segments, metadata in corpus:
+            started = time.perf_counter()
+            prompt = service.build_rating_prompt(segments, metadata)
+            format_times.append(time.perf_counter() - started)
+            tokens.append(estimate_tokens(prompt))
+            latencies.append(client.latency_for(prompt))
+        results[name] = (tokens, latencies, format_times)
+    
+    print(f"📉 Rating prompts for {len(corpus)} {source}")
+    print(f"   token budget {GEMINI_TRANSCRIPT_TOKEN_BUDGET:,}, model latency {client.latency}s "
+          f"+ {client.latency_per_1k_chars}s per 1,000 prompt chars (GEMINI_FAKE_LATENCY*)")
+    for name, (tokens, latencies, format_times) in results.items():
+        print(f"   {name:12s} tokens median {statistics.median(tokens):>7,.0f}, max {max(tokens):>7,}, "
+              f"total {sum(tokens):>9,}; est. latency median {statistics.median(latencies) * 1000:>6.0f} ms; "
+              f"prompt built in {statistics.median(format_times) * 1000:.2f} ms")
+    before = sum(results["uncompacted"][0])
+    print(f"   input tokens reduced by {(1 - sum(results['no budget'][0]) / before) * 100:.1f}% by compaction alone, "
+          f"{(1 - sum(results['compacted'][0]) / before) * 100:.1f}% within the budget")
+
+
+if __name__ == "__main__":
+    run_report(int(sys.argv[1]) if len(sys.argv) > 1 else 200)
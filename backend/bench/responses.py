@@ -0,0 +1,96 @@
+"""
+Benchmark of transcript responses: serialization time and bytes on the wire.
+
+    python -m bench.responses [minutes]
+
+Compares the stdlib and orjson encoders (fast_json.py) and the gzip and brotli
+settings of the compression middleware on one /api/transcript/{id} response.
+"""
+
+import gzip
+import sys
+import time
+from datetime import datetime, timedelta
+
+from fastapi.responses import JSONResponse
+
+from compression import BROTLI_AVAILABLE
+from fast_json import ORJSON_AVAILABLE, FastJSONResponse
+
+if BROTLI_AVAILABLE:
+    import brotli
+
+
+def sample_transcript_response(minutes: int) -> dict:
+    """A /api/transcript/{id} response for an interview of the given length."""
+    started = datetime(2025, 10, 4, 14, 0, 0)
+    lines = [
+        "Okay, so I think I would start by using a hash map to store the values I've already seen.",
+        "That sounds reasonable. What would the time complexity of that approach be?",
+        "It should be O(n) time since we only pass over the array once, and O(n) space for the map.",
+        "Good. Can you walk me through what happens with duplicate values in the input?",
+        "Right, so if the same number appears twice I would overwrite the index, which is fine here.",
+        "Let's also think about edge cases. What if the array is empty or has a single element?",
+    ]
+    
+    segments = [{"type": "call-start", "timestamp": started.isoformat() + "Z", "secondsSinceStart": 0}]
+    seconds = 0.0
+    index = 0
+    while seconds < minutes * 60:
+        seconds += 6.5
+        segments.append({
+            "type": "transcript",
+            "role": "user" if index % 2 == 0 else "assistant",
+            "text": lines[index % len(lines)],
+            "timestamp": (started + timedelta(seconds=seconds)).isoformat() + "Z",
+            "secondsSinceStart": round(seconds, 3)
+        })
+        index += 1
+    segments.append({"type": "call-end", "timestamp": (started + timedelta(seconds=seconds)).isoformat() + "Z", "secondsSinceStart": seconds})
+    
+    return {
+        "id": 1,
+        "transcript": segments,
+        "call_duration": seconds,
+        "user_messages": (index + 1) // 2,
+        "assistant_messages": index // 2,
+        "metadata": {"problem": "Two Sum", "duration": seconds},
+        "ratings": None,
+        "rated_at": None,
+        "created_at": started.isoformat(),
+        "rating_status": "pending"
+    }
+
+
+def run_benchmark(minutes: int = 30, rounds: int = 50):
+    """Compare serialization time and compressed size for one transcript response."""
+    content = sample_transcript_response(minutes)
+    print(f"📼 {minutes}-minute transcript: {len(content['transcript'])} segments, {rounds} rounds")
+    
+    def timed(fn) -> float:
+        start = time.perf_counter()
+        for _ in range(rounds):
+            fn()
+        return (time.perf_counter() - start) * 1000 / rounds
+    
+    body = JSONResponse(content).body
+    print(f"   JSON (stdlib)    {timed(lambda: JSONResponse(content).body):7.2f} ms   {len(body):>9,} bytes")
+    if ORJSON_AVAILABLE:
+        print(f"   JSON (orjson)    {timed(lambda: FastJSONResponse(content).body):7.2f} ms   {len(FastJSONResponse(content).body):>9,} bytes")
+    else:
+        print("   JSON (orjson)    not installed")
+    
+    for level in (1, 6, 9):
+        compressed = gzip.compress(body, level)
+        print(f"   gzip -{level}          {timed(lambda: gzip.compress(body, level)):7.2f} ms   {len(compressed):>9,} bytes ({len(body) / len(compressed):.1f}x)")
+    
+    if BROTLI_AVAILABLE:
+        for quality in (4, 11):
+            compressed = brotli.compress(body, quality=quality)
+            print(f"   brotli q{quality:<2}       {timed(lambda: brotli.compress(body, quality=quality)):7.2f} ms   {len(compressed):>9,} bytes ({len(body) / len(compressed):.1f}x)")
+    else:
+        print("   brotli           not installed")
+
+
+if __name__ == "__main__":
+    run_benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else 30)
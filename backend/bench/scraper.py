@@ -0,0 +1,147 @@
+"""
+Checks of the async LeetCode scraper against the fake GraphQL server (fake_leetcode.py).
+
+    python -m bench.scraper [concurrent_scrapes]
+
+Starts the fake server on a free local port, points LEETCODE_GRAPHQL_URL at it
+before leetcode_scraper is imported (so this must run in its own process) and
+checks:
+
+- concurrent scrapes share the keep-alive client and overlap
+- 429 and 5xx responses are retried up to LEETCODE_MAX_ATTEMPTS, a missing
+  problem is not retried
+- a batch whose response leaves questions out, or whose request fails, falls
+  back to one query per missing slug
+
+The rate limiter is off unless LEETCODE_REQUESTS_PER_SECOND is set. Exits
+with status 1 if a check fails.
+"""
+
+import asyncio
+import os
+import socket
+import sys
+import threading
+import time
+from typing import List
+
+import uvicorn
+
+from fake_leetcode import FakeLeetCodeServer
+
+
+def _start_server(server: FakeLeetCodeServer) -> str:
+    """Serve the fake API from a background thread and return its GraphQL URL."""
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        port = probe.getsockname()[1]
+    uvicorn_server = uvicorn.Server(uvicorn.Config(server.app, host="127.0.0.1", port=port, log_level="warning"))
+    threading.Thread(target=uvicorn_server.run, name="fake-leetcode", daemon=True).start()
+    deadline = time.monotonic() + 10
+    while not uvicorn_server.started:
+        if time.monotonic() > deadline:
+            raise RuntimeError("Fake LeetCode server did not start")
+        time.sleep(0.01)
+    return f"http://127.0.0.1:{port}/graphql"
+
+
+async def run_checks(server: FakeLeetCodeServer, concurrent_scrapes: int = 20) -> bool:
+    """
+    Run the scraper scenarios against the fake server.
+    
+    Returns:
+        True if every check passed
+    """
+    import leetcode_scraper
+    
+    failures: List[str] = []
+    
+    def check(name: str, passed: bool, detail: str = ""):
+        print(f"   {'✅' if passed else '❌'} {name}{f' ({detail})' if detail else ''}")
+        if not passed:
+            failures.append(name)
+    
+    attempts = leetcode_scraper.LEETCODE_MAX_ATTEMPTS
+    
+    # Concurrent single scrapes
+    server.reset()
+    slugs = [f"problem-{i}" for i in range(concurrent_scrapes)]
+    started = time.perf_counter()
+    results = await asyncio.gather(
+        *(leetcode_scraper.scrape_leetcode_problem_async(slug) for slug in slugs),
+        return_exceptions=True
+    )
+    elapsed = time.perf_counter() - started
+    stats = server.stats()
+    print(f"🔀 {concurrent_scrapes} concurrent scrapes, {server.latency * 1000:.0f} ms per request")
+    check("all scraped", all(isinstance(result, dict) and result["leetcode_slug"] == slug for slug, result in zip(slugs, results)))
+    check("requests overlap", stats["max_in_flight"] > 1,
+          f"max {stats['max_in_flight']} in flight, LEETCODE_MAX_CONNECTIONS={leetcode_scraper.LEETCODE_MAX_CONNECTIONS}")
+    check("faster than one at a time", elapsed < concurrent_scrapes * server.latency,
+          f"{elapsed:.2f}s vs {concurrent_scrapes * server.latency:.2f}s sequential")
+    check("examples and constraints parsed", isinstance(results[0], dict)
+          and len(results[0]["details"]["examples"]) == 1 and len(results[0]["details"]["constraints"]) == 2)
+    
+    # Retries
+    print(f"🔁 Retries (LEETCODE_MAX_ATTEMPTS={attempts})")
+    for slug, expected_requests, should_succeed in (
+        ("throttled-1-a", 2, True),
+        (f"broken-{attempts - 1}-b", attempts, True),
+        (f"throttled-{attempts}-c", attempts, False),
+        ("missing-d", 1, False)
+    ):
+        server.reset()
+        try:
+            await leetcode_scraper.scrape_leetcode_problem_async(slug)
+            succeeded = True
+        except Exception:
+            succeeded = False
+        requests = server.requests_for(slug)
+        check(f"{slug} {'succeeds' if should_succeed else 'fails'} after {expected_requests} requests",
+              succeeded == should_succeed and requests == expected_requests,
+              f"{'succeeded' if succeeded else 'failed'} after {requests}")
+    
+    # Batched queries with per-slug fallback
+    print("📦 Batch queries")
+    server.reset()
+    batch = ["batch-1", "batch-2", "partial-x", "missing-y"]
+    results = {slug: (problem, error) async for slug, problem, error in
+               leetcode_scraper.scrape_leetcode_problems_batch_async(batch, chunk_size=len(batch))}
+    stats = server.stats()
+    check("partial response falls back for the missing questions only",
+          stats["batch_requests"] == 1 and stats["single_requests"] == 2,
+          f"{stats['batch_requests']} batch + {stats['single_requests']} single requests")
+    check("found questions are returned, the missing one has an error",
+          all(results[slug][0] for slug in ("batch-1", "batch-2", "partial-x")) and results["missing-y"][1] is not None)
+    
+    server.reset()
+    batch = ["batch-3", "nobatch-z", "batch-4"]
+    results = {slug: (problem, error) async for slug, problem, error in
+               leetcode_scraper.scrape_leetcode_problems_batch_async(batch, chunk_size=len(batch))}
+    stats = server.stats()
+    check("failed batch request is retried, then every slug is fetched alone",
+          stats["batch_requests"] == attempts and stats["single_requests"] == len(batch),
+          f"{stats['batch_requests']} batch + {stats['single_requests']} single requests")
+    check("all questions returned after the fallback", all(results[slug][0] for slug in batch))
+    
+    server.reset()
+    slugs = [f"chunked-{i}" for i in range(10)]
+    results = {slug: problem async for slug, problem, _ in
+               leetcode_scraper.scrape_leetcode_problems_batch_async(slugs, chunk_size=4, concurrency=3)}
+    stats = server.stats()
+    check("10 slugs in chunks of 4 cost 3 requests", stats["requests"] == 3 and all(results.values()),
+          f"{stats['requests']} requests, max {stats['max_in_flight']} in flight")
+    
+    await leetcode_scraper.close_http_client()
+    print(f"📋 {'All checks passed' if not failures else f'{len(failures)} checks failed'}")
+    return not failures
+
+
+if __name__ == "__main__":
+    if "leetcode_scraper" in sys.modules:
+        raise RuntimeError("leetcode_scraper was imported before its URL could be set")
+    fake_server = FakeLeetCodeServer()
+    os.environ["LEETCODE_GRAPHQL_URL"] = _start_server(fake_server)
+    os.environ.setdefault("LEETCODE_REQUESTS_PER_SECOND", "0")
+    passed = asyncio.run(run_checks(fake_server, int(sys.argv[1]) if len(sys.argv) > 1 else 20))
+    sys.exit(0 if passed else 1)
@@ -0,0 +1,115 @@
+"""
+Benchmark of transcript storage: the former JSON blob vs transcript_segments.
+
+    python -m bench.transcript_storage [minutes] [transcripts] [--db PATH]
+
+Writes and reads sample transcripts in a scratch database, a temporary file by
+default. The database module reads its path from DATABASE_URL when it is first
+imported, so this script sets it before importing database and must run in its
+own process. A --db file must not exist yet, so a real database is never used.
+"""
+
+import argparse
+import io
+import json
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+from contextlib import redirect_stdout
+from pathlib import Path
+
+from bench.responses import sample_transcript_response
+
+
+def run_transcript_storage_benchmark(db_path: Path, minutes: int = 30, transcripts: int = 200):
+    """
+    Compare the JSON-blob transcript storage with transcript_segments.
+    
+    Args:
+        db_path: Scratch database file to create
+        minutes: Length of each sample interview
+        transcripts: Number of transcripts written and read
+    """
+    if "database" in sys.modules:
+        raise RuntimeError("database was imported before the benchmark could set its path")
+    os.environ["DATABASE_URL"] = str(db_path)
+    with redirect_stdout(io.StringIO()):
+        import database
+    
+    sample = sample_transcript_response(minutes)["transcript"]
+    
+    def timed(fn, passes: int = 1) -> float:
+        """Milliseconds per transcript, best of the given number of passes."""
+        best = float("inf")
+        for _ in range(passes):
+            start = time.perf_counter()
+            fn()
+            best = min(best, time.perf_counter() - start)
+        return best * 1000 / transcripts
+    
+    try:
+        with database.get_connection() as conn:
+            conn.execute("CREATE TABLE legacy_transcripts (id INTEGER PRIMARY KEY, transcript_data TEXT NOT NULL)")
+        
+        def write_blobs():
+            for _ in range(transcripts):
+                with database.get_connection() as conn:
+                    conn.execute("INSERT INTO legacy_transcripts (transcript_data) VALUES (?)", (json.dumps(sample),))
+        
+        def read_blobs():
+            for transcript_id in range(1, transcripts + 1):
+                with database.get_connection() as conn:
+                    row = conn.execute("SELECT transcript_data FROM legacy_transcripts WHERE id = ?", (transcript_id,)).fetchone()
+                json.loads(row[0])
+        
+        def write_segments():
+            with redirect_stdout(io.StringIO()):
+                for _ in range(transcripts):
+                    database.save_transcript(sample, sample[-1]["secondsSinceStart"], 0, 0)
+        
+        ids = range(1, transcripts + 1)
+        print(f"📼 {transcripts} transcripts of {minutes} minutes ({len(sample)} segments each) in {db_path}")
+        blob_write = timed(write_blobs)
+        blob_read = timed(read_blobs, passes=3)
+        segment_write = timed(write_segments)
+        segment_read = timed(lambda: [database.get_transcript(i) for i in ids], passes=3)
+        metadata_read = timed(lambda: [database.get_transcript_metadata(i) for i in ids], passes=3)
+        window_read = timed(lambda: [database.get_transcript(i, 600, 660) for i in ids], passes=3)
+        
+        with database.get_connection() as conn:
+            try:
+                sizes = dict(conn.execute("""
+                    SELECT name, SUM(pgsize) FROM dbstat
+                    WHERE name IN ('legacy_transcripts', 'transcript_segments')
+                    GROUP BY name
+                """).fetchall())
+            except sqlite3.OperationalError:
+                sizes = {}  # SQLite built without the dbstat table
+        
+        def size(table: str) -> str:
+            return f"{sizes[table] / transcripts / 1024:7.1f} KiB" if table in sizes else "        n/a"
+        
+        print(f"   JSON blob        write {blob_write:6.2f} ms   read {blob_read:6.2f} ms   {size('legacy_transcripts')}")
+        print(f"   segments         write {segment_write:6.2f} ms   read {segment_read:6.2f} ms   {size('transcript_segments')}")
+        print(f"   metadata only    read {metadata_read:6.2f} ms")
+        print(f"   60 s window      read {window_read:6.2f} ms")
+    finally:
+        database.close_all_connections()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare JSON-blob and segment transcript storage")
+    parser.add_argument("minutes", type=int, nargs="?", default=30)
+    parser.add_argument("transcripts", type=int, nargs="?", default=200)
+    parser.add_argument("--db", type=Path, help="scratch database file to create (default: a temporary file)")
+    args = parser.parse_args()
+    
+    if args.db is not None:
+        if args.db.exists():
+            sys.exit(f"❌ {args.db} already exists - the benchmark needs a new, scratch database")
+        run_transcript_storage_benchmark(args.db, args.minutes, args.transcripts)
+    else:
+        with tempfile.TemporaryDirectory() as directory:
+            run_transcript_storage_benchmark(Path(directory) / "bench.db", args.minutes, args.transcripts)
@@ -0,0 +1,143 @@
+"""
+Load test of the VAPI event pipeline (vapi_events.py) through the full app.
+
+    python -m bench.vapi_load [calls] [seconds] [events_per_second] [--db PATH]
+
+Runs in this process (one worker) against a scratch database, a temporary file
+by default. Like bench.transcript_storage, it sets DATABASE_URL before the app
+is imported, so it must run in its own process and a --db file must not exist.
+"""
+
+import argparse
+import asyncio
+import io
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from contextlib import redirect_stdout
+from pathlib import Path
+from typing import Any, Dict, List
+
+
+async def run_load_test(db_path: Path, calls: int = 200, seconds: float = 10, events_per_second: float = 20):
+    """
+    Simulate concurrent calls against the full app and verify what was stored.
+    
+    Each call sends a stream of partial transcripts, speech updates and a final
+    transcript every eighth event, then an end-of-call report (usually cutting
+    off an utterance).
+    
+    Args:
+        db_path: Scratch database file to create
+        calls: Concurrent simulated calls
+        seconds: Length of each call
+        events_per_second: Events sent per call per second
+    """
+    if "database" in sys.modules:
+        raise RuntimeError("database was imported before the load test could set its path")
+    os.environ["DATABASE_URL"] = str(db_path)
+    
+    # Session open/close log lines per call are captured; only warnings are shown
+    with redirect_stdout(io.StringIO()) as log:
+        import httpx
+        import database
+        import main
+        from rating_queue import get_rating_queue
+        from vapi_events import get_event_pipeline
+        
+        pipeline = get_event_pipeline()
+        await get_rating_queue().start()
+        await pipeline.start()
+        
+        latencies: List[float] = []
+        finals: Dict[str, int] = {}
+        transport = httpx.ASGITransport(app=main.app)
+        
+        async def simulate_call(client: httpx.AsyncClient, call_id: str):
+            await asyncio.sleep(random.random() / events_per_second)
+            finals[call_id] = 0
+            end_at = time.perf_counter() + seconds
+            sent = 0
+            open_partial = False
+            
+            async def send(message: Dict[str, Any]):
+                message.update({"call": {"id": call_id}, "timestamp": time.time() * 1000})
+                started = time.perf_counter()
+                response = await client.post("/api/vapi_events", content=json.dumps({"message": message}))
+                latencies.append(time.perf_counter() - started)
+                response.raise_for_status()
+            
+            await send({"type": "status-update", "status": "in-progress"})
+            while time.perf_counter() < end_at:
+                role = "user" if (sent // 16) % 2 else "assistant"
+                if sent % 8 == 7:
+                    await send({"type": "transcript", "transcriptType": "final", "role": role, "transcript": f"Final utterance {sent}"})
+                    finals[call_id] += 1
+                    open_partial = False
+                elif sent % 8 == 0:
+                    await send({"type": "speech-update", "status": "started", "role": role})
+                else:
+                    await send({"type": "transcript", "transcriptType": "partial", "role": role, "transcript": f"Partial {sent}"})
+                    open_partial = True
+                sent += 1
+                await asyncio.sleep(1 / events_per_second)
+            await send({"type": "end-of-call-report"})
+            # An utterance cut off by the end of the call is stored as its last partial
+            finals[call_id] += open_partial
+        
+        started = time.perf_counter()
+        async with httpx.AsyncClient(transport=transport, base_url="http://load") as client:
+            await asyncio.gather(*(simulate_call(client, f"load-{i}") for i in range(calls)))
+        elapsed = time.perf_counter() - started
+        
+        await pipeline.stop()
+        await get_rating_queue().stop()
+        
+        # Every utterance plus call-start and call-end must have been stored
+        mismatched = 0
+        with database.get_connection() as conn:
+            rows = conn.execute("""
+                SELECT json_extract(metadata, '$.vapiCallId'), segment_count, rating_status
+                FROM transcripts
+                WHERE json_extract(metadata, '$.vapiCallId') IS NOT NULL
+            """).fetchall()
+        for call_id, segment_count, rating_status in rows:
+            if segment_count != finals.get(call_id, -1) + 2 or rating_status == "recording":
+                mismatched += 1
+        database.close_all_connections()
+    
+    for line in log.getvalue().splitlines():
+        if line.startswith("⚠️"):
+            print(line)
+    
+    stats = pipeline.stats()
+    latencies.sort()
+    print(f"📞 {calls} calls for {seconds:.0f}s at {events_per_second:.0f} events/s each")
+    print(f"   {len(latencies):,} events in {elapsed:.1f}s ({len(latencies) / elapsed:,.0f}/s)")
+    print(f"   request latency p50 {statistics.median(latencies) * 1000:.2f} ms, "
+          f"p99 {latencies[int(len(latencies) * 0.99)] * 1000:.2f} ms")
+    print(f"   {stats['flushes']} flushes, {stats['segments_written']:,} segments written, "
+          f"max flush {stats['max_flush_ms']} ms, {stats['partials_collapsed']:,} partials collapsed")
+    print(f"   transcripts stored: {len(rows)}/{calls}, mismatched: {mismatched}, dropped segments: {stats['segments_dropped']}, "
+          f"lost segments: {stats['segments_lost']}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load test the VAPI event pipeline with simulated calls")
+    parser.add_argument("calls", type=int, nargs="?", default=200)
+    parser.add_argument("seconds", type=float, nargs="?", default=10)
+    parser.add_argument("events_per_second", type=float, nargs="?", default=20)
+    parser.add_argument("--db", type=Path, help="scratch database file to create (default: a temporary file)")
+    args = parser.parse_args()
+    
+    if args.db is not None:
+        if args.db.exists():
+            sys.exit(f"❌ {args.db} already exists - the load test needs a new, scratch database")
+        asyncio.run(run_load_test(args.db, args.calls, args.seconds, args.events_per_second))
+    else:
+        with tempfile.TemporaryDirectory() as directory:
+            asyncio.run(run_load_test(Path(directory) / "load.db", args.calls, args.seconds, args.events_per_second))
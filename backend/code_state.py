@@ -0,0 +1,243 @@
+"""
+Per-call code state for the VAPI webhook.
+
+The webhook used to receive the whole editor contents with every utterance, so
+a long solution was resent over and over during a call. Clients now send the
+full code once (a snapshot) and afterwards only deltas against the version the
+server acknowledged:
+
+- edits: a list of {"offset", "delete", "insert"} operations, applied in order
+  (each offset refers to the code as left by the previous operation)
+- diff: a unified diff against the acknowledged code
+
+Every accepted snapshot or delta bumps the call's version. A delta whose
+base_version is not the current version, or that does not apply cleanly, is
+rejected with CodeVersionMismatch; the client then sends a snapshot again.
+
+State lives in this process only (a TTLCache keyed by call ID), like the other
+in-process caches; calls idle for CODE_STATE_TTL_SECONDS are forgotten.
+
+Run `python -m bench.code_deltas` from backend/ to compare bytes sent for full
+code and deltas.
+"""
+
+import os
+import re
+import threading
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+from cachetools import TTLCache
+
+
+# Seconds a call's code is kept after its last update
+CODE_STATE_TTL_SECONDS = float(os.getenv("CODE_STATE_TTL_SECONDS", "7200"))
+
+# Maximum number of calls whose code is kept
+CODE_STATE_MAX_CALLS = int(os.getenv("CODE_STATE_MAX_CALLS", "1024"))
+
+_HUNK_RE = re.compile(r"@@ -(\d+)(?:,(\d+))? \+(\d+)(?:,(\d+))? @@")
+
+
+class CodeVersionMismatch(Exception):
+    """A delta does not match the server's copy of the code; the client must send a snapshot."""
+    
+    def __init__(self, message: str, current_version: int):
+        super().__init__(message)
+        self.current_version = current_version
+
+
+@dataclass
+class CodeState:
+    """The latest code of one call"""
+    code: str
+    version: int
+    language: Optional[str] = None
+
+
+def apply_edits(code: str, edits: List[Dict[str, Any]]) -> str:
+    """
+    Apply offset/delete/insert operations to a string.
+    
+    Args:
+        code: The code to edit
+        edits: Operations applied in order, each {"offset": int, "delete": int, "insert": str}
+    
+    Returns:
+        The edited code
+    
+    Raises:
+        ValueError: If an operation falls outside the code
+    """
+    for edit in edits:
+        offset = edit.get("offset", 0)
+        delete = edit.get("delete", 0)
+        if offset < 0 or delete < 0 or offset + delete > len(code):
+            raise ValueError(f"Edit at offset {offset} deleting {delete} is outside the code ({len(code)} characters)")
+        code = code[:offset] + edit.get("insert", "") + code[offset + delete:]
+    return code
+
+
+def apply_unified_diff(code: str, diff: str) -> str:
+    """
+    Apply a unified diff (as produced by difflib.unified_diff or `diff -u`) to a string.
+    
+    Args:
+        code: The code the diff was made against
+        diff: The unified diff
+    
+    Returns:
+        The patched code
+    
+    Raises:
+        ValueError: If the diff is malformed or its context does not match the code
+    """
+    source = code.splitlines(keepends=True)
+    result: List[str] = []
+    position = 0  # next source line to copy
+    lines = diff.splitlines(keepends=True)
+    index = 0
+    
+    while index < len(lines):
+        line = lines[index]
+        index += 1
+        if not line.startswith("@@"):
+            continue  # file headers and anything before the first hunk
+        
+        match = _HUNK_RE.match(line)
+        if match is None:
+            raise ValueError(f"Malformed hunk header: {line.strip()}")
+        
+        start = int(match.group(1))
+        old_count = int(match.group(2)) if match.group(2) is not None else 1
+        # Hunks that delete from / insert into an empty range point at the line before
+        hunk_start = start - 1 if old_count else start
+        if hunk_start < position or hunk_start > len(source):
+            raise ValueError(f"Hunk at line {start} is out of order or past the end of the code")
+        
+        result.extend(source[position:hunk_start])
+        position = hunk_start
+        
+        while index < len(lines) and not lines[index].startswith("@@"):
+            line = lines[index]
+            index += 1
+            marker, text = line[:1], line[1:]
+            
+            if marker == "\\":
+                # "\ No newline at end of file" applies to the previous line
+                previous = lines[index - 2][:1]
+                if previous == "+":
+                    result[-1] = result[-1].rstrip("\r\n")
+                continue
+            if marker in (" ", "-"):
+                expected = source[position] if position < len(source) else None
+                if expected is None or expected.rstrip("\r\n") != text.rstrip("\r\n"):
+                    raise ValueError(f"Diff context does not match the code at line {position + 1}")
+                if marker == " ":
+                    result.append(expected)
+                position += 1
+            elif marker == "+":
+                result.append(text)
+            elif line.strip() == "":
+                continue
+            else:
+                raise ValueError(f"Unexpected line in diff: {line.strip()}")
+    
+    result.extend(source[position:])
+    return "".join(result)
+
+
+class CodeStateStore:
+    """Latest code per call, updated from snapshots and versioned deltas"""
+    
+    def __init__(self, maxsize: int = CODE_STATE_MAX_CALLS, ttl: float = CODE_STATE_TTL_SECONDS):
+        self._states: TTLCache = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._lock = threading.Lock()
+    
+    def get(self, call_id: str) -> Optional[CodeState]:
+        """The current code of a call, or None if the call is unknown or expired."""
+        with self._lock:
+            return self._states.get(call_id)
+    
+    def snapshot(self, call_id: str, code: str, language: Optional[str] = None) -> int:
+        """
+        Replace a call's code with a full copy.
+        
+        Args:
+            call_id: The VAPI call ID
+            code: The entire editor contents
+            language: The editor language, if known
+        
+        Returns:
+            The new version
+        """
+        with self._lock:
+            current = self._states.get(call_id)
+            version = current.version + 1 if current else 1
+            self._states[call_id] = CodeState(
+                code=code,
+                version=version,
+                language=language or (current.language if current else None)
+            )
+            return version
+    
+    def apply_delta(
+        self,
+        call_id: str,
+        base_version: int,
+        edits: Optional[List[Dict[str, Any]]] = None,
+        diff: Optional[str] = None
+    ) -> int:
+        """
+        Apply a delta made against base_version.
+        
+        Args:
+            call_id: The VAPI call ID
+            base_version: The version the client last had acknowledged
+            edits: Offset/delete/insert operations (see apply_edits)
+            diff: A unified diff (see apply_unified_diff)
+        
+        Returns:
+            The new version
+        
+        Raises:
+            CodeVersionMismatch: If the call is unknown, base_version is not current
+                or the delta does not apply; the client should send a snapshot
+        """
+        with self._lock:
+            current = self._states.get(call_id)
+            if current is None:
+                raise CodeVersionMismatch(f"No code stored for call {call_id}", 0)
+            if current.version != base_version:
+                raise CodeVersionMismatch(
+                    f"Delta is based on version {base_version} but the current version is {current.version}",
+                    current.version
+                )
+            
+            try:
+                code = current.code
+                if diff is not None:
+                    code = apply_unified_diff(code, diff)
+                if edits:
+                    code = apply_edits(code, edits)
+            except ValueError as e:
+                raise CodeVersionMismatch(str(e), current.version)
+            
+            self._states[call_id] = CodeState(code=code, version=current.version + 1, language=current.language)
+            return current.version + 1
+    
+    def discard(self, call_id: str):
+        """Forget a call's code (e.g. when the call ends)."""
+        with self._lock:
+            self._states.pop(call_id, None)
+
+
+# Singleton instance
+_code_state_store: Optional[CodeStateStore] = None
+
+
+def get_code_state_store() -> CodeStateStore:
+    """Get or create the code state store singleton"""
+    global _code_state_store
+    if _code_state_store is None:
+        _code_state_store = CodeStateStore()
+    return _code_state_store
@@ -0,0 +1,180 @@
+"""
+Response compression middleware (gzip, and brotli when installed).
+
+Transcript responses are large and very repetitive - every segment repeats the
+same keys - so they compress by an order of magnitude. Responses are compressed
+when the client accepts it, the content type is textual and the body is at
+least COMPRESSION_MINIMUM_SIZE bytes. Streamed responses (the NDJSON export and
+batch imports) are compressed chunk by chunk and flushed after each chunk, so
+clients still see progress as it happens.
+
+A compressed response gets "Vary: Accept-Encoding" and its ETag is suffixed
+with the coding ("<tag>-gzip"), since the bytes differ from the uncompressed
+representation. The HTTP cache middleware strips that suffix when comparing.
+
+Run `python -m bench.responses [minutes]` from backend/ to compare bytes on the
+wire and serialization time for a realistic interview transcript.
+"""
+
+import os
+import zlib
+from typing import Optional
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+try:
+    import brotli
+    BROTLI_AVAILABLE = True
+except ImportError:
+    BROTLI_AVAILABLE = False
+
+
+# Compress responses at all
+COMPRESSION_ENABLED = os.getenv("COMPRESSION_ENABLED", "1").lower() in ("1", "true", "yes")
+
+# Smaller bodies are sent as they are (compression would not pay for itself)
+COMPRESSION_MINIMUM_SIZE = int(os.getenv("COMPRESSION_MINIMUM_SIZE", "1024"))
+
+# gzip level (1-9) and brotli quality (0-11); moderate settings suit dynamic responses
+COMPRESSION_GZIP_LEVEL = int(os.getenv("COMPRESSION_GZIP_LEVEL", "6"))
+COMPRESSION_BROTLI_QUALITY = int(os.getenv("COMPRESSION_BROTLI_QUALITY", "4"))
+
+_COMPRESSIBLE_TYPES = ("text/", "application/json", "application/x-ndjson", "application/javascript")
+
+
+class _Encoder:
+    """Incremental gzip or brotli encoder"""
+    
+    def __init__(self, encoding: str, gzip_level: int, brotli_quality: int):
+        self.encoding = encoding
+        if encoding == "br":
+            self._brotli = brotli.Compressor(quality=brotli_quality)
+        else:
+            self._gzip = zlib.compressobj(gzip_level, zlib.DEFLATED, zlib.MAX_WBITS | 16)
+    
+    def chunk(self, data: bytes) -> bytes:
+        """Compress part of the body and flush it so it can be sent right away."""
+        if self.encoding == "br":
+            return self._brotli.process(data) + self._brotli.flush()
+        return self._gzip.compress(data) + self._gzip.flush(zlib.Z_SYNC_FLUSH)
+    
+    def finish(self, data: bytes = b"") -> bytes:
+        """Compress the rest of the body and end the stream."""
+        if self.encoding == "br":
+            return self._brotli.process(data) + self._brotli.finish()
+        return self._gzip.compress(data) + self._gzip.flush()
+
+
+def choose_encoding(accept_encoding: str, brotli_available: bool = BROTLI_AVAILABLE) -> Optional[str]:
+    """
+    Pick the content coding for a request.
+    
+    Args:
+        accept_encoding: The request's Accept-Encoding header
+        brotli_available: Whether the brotli module is installed
+    
+    Returns:
+        "br", "gzip" or None if the client accepts neither
+    """
+    accepted = {}
+    for item in accept_encoding.lower().split(","):
+        coding, _, params = item.strip().partition(";")
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[coding.strip()] = quality
+    
+    wildcard = accepted.get("*", 0.0)
+    if brotli_available and accepted.get("br", wildcard) > 0:
+        return "br"
+    if accepted.get("gzip", wildcard) > 0:
+        return "gzip"
+    return None
+
+
+class CompressionMiddleware:
+    """Compresses textual responses with brotli or gzip, including streamed ones"""
+    
+    def __init__(
+        self,
+        app: ASGIApp,
+        minimum_size: int = COMPRESSION_MINIMUM_SIZE,
+        gzip_level: int = COMPRESSION_GZIP_LEVEL,
+        brotli_quality: int = COMPRESSION_BROTLI_QUALITY,
+        enabled: bool = COMPRESSION_ENABLED
+    ):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+        self.enabled = enabled
+    
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if not self.enabled or scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        
+        encoding = choose_encoding(Headers(scope=scope).get("accept-encoding", ""))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+        
+        start: Optional[Message] = None
+        encoder: Optional[_Encoder] = None
+        passthrough = False
+        
+        async def send_compressed(message: Message):
+            nonlocal start, encoder, passthrough
+            
+            if message["type"] == "http.response.start":
+                start = message  # held back until we know whether to compress
+                return
+            
+            if passthrough or message["type"] != "http.response.body":
+                await send(message)
+                return
+            
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+            
+            if encoder is not None:
+                # Later chunks of a streamed response
+                data = encoder.chunk(body) if more_body else encoder.finish(body)
+                await send({"type": "http.response.body", "body": data, "more_body": more_body})
+                return
+            
+            assert start is not None
+            headers = MutableHeaders(scope=start)
+            content_type = headers.get("content-type", "")
+            compressible = content_type.startswith(_COMPRESSIBLE_TYPES) and "content-encoding" not in headers
+            
+            if compressible:
+                headers.add_vary_header("Accept-Encoding")
+            
+            if not compressible or start["status"] in (204, 304) or (not more_body and len(body) < self.minimum_size):
+                passthrough = True
+                await send(start)
+                await send(message)
+                return
+            
+            encoder = _Encoder(encoding, self.gzip_level, self.brotli_quality)
+            headers["Content-Encoding"] = encoding
+            etag = headers.get("etag")
+            if etag and etag.endswith('"'):
+                headers["ETag"] = f'{etag[:-1]}-{encoding}"'
+            
+            if more_body:
+                del headers["content-length"]
+                data = encoder.chunk(body)
+            else:
+                data = encoder.finish(body)
+                headers["Content-Length"] = str(len(data))
+            
+            await send(start)
+            await send({"type": "http.response.body", "body": data, "more_body": more_body})
+        
+        await self.app(scope, receive, send_compressed)
@@ -1,89 +1,380 @@
 import sqlite3
 import json
-from datetime import datetime
+import os
+import random
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from itertools import groupby
+from operator import itemgetter
 from pathlib import Path
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Iterator, Tuple
+from cachetools import LRUCache, TTLCache
+import problem_payloads
 
-# Database file path
-DB_PATH = Path(__file__).parent / "transcripts.db"
+# Database file path: DATABASE_URL ("sqlite:///path" or a plain path, relative to
+# the working directory) or transcripts.db next to this module
+DATABASE_URL = os.getenv("DATABASE_URL", "")
+DB_PATH = Path(DATABASE_URL.removeprefix("sqlite:///")) if DATABASE_URL else Path(__file__).parent / "transcripts.db"
 
+# Pragmas applied once to every pooled connection.
+# WAL lets readers proceed while a writer commits, and NORMAL sync is durable
+# across application crashes under WAL (only an OS crash can lose the last commit).
+SQLITE_PRAGMAS = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "mmap_size": 268435456,  # 256 MB
+    "cache_size": -65536,  # negative = KiB, i.e. 64 MB of page cache
+    "temp_store": "MEMORY",
+    "busy_timeout": 5000,  # ms to wait on a locked database before failing
+}
 
-def init_db():
-    """Initialize the database and create tables if they don't exist."""
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    
-    # Create transcripts table
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS transcripts (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            transcript_data TEXT NOT NULL,
-            call_duration REAL,
-            user_messages INTEGER,
-            assistant_messages INTEGER,
-            metadata TEXT,
-            ratings TEXT,
-            rated_at TEXT,
-            created_at TEXT NOT NULL
-        )
-    """)
-    
-    # Create problems table (core problem data)
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS problems (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            source TEXT NOT NULL DEFAULT 'socratic',
-            leetcode_slug TEXT UNIQUE,
-            title TEXT NOT NULL,
-            description TEXT NOT NULL,
-            details TEXT NOT NULL DEFAULT '{}',
-            difficulty TEXT NOT NULL,
-            created_at TEXT NOT NULL,
-            last_fetched_at TEXT,
-            CHECK (source IN ('socratic', 'leetcode')),
-            CHECK (difficulty IN ('Easy', 'Medium', 'Hard'))
-        )
-    """)
+# One long-lived connection per thread, tracked so they can be closed on shutdown
+_local = threading.local()
+_connections: List[sqlite3.Connection] = []
+_connections_lock = threading.Lock()
+_pool_generation = 0
+
+# Problem ID lists used for random selection, keyed by filter.
+# Each entry is stamped with MAX(id) at load time: problems are never deleted,
+# so a new MAX(id) (from this or any other worker process) means the list is stale.
+_problem_ids_cache: LRUCache = LRUCache(maxsize=128)
+_problem_ids_lock = threading.Lock()
+
+# Size and lifetime of the in-process problem cache
+PROBLEM_CACHE_SIZE = int(os.getenv("PROBLEM_CACHE_SIZE", "1024"))
+PROBLEM_CACHE_TTL = float(os.getenv("PROBLEM_CACHE_TTL", "3600"))
+
+
+class _CountingTTLCache(TTLCache):
+    """TTLCache that also counts hits, misses, evictions and expirations."""
+    
+    def __init__(self, maxsize: int, ttl: float):
+        super().__init__(maxsize=maxsize, ttl=ttl)
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+    
+    def popitem(self):
+        item = super().popitem()
+        self.evictions += 1
+        return item
+    
+    def expire(self, time=None):
+        expired = super().expire(time)
+        self.expirations += len(expired)
+        return expired
+
+
+# Loaded problems keyed by ("id", problem_id), plus ("slug", leetcode_slug) -> problem_id.
+# Cached dictionaries are shared between callers and must be treated as read-only.
+_problem_cache = _CountingTTLCache(maxsize=PROBLEM_CACHE_SIZE, ttl=PROBLEM_CACHE_TTL)
+_problem_cache_lock = threading.Lock()
+
+
+def _connect() -> sqlite3.Connection:
+    """Open a new SQLite connection with the tuning pragmas applied."""
+    conn = sqlite3.connect(DB_PATH, check_same_thread=False)
+    for pragma, value in SQLITE_PRAGMAS.items():
+        conn.execute(f"PRAGMA {pragma} = {value}")
+    return conn
+
+
+def _get_thread_connection() -> sqlite3.Connection:
+    """Return this thread's pooled connection, opening it on first use."""
+    conn = getattr(_local, "conn", None)
+    if conn is None or getattr(_local, "generation", None) != _pool_generation:
+        conn = _connect()
+        _local.conn = conn
+        _local.generation = _pool_generation
+        _local.depth = 0
+        with _connections_lock:
+            _connections.append(conn)
+    return conn
+
+
+@contextmanager
+def get_connection() -> Iterator[sqlite3.Connection]:
+    """
+    Borrow the calling thread's pooled connection for the duration of a block.
     
-    # Create starter_code_snippets table (one-to-many with problems)
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS starter_code_snippets (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            problem_id INTEGER NOT NULL,
-            language TEXT NOT NULL,
-            code TEXT NOT NULL,
-            FOREIGN KEY (problem_id) REFERENCES problems(id) ON DELETE CASCADE,
-            CHECK (language IN ('python', 'javascript', 'java', 'cpp', 'go', 'rust'))
-        )
-    """)
+    The outermost block commits on success and rolls back on error, so helpers
+    called from inside another block share its transaction.
     
-    # Create tags table
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS tags (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            name TEXT UNIQUE NOT NULL
-        )
-    """)
+    Example:
+        with get_connection() as conn:
+            conn.execute("UPDATE ...")
+    """
+    conn = _get_thread_connection()
+    _local.depth += 1
+    try:
+        yield conn
+        if _local.depth == 1:
+            conn.commit()
+    except BaseException:
+        if _local.depth == 1:
+            conn.rollback()
+        raise
+    finally:
+        _local.depth -= 1
+
+
+def close_all_connections():
+    """Close every pooled connection (called on application shutdown)."""
+    global _pool_generation
+    with _connections_lock:
+        _pool_generation += 1
+        for conn in _connections:
+            try:
+                conn.close()
+            except sqlite3.Error:
+                pass
+        _connections.clear()
+
+
+def _ensure_column(cursor: sqlite3.Cursor, table: str, column: str, declaration: str):
+    """Add a column to an existing table if an older database is missing it."""
+    existing = {row[1] for row in cursor.execute(f"PRAGMA table_info({table})")}
+    if column not in existing:
+        cursor.execute(f"ALTER TABLE {table} ADD COLUMN {column} {declaration}")
+
+
+# Segment type and role names, stored in transcript_segments as their index
+SEGMENT_TYPES = ("transcript", "call-start", "call-end")
+SEGMENT_ROLES = ("user", "assistant")
+
+_SEGMENT_TYPE_CODES = {name: code for code, name in enumerate(SEGMENT_TYPES)}
+_SEGMENT_ROLE_CODES = {name: code for code, name in enumerate(SEGMENT_ROLES)}
+_SEGMENT_TYPE_NAMES = {None: None, **dict(enumerate(SEGMENT_TYPES))}
+_SEGMENT_ROLE_NAMES = {None: None, **dict(enumerate(SEGMENT_ROLES))}
+_SEGMENT_FIELDS = ("type", "role", "text", "timestamp", "secondsSinceStart")
+
+# Transcript columns read for every transcript dictionary (everything but the segments)
+_TRANSCRIPT_COLUMNS = """id, call_duration, user_messages, assistant_messages, metadata,
+                   ratings, rated_at, created_at, rating_status, segment_count"""
+
+
+def _segment_row(transcript_id: int, seq: int, segment: Dict[str, Any]) -> tuple:
+    """Convert a transcript segment into a transcript_segments row."""
+    # Anything the columns can't hold (unknown keys or names) is kept as JSON
+    extra = {key: value for key, value in segment.items() if key not in _SEGMENT_FIELDS}
+    
+    segment_type = segment.get("type")
+    type_code = _SEGMENT_TYPE_CODES.get(segment_type)
+    if type_code is None and segment_type is not None:
+        extra["type"] = segment_type
+    
+    role = segment.get("role")
+    role_code = _SEGMENT_ROLE_CODES.get(role)
+    if role_code is None and role is not None:
+        extra["role"] = role
+    
+    return (
+        transcript_id,
+        seq,
+        type_code,
+        role_code,
+        segment.get("secondsSinceStart"),
+        segment.get("timestamp"),
+        segment.get("text"),
+        json.dumps(extra) if extra else None
+    )
+
+
+def _segments_from_rows(rows: List[tuple]) -> List[Dict[str, Any]]:
+    """Convert (type, role, text, timestamp, seconds, extra) rows back into segment dictionaries."""
+    type_names = _SEGMENT_TYPE_NAMES
+    role_names = _SEGMENT_ROLE_NAMES
+    segments = [
+        {
+            "type": type_names[row[0]],
+            "role": role_names[row[1]],
+            "text": row[2],
+            "timestamp": row[3],
+            "secondsSinceStart": row[4]
+        }
+        for row in rows
+    ]
+    for segment, row in zip(segments, rows):
+        if row[5]:
+            segment.update(json.loads(row[5]))
+    return segments
+
+
+def _insert_segments(conn: sqlite3.Connection, transcript_id: int, segments: List[Dict[str, Any]], first_seq: int = 0):
+    """Insert segments for a transcript, numbered from first_seq."""
+    conn.executemany("""
+        INSERT INTO transcript_segments
+        (transcript_id, seq, type, role, seconds, timestamp, text, extra)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+    """, [_segment_row(transcript_id, first_seq + index, segment) for index, segment in enumerate(segments)])
+
+
+def _migrate_transcript_segments(cursor: sqlite3.Cursor):
+    """Move transcripts saved as a JSON blob into transcript_segments."""
+    ids = [row[0] for row in cursor.execute("SELECT id FROM transcripts WHERE segment_count IS NULL").fetchall()]
+    if not ids:
+        return
     
-    # Create problem_tags join table (many-to-many)
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS problem_tags (
-            problem_id INTEGER NOT NULL,
-            tag_id INTEGER NOT NULL,
-            PRIMARY KEY (problem_id, tag_id),
-            FOREIGN KEY (problem_id) REFERENCES problems(id) ON DELETE CASCADE,
-            FOREIGN KEY (tag_id) REFERENCES tags(id) ON DELETE CASCADE
+    for transcript_id in ids:
+        (transcript_json,) = cursor.execute(
+            "SELECT transcript_data FROM transcripts WHERE id = ?", (transcript_id,)
+        ).fetchone()
+        segments = json.loads(transcript_json) if transcript_json else []
+        cursor.execute("DELETE FROM transcript_segments WHERE transcript_id = ?", (transcript_id,))
+        _insert_segments(cursor.connection, transcript_id, segments)
+        cursor.execute(
+            "UPDATE transcripts SET transcript_data = '', segment_count = ? WHERE id = ?",
+            (len(segments), transcript_id)
         )
-    """)
     
-    # Create indexes for performance
-    cursor.execute("CREATE INDEX IF NOT EXISTS idx_problems_leetcode_slug ON problems(leetcode_slug)")
-    cursor.execute("CREATE INDEX IF NOT EXISTS idx_starter_code_problem_id ON starter_code_snippets(problem_id)")
-    cursor.execute("CREATE INDEX IF NOT EXISTS idx_problem_tags_problem_id ON problem_tags(problem_id)")
-    cursor.execute("CREATE INDEX IF NOT EXISTS idx_problem_tags_tag_id ON problem_tags(tag_id)")
+    print(f"📦 Moved {len(ids)} transcripts to the transcript_segments table")
+
+
+def init_db():
+    """Initialize the database and create tables if they don't exist."""
+    with get_connection() as conn:
+        cursor = conn.cursor()
+        
+        # Create transcripts table
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS transcripts (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                transcript_data TEXT NOT NULL,
+                call_duration REAL,
+                user_messages INTEGER,
+                assistant_messages INTEGER,
+                metadata TEXT,
+                ratings TEXT,
+                rated_at TEXT,
+                created_at TEXT NOT NULL,
+                rating_status TEXT,
+                segment_count INTEGER,
+                last_appended_at TEXT
+            )
+        """)
+        
+        # Create transcript_segments table (one row per segment; type and role stored as small ints)
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS transcript_segments (
+                transcript_id INTEGER NOT NULL,
+                seq INTEGER NOT NULL,
+                type INTEGER,
+                role INTEGER,
+                seconds REAL,
+                timestamp TEXT,
+                text TEXT,
+                extra TEXT,
+                PRIMARY KEY (transcript_id, seq),
+                FOREIGN KEY (transcript_id) REFERENCES transcripts(id) ON DELETE CASCADE
+            ) WITHOUT ROWID
+        """)
+        
+        # Create improvement_points table (generated feedback, keyed by a hash of its input)
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS improvement_points (
+                transcript_id INTEGER NOT NULL,
+                cache_key TEXT NOT NULL,
+                points TEXT NOT NULL,
+                model TEXT,
+                created_at TEXT NOT NULL,
+                PRIMARY KEY (transcript_id, cache_key),
+                FOREIGN KEY (transcript_id) REFERENCES transcripts(id) ON DELETE CASCADE
+            )
+        """)
+        
+        # Create transcript_summaries table (running notes on a session, see rating_queue.py)
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS transcript_summaries (
+                transcript_id INTEGER PRIMARY KEY,
+                through_seq INTEGER NOT NULL,
+                segment_count INTEGER NOT NULL,
+                summary TEXT NOT NULL,
+                model TEXT,
+                updated_at TEXT NOT NULL,
+                FOREIGN KEY (transcript_id) REFERENCES transcripts(id) ON DELETE CASCADE
+            )
+        """)
+        
+        # Columns added after the initial schema
+        _ensure_column(cursor, "transcripts", "rating_status", "TEXT")
+        _ensure_column(cursor, "transcripts", "segment_count", "INTEGER")
+        _ensure_column(cursor, "transcripts", "last_appended_at", "TEXT")
+        _migrate_transcript_segments(cursor)
+        
+        # Create problems table (core problem data)
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS problems (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                source TEXT NOT NULL DEFAULT 'socratic',
+                leetcode_slug TEXT UNIQUE,
+                title TEXT NOT NULL,
+                description TEXT NOT NULL,
+                details TEXT NOT NULL DEFAULT '{}',
+                difficulty TEXT NOT NULL,
+                created_at TEXT NOT NULL,
+                last_fetched_at TEXT,
+                last_accessed_at TEXT,
+                CHECK (source IN ('socratic', 'leetcode')),
+                CHECK (difficulty IN ('Easy', 'Medium', 'Hard'))
+            )
+        """)
+        
+        # Create starter_code_snippets table (one-to-many with problems)
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS starter_code_snippets (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                problem_id INTEGER NOT NULL,
+                language TEXT NOT NULL,
+                code TEXT NOT NULL,
+                FOREIGN KEY (problem_id) REFERENCES problems(id) ON DELETE CASCADE,
+                CHECK (language IN ('python', 'javascript', 'java', 'cpp', 'go', 'rust'))
+            )
+        """)
+        
+        # Create tags table
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS tags (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                name TEXT UNIQUE NOT NULL
+            )
+        """)
+        
+        # Create problem_tags join table (many-to-many)
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS problem_tags (
+                problem_id INTEGER NOT NULL,
+                tag_id INTEGER NOT NULL,
+                PRIMARY KEY (problem_id, tag_id),
+                FOREIGN KEY (problem_id) REFERENCES problems(id) ON DELETE CASCADE,
+                FOREIGN KEY (tag_id) REFERENCES tags(id) ON DELETE CASCADE
+            )
+        """)
+        
+        # Create problem_payloads table (serialized API responses, rebuilt whenever the problem changes)
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS problem_payloads (
+                problem_id INTEGER NOT NULL,
+                kind TEXT NOT NULL,
+                body BLOB NOT NULL,
+                etag TEXT NOT NULL,
+                created_at TEXT NOT NULL,
+                PRIMARY KEY (problem_id, kind),
+                FOREIGN KEY (problem_id) REFERENCES problems(id) ON DELETE CASCADE
+            )
+        """)
+        
+        # Columns added to the problems table after the initial schema
+        _ensure_column(cursor, "problems", "last_accessed_at", "TEXT")
+        
+        # Create indexes for performance
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_problems_leetcode_slug ON problems(leetcode_slug)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_starter_code_problem_id ON starter_code_snippets(problem_id)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_problem_tags_problem_id ON problem_tags(problem_id)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_problem_tags_tag_id ON problem_tags(tag_id)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_transcripts_rating_status ON transcripts(rating_status)")
     
-    conn.commit()
-    conn.close()
     print(f"✅ Database initialized at {DB_PATH}")
 
 
@@ -97,6 +388,9 @@ def save_transcript(
     """
     Save a transcript to the database.
     
+    New transcripts start with rating_status 'pending' until the rating queue rates them.
+    The segments are stored one row each in transcript_segments.
+    
     Args:
         transcript: List of transcript segments
         call_duration: Total call duration in seconds
@@ -107,67 +401,441 @@ def save_transcript(
     Returns:
         The ID of the newly created transcript record
     """
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    
-    transcript_json = json.dumps(transcript)
     metadata_json = json.dumps(metadata) if metadata else None
     created_at = datetime.now().isoformat()
     
-    cursor.execute("""
-        INSERT INTO transcripts 
-        (transcript_data, call_duration, user_messages, assistant_messages, metadata, created_at)
-        VALUES (?, ?, ?, ?, ?, ?)
-    """, (transcript_json, call_duration, user_messages, assistant_messages, metadata_json, created_at))
+    with get_connection() as conn:
+        # transcript_data only holds transcripts saved before transcript_segments existed
+        cursor = conn.execute("""
+            INSERT INTO transcripts 
+            (transcript_data, call_duration, user_messages, assistant_messages, metadata, created_at, rating_status, segment_count)
+            VALUES ('', ?, ?, ?, ?, ?, 'pending', ?)
+        """, (call_duration, user_messages, assistant_messages, metadata_json, created_at, len(transcript)))
+        
+        transcript_id = cursor.lastrowid
+        if transcript_id is None:
+            raise Exception("Failed to get transcript ID")
+        
+        _insert_segments(conn, transcript_id, transcript)
+    
+    print(f"💾 Saved transcript with ID: {transcript_id}")
+    return transcript_id
+
+
+def open_transcript_session(metadata: Optional[Dict[str, Any]] = None) -> int:
+    """
+    Start a transcript that receives its segments while the call is running.
+    
+    The transcript has rating_status 'recording' until close_transcript_session.
     
-    transcript_id = cursor.lastrowid
-    conn.commit()
-    conn.close()
+    Args:
+        metadata: Optional metadata dictionary
+    
+    Returns:
+        The ID of the new transcript, which identifies the session
+    """
+    metadata_json = json.dumps(metadata) if metadata else None
+    created_at = datetime.now().isoformat()
+    
+    with get_connection() as conn:
+        cursor = conn.execute("""
+            INSERT INTO transcripts 
+            (transcript_data, call_duration, user_messages, assistant_messages, metadata, created_at,
+             rating_status, segment_count, last_appended_at)
+            VALUES ('', 0, 0, 0, ?, ?, 'recording', 0, ?)
+        """, (metadata_json, created_at, created_at))
+        
+        transcript_id = cursor.lastrowid
     
     if transcript_id is None:
         raise Exception("Failed to get transcript ID")
     
-    print(f"💾 Saved transcript with ID: {transcript_id}")
+    print(f"🎙️  Opened transcript session with ID: {transcript_id}")
     return transcript_id
 
 
-def get_transcript(transcript_id: int) -> Optional[Dict[str, Any]]:
+def _session_state(conn: sqlite3.Connection, transcript_id: int) -> Optional[Dict[str, Any]]:
+    """Read a transcript's counters and rating status."""
+    row = conn.execute("""
+        SELECT segment_count, user_messages, assistant_messages, call_duration, rating_status
+        FROM transcripts
+        WHERE id = ?
+    """, (transcript_id,)).fetchone()
+    
+    if not row:
+        return None
+    
+    return {
+        "segment_count": row[0] or 0,
+        "user_messages": row[1] or 0,
+        "assistant_messages": row[2] or 0,
+        "call_duration": row[3] or 0,
+        "rating_status": row[4] or "pending"
+    }
+
+
+def append_transcript_segments(transcript_id: int, segments: List[Tuple[int, Dict[str, Any]]]) -> Optional[Dict[str, Any]]:
+    """
+    Append segments to an open transcript session.
+    
+    Each segment carries its sequence number, so a retried batch is harmless:
+    segments whose seq is already stored are skipped. The transcript's message
+    counters, call duration and segment count are updated in the same transaction.
+    
+    Args:
+        transcript_id: The ID of the session's transcript
+        segments: (seq, segment) pairs
+    
+    Returns:
+        The session counters plus "inserted" (number of new segments), or None if not found.
+        Nothing is appended if the session is no longer 'recording'.
+    """
+    with get_connection() as conn:
+        state = _session_state(conn, transcript_id)
+        if state is None or state["rating_status"] != "recording":
+            return {**state, "inserted": 0} if state else None
+        
+        inserted = user_messages = assistant_messages = 0
+        call_duration = state["call_duration"]
+        for seq, segment in segments:
+            cursor = conn.execute("""
+                INSERT OR IGNORE INTO transcript_segments
+                (transcript_id, seq, type, role, seconds, timestamp, text, extra)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            """, _segment_row(transcript_id, seq, segment))
+            if cursor.rowcount == 0:
+                continue  # already stored by an earlier attempt
+            
+            inserted += 1
+            if segment.get("type") == "transcript":
+                if segment.get("role") == "user":
+                    user_messages += 1
+                elif segment.get("role") == "assistant":
+                    assistant_messages += 1
+            if segment.get("secondsSinceStart") is not None:
+                call_duration = max(call_duration, segment["secondsSinceStart"])
+        
+        if inserted:
+            conn.execute("""
+                UPDATE transcripts
+                SET segment_count = segment_count + ?,
+                    user_messages = user_messages + ?,
+                    assistant_messages = assistant_messages + ?,
+                    call_duration = ?,
+                    last_appended_at = ?
+                WHERE id = ?
+            """, (inserted, user_messages, assistant_messages, call_duration, datetime.now().isoformat(), transcript_id))
+    
+    return {
+        "segment_count": state["segment_count"] + inserted,
+        "user_messages": state["user_messages"] + user_messages,
+        "assistant_messages": state["assistant_messages"] + assistant_messages,
+        "call_duration": call_duration,
+        "rating_status": state["rating_status"],
+        "inserted": inserted
+    }
+
+
+def close_transcript_session(transcript_id: int, metadata: Optional[Dict[str, Any]] = None) -> Optional[bool]:
+    """
+    Close a transcript session so it can be rated.
+    
+    The counters are already up to date, so this is a single update regardless
+    of the transcript's length.
+    
+    Args:
+        transcript_id: The ID of the session's transcript
+        metadata: Optional metadata merged into the metadata given when the session was opened
+    
+    Returns:
+        True if the session was closed now (its rating_status is now 'pending'),
+        False if it was already closed, or None if not found
+    """
+    metadata_json = json.dumps(metadata) if metadata else None
+    
+    with get_connection() as conn:
+        cursor = conn.execute("""
+            UPDATE transcripts
+            SET rating_status = 'pending',
+                metadata = CASE WHEN ? IS NULL THEN metadata ELSE json_patch(COALESCE(metadata, '{}'), ?) END
+            WHERE id = ? AND rating_status = 'recording'
+        """, (metadata_json, metadata_json, transcript_id))
+        
+        if cursor.rowcount > 0:
+            closed = True
+        else:
+            closed = None if _session_state(conn, transcript_id) is None else False
+    
+    if closed:
+        print(f"💾 Closed transcript session with ID: {transcript_id}")
+    return closed
+
+
+def close_idle_transcript_sessions(idle_seconds: float) -> List[int]:
+    """
+    Close sessions that have not received segments for a while (e.g. the final close request was lost).
+    
+    Abandoned sessions without any segments are deleted.
+    
+    Args:
+        idle_seconds: Seconds since the last append after which a session counts as abandoned
+    
+    Returns:
+        IDs of the closed sessions that have segments and should be rated
+    """
+    cutoff = (datetime.now() - timedelta(seconds=idle_seconds)).isoformat()
+    
+    with get_connection() as conn:
+        rows = conn.execute("""
+            SELECT id, segment_count
+            FROM transcripts
+            WHERE rating_status = 'recording' AND COALESCE(last_appended_at, created_at) < ?
+        """, (cutoff,)).fetchall()
+        
+        for transcript_id, segment_count in rows:
+            if segment_count:
+                conn.execute("UPDATE transcripts SET rating_status = 'pending' WHERE id = ?", (transcript_id,))
+            else:
+                conn.execute("DELETE FROM transcripts WHERE id = ?", (transcript_id,))
+    
+    return [transcript_id for transcript_id, segment_count in rows if segment_count]
+
+
+def get_transcript_segments_after(transcript_id: int, after_seq: int = -1) -> List[Tuple[int, Dict[str, Any]]]:
+    """
+    Retrieve the segments of a transcript that follow a sequence number.
+    
+    Args:
+        transcript_id: The ID of the transcript
+        after_seq: Only segments with a higher seq are returned (-1 for all)
+    
+    Returns:
+        (seq, segment) pairs in order
+    """
+    with get_connection() as conn:
+        rows = conn.execute("""
+            SELECT type, role, text, timestamp, seconds, extra, seq
+            FROM transcript_segments
+            WHERE transcript_id = ? AND seq > ?
+            ORDER BY seq
+        """, (transcript_id, after_seq)).fetchall()
+    
+    return list(zip((row[6] for row in rows), _segments_from_rows(rows)))
+
+
+def get_transcripts_due_for_summary(min_new_segments: int) -> List[int]:
+    """
+    Get open sessions with enough segments that their running summary does not cover yet.
+    
+    Args:
+        min_new_segments: Uncovered segments needed before a session is summarized again
+    
+    Returns:
+        Transcript IDs, the ones furthest behind first
+    """
+    with get_connection() as conn:
+        rows = conn.execute("""
+            SELECT id, segment_count - covered AS uncovered
+            FROM (
+                SELECT t.id, t.segment_count,
+                       -- a summary invalidated by a late segment (see get_transcript_summary) covers nothing
+                       CASE WHEN s.segment_count = (SELECT COUNT(*) FROM transcript_segments
+                                                    WHERE transcript_id = t.id AND seq <= s.through_seq)
+                            THEN s.segment_count ELSE 0 END AS covered
+                FROM transcripts t
+                LEFT JOIN transcript_summaries s ON s.transcript_id = t.id
+                WHERE t.rating_status = 'recording'
+            )
+            WHERE uncovered >= ?
+            ORDER BY uncovered DESC
+        """, (min_new_segments,)).fetchall()
+    
+    return [row[0] for row in rows]
+
+
+def get_transcript_summary(transcript_id: int) -> Optional[Dict[str, Any]]:
+    """
+    Retrieve the running summary of a transcript.
+    
+    A summary covers every segment up to its through_seq. If a segment with a
+    lower seq was stored after the summary was made (a late retry), the summary
+    no longer describes that range and is not returned.
+    
+    Args:
+        transcript_id: The ID of the transcript
+    
+    Returns:
+        Dictionary with summary, through_seq, segment_count, model and updated_at,
+        or None if there is no usable summary
+    """
+    with get_connection() as conn:
+        row = conn.execute("""
+            SELECT s.summary, s.through_seq, s.segment_count, s.model, s.updated_at,
+                   (SELECT COUNT(*) FROM transcript_segments
+                    WHERE transcript_id = s.transcript_id AND seq <= s.through_seq)
+            FROM transcript_summaries s
+            WHERE s.transcript_id = ?
+        """, (transcript_id,)).fetchone()
+    
+    if not row or row[5] != row[2]:
+        return None
+    
+    return {
+        "summary": json.loads(row[0]),
+        "through_seq": row[1],
+        "segment_count": row[2],
+        "model": row[3],
+        "updated_at": row[4]
+    }
+
+
+def save_transcript_summary(
+    transcript_id: int,
+    through_seq: int,
+    segment_count: int,
+    summary: Dict[str, Any],
+    model: Optional[str] = None
+):
+    """
+    Store the running summary of a transcript, replacing the previous one.
+    
+    Args:
+        transcript_id: The ID of the transcript
+        through_seq: Highest segment seq the summary covers
+        segment_count: Number of segments the summary covers
+        summary: The summary (RunningSummary as a dictionary)
+        model: Name of the model that produced it
+    """
+    with get_connection() as conn:
+        conn.execute("""
+            INSERT OR REPLACE INTO transcript_summaries
+            (transcript_id, through_seq, segment_count, summary, model, updated_at)
+            VALUES (?, ?, ?, ?, ?, ?)
+        """, (transcript_id, through_seq, segment_count, json.dumps(summary), model, datetime.now().isoformat()))
+
+
+def _transcript_from_row(row: tuple, segments: Optional[List[Dict[str, Any]]]) -> Dict[str, Any]:
+    """
+    Convert a transcripts row (_TRANSCRIPT_COLUMNS) into the API dictionary shape.
+    
+    Without segments, the dictionary has a segment_count instead of the transcript.
+    """
+    transcript: Dict[str, Any] = {"id": row[0]}
+    if segments is not None:
+        transcript["transcript"] = segments
+    transcript.update({
+        "call_duration": row[1],
+        "user_messages": row[2],
+        "assistant_messages": row[3],
+        "metadata": json.loads(row[4]) if row[4] else None,
+        "ratings": json.loads(row[5]) if row[5] else None,
+        "rated_at": row[6],
+        "created_at": row[7],
+        "rating_status": row[8] or ("complete" if row[5] else "pending")
+    })
+    if segments is None:
+        transcript["segment_count"] = row[9]
+    return transcript
+
+
+def _load_segments(
+    conn: sqlite3.Connection,
+    transcript_id: int,
+    start_seconds: Optional[float] = None,
+    end_seconds: Optional[float] = None
+) -> List[Dict[str, Any]]:
+    """Load the segments of one transcript in order, optionally only those within a time window."""
+    clauses = ["transcript_id = ?"]
+    params: List[Any] = [transcript_id]
+    if start_seconds is not None:
+        clauses.append("seconds >= ?")
+        params.append(start_seconds)
+    if end_seconds is not None:
+        clauses.append("seconds < ?")
+        params.append(end_seconds)
+    
+    rows = conn.execute(f"""
+        SELECT type, role, text, timestamp, seconds, extra
+        FROM transcript_segments
+        WHERE {" AND ".join(clauses)}
+        ORDER BY seq
+    """, params).fetchall()
+    
+    return _segments_from_rows(rows)
+
+
+def _load_segments_for(conn: sqlite3.Connection, transcript_ids: List[int]) -> Dict[int, List[Dict[str, Any]]]:
+    """Load the segments of several transcripts, a few hundred transcripts per query."""
+    segments: Dict[int, List[Dict[str, Any]]] = {transcript_id: [] for transcript_id in transcript_ids}
+    
+    for start in range(0, len(transcript_ids), 500):
+        chunk = transcript_ids[start:start + 500]
+        placeholders = ",".join("?" * len(chunk))
+        rows = conn.execute(f"""
+            SELECT type, role, text, timestamp, seconds, extra, transcript_id
+            FROM transcript_segments
+            WHERE transcript_id IN ({placeholders})
+            ORDER BY transcript_id, seq
+        """, chunk).fetchall()
+        
+        for transcript_id, group in groupby(rows, key=itemgetter(6)):
+            segments[transcript_id] = _segments_from_rows(list(group))
+    
+    return segments
+
+
+def get_transcript(
+    transcript_id: int,
+    start_seconds: Optional[float] = None,
+    end_seconds: Optional[float] = None
+) -> Optional[Dict[str, Any]]:
     """
     Retrieve a transcript by ID.
     
     Args:
         transcript_id: The ID of the transcript to retrieve
+        start_seconds: Only include segments at or after this many seconds into the call
+        end_seconds: Only include segments before this many seconds into the call
     
     Returns:
         Dictionary containing transcript data or None if not found
     """
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
+    with get_connection() as conn:
+        row = conn.execute(f"""
+            SELECT {_TRANSCRIPT_COLUMNS}
+            FROM transcripts
+            WHERE id = ?
+        """, (transcript_id,)).fetchone()
+        
+        if not row:
+            return None
+        
+        segments = _load_segments(conn, transcript_id, start_seconds, end_seconds)
     
-    cursor.execute("""
-        SELECT id, transcript_data, call_duration, user_messages, assistant_messages, 
-               metadata, ratings, rated_at, created_at
-        FROM transcripts
-        WHERE id = ?
-    """, (transcript_id,))
+    return _transcript_from_row(row, segments)
+
+
+def get_transcript_metadata(transcript_id: int) -> Optional[Dict[str, Any]]:
+    """
+    Retrieve a transcript without its segments.
     
-    row = cursor.fetchone()
-    conn.close()
+    Args:
+        transcript_id: The ID of the transcript to retrieve
+    
+    Returns:
+        Dictionary with counts, metadata, ratings and segment_count, or None if not found
+    """
+    with get_connection() as conn:
+        row = conn.execute(f"""
+            SELECT {_TRANSCRIPT_COLUMNS}
+            FROM transcripts
+            WHERE id = ?
+        """, (transcript_id,)).fetchone()
     
     if not row:
         return None
     
-    return {
-        "id": row[0],
-        "transcript": json.loads(row[1]),
-        "call_duration": row[2],
-        "user_messages": row[3],
-        "assistant_messages": row[4],
-        "metadata": json.loads(row[5]) if row[5] else None,
-        "ratings": json.loads(row[6]) if row[6] else None,
-        "rated_at": row[7],
-        "created_at": row[8]
-    }
+    return _transcript_from_row(row, None)
 
 
 def get_all_transcripts() -> List[Dict[str, Any]]:
@@ -177,34 +845,192 @@ def get_all_transcripts() -> List[Dict[str, Any]]:
     Returns:
         List of transcript dictionaries
     """
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
+    with get_connection() as conn:
+        rows = conn.execute(f"""
+            SELECT {_TRANSCRIPT_COLUMNS}
+            FROM transcripts
+            ORDER BY id DESC
+        """).fetchall()
+        
+        segments = _load_segments_for(conn, [row[0] for row in rows])
     
-    cursor.execute("""
-        SELECT id, transcript_data, call_duration, user_messages, assistant_messages, 
-               metadata, ratings, rated_at, created_at
-        FROM transcripts
-        ORDER BY id DESC
-    """)
+    return [_transcript_from_row(row, segments[row[0]]) for row in rows]
+
+
+def list_transcripts(
+    before_id: Optional[int] = None,
+    limit: int = 50,
+    view: str = "summary",
+    session_id: Optional[str] = None,
+    user_id: Optional[str] = None
+) -> List[Dict[str, Any]]:
+    """
+    Retrieve one page of transcripts, newest first, using keyset pagination.
+    
+    The summary view never reads the transcript segments: it returns counts,
+    timestamps, metadata and the three letter grades (extracted in SQL). The full
+    view loads the segments of the whole page in one query.
     
-    rows = cursor.fetchall()
-    conn.close()
+    Args:
+        before_id: Only return transcripts with an ID lower than this (the last ID of the previous page)
+        limit: Maximum number of transcripts to return
+        view: 'summary' or 'full' (full includes the transcript segments and ratings)
+        session_id: Only return transcripts whose metadata.sessionId matches
+        user_id: Only return transcripts whose metadata.userId matches
     
-    transcripts = []
-    for row in rows:
-        transcripts.append({
+    Returns:
+        List of transcript dictionaries
+    """
+    clauses = []
+    params: List[Any] = []
+    if before_id is not None:
+        clauses.append("id < ?")
+        params.append(before_id)
+    if session_id is not None:
+        clauses.append("json_extract(metadata, '$.sessionId') = ?")
+        params.append(session_id)
+    if user_id is not None:
+        clauses.append("json_extract(metadata, '$.userId') = ?")
+        params.append(user_id)
+    where = "WHERE " + " AND ".join(clauses) if clauses else ""
+    params.append(limit)
+    
+    if view == "full":
+        with get_connection() as conn:
+            rows = conn.execute(f"""
+                SELECT {_TRANSCRIPT_COLUMNS}
+                FROM transcripts
+                {where}
+                ORDER BY id DESC
+                LIMIT ?
+            """, params).fetchall()
+            
+            segments = _load_segments_for(conn, [row[0] for row in rows])
+        
+        return [_transcript_from_row(row, segments[row[0]]) for row in rows]
+    
+    with get_connection() as conn:
+        rows = conn.execute(f"""
+            SELECT id, call_duration, user_messages, assistant_messages, metadata,
+                   created_at, rated_at, rating_status, ratings IS NOT NULL,
+                   json_extract(ratings, '$.communication_grade'),
+                   json_extract(ratings, '$.problem_solving_grade'),
+                   json_extract(ratings, '$.implementation_grade')
+            FROM transcripts
+            {where}
+            ORDER BY id DESC
+            LIMIT ?
+        """, params).fetchall()
+    
+    return [
+        {
             "id": row[0],
-            "transcript": json.loads(row[1]),
-            "call_duration": row[2],
-            "user_messages": row[3],
-            "assistant_messages": row[4],
-            "metadata": json.loads(row[5]) if row[5] else None,
-            "ratings": json.loads(row[6]) if row[6] else None,
-            "rated_at": row[7],
-            "created_at": row[8]
-        })
+            "call_duration": row[1],
+            "user_messages": row[2],
+            "assistant_messages": row[3],
+            "metadata": json.loads(row[4]) if row[4] else None,
+            "created_at": row[5],
+            "rated_at": row[6],
+            "rating_status": row[7] or ("complete" if row[8] else "pending"),
+            "grades": {
+                "communication_grade": row[9],
+                "problem_solving_grade": row[10],
+                "implementation_grade": row[11]
+            } if row[8] else None
+        }
+        for row in rows
+    ]
+
+
+def get_transcript_totals(session_id: Optional[str] = None, user_id: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Count transcripts and sum their call durations without reading them.
+    
+    Args:
+        session_id: Only count transcripts whose metadata.sessionId matches
+        user_id: Only count transcripts whose metadata.userId matches
     
-    return transcripts
+    Returns:
+        Dictionary with count, total_duration and average_duration (seconds)
+    """
+    clauses = []
+    params: List[Any] = []
+    if session_id is not None:
+        clauses.append("json_extract(metadata, '$.sessionId') = ?")
+        params.append(session_id)
+    if user_id is not None:
+        clauses.append("json_extract(metadata, '$.userId') = ?")
+        params.append(user_id)
+    where = "WHERE " + " AND ".join(clauses) if clauses else ""
+    
+    with get_connection() as conn:
+        count, total_duration = conn.execute(f"""
+            SELECT COUNT(*), COALESCE(SUM(call_duration), 0)
+            FROM transcripts
+            {where}
+        """, params).fetchone()
+    
+    return {
+        "count": count,
+        "total_duration": total_duration,
+        "average_duration": total_duration / count if count else 0
+    }
+
+
+def iter_transcripts(
+    after_id: Optional[int] = None,
+    since: Optional[str] = None,
+    until: Optional[str] = None,
+    batch_size: int = 500
+) -> Iterator[Dict[str, Any]]:
+    """
+    Stream full transcripts in ID order without materializing the table.
+    
+    Rows are read with fetchmany on a dedicated connection (a long-running
+    export must not hold the calling thread's pooled connection), so memory use
+    is bounded by batch_size regardless of table size. The segments of each
+    batch are loaded with one query.
+    
+    Args:
+        after_id: Only yield transcripts with a higher ID (resume point of an earlier export)
+        since: Only yield transcripts created at or after this ISO timestamp
+        until: Only yield transcripts created before this ISO timestamp
+        batch_size: Number of rows fetched per round trip
+    
+    Yields:
+        Transcript dictionaries, oldest first
+    """
+    clauses = []
+    params: List[Any] = []
+    if after_id is not None:
+        clauses.append("id > ?")
+        params.append(after_id)
+    if since is not None:
+        clauses.append("created_at >= ?")
+        params.append(since)
+    if until is not None:
+        clauses.append("created_at < ?")
+        params.append(until)
+    where = "WHERE " + " AND ".join(clauses) if clauses else ""
+    
+    conn = _connect()
+    try:
+        cursor = conn.execute(f"""
+            SELECT {_TRANSCRIPT_COLUMNS}
+            FROM transcripts
+            {where}
+            ORDER BY id
+        """, params)
+        
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                break
+            segments = _load_segments_for(conn, [row[0] for row in rows])
+            for row in rows:
+                yield _transcript_from_row(row, segments[row[0]])
+    finally:
+        conn.close()
 
 
 def get_latest_transcript() -> Optional[Dict[str, Any]]:
@@ -214,89 +1040,254 @@ def get_latest_transcript() -> Optional[Dict[str, Any]]:
     Returns:
         Dictionary containing transcript data or None if no transcripts exist
     """
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
+    with get_connection() as conn:
+        row = conn.execute(f"""
+            SELECT {_TRANSCRIPT_COLUMNS}
+            FROM transcripts
+            ORDER BY id DESC
+            LIMIT 1
+        """).fetchone()
+        
+        if not row:
+            return None
+        
+        segments = _load_segments(conn, row[0])
     
-    cursor.execute("""
-        SELECT id, transcript_data, call_duration, user_messages, assistant_messages, 
-               metadata, ratings, rated_at, created_at
-        FROM transcripts
-        ORDER BY id DESC
-        LIMIT 1
-    """)
+    return _transcript_from_row(row, segments)
+
+
+def delete_transcript(transcript_id: int) -> bool:
+    """
+    Delete a transcript by ID.
+    
+    Args:
+        transcript_id: The ID of the transcript to delete
+    
+    Returns:
+        True if deleted, False if not found
+    """
+    with get_connection() as conn:
+        cursor = conn.execute("DELETE FROM transcripts WHERE id = ?", (transcript_id,))
+        deleted = cursor.rowcount > 0
+        conn.execute("DELETE FROM transcript_segments WHERE transcript_id = ?", (transcript_id,))
+        conn.execute("DELETE FROM improvement_points WHERE transcript_id = ?", (transcript_id,))
+        conn.execute("DELETE FROM transcript_summaries WHERE transcript_id = ?", (transcript_id,))
+    
+    return deleted
+
+
+def save_ratings(transcript_id: int, ratings: Dict[str, Any]) -> bool:
+    """
+    Save ratings for a transcript.
     
-    row = cursor.fetchone()
-    conn.close()
+    Args:
+        transcript_id: The ID of the transcript to rate
+        ratings: Dictionary containing the rating data
+    
+    Returns:
+        True if successful, False if transcript not found
+    """
+    ratings_json = json.dumps(ratings)
+    rated_at = datetime.now().isoformat()
+    
+    with get_connection() as conn:
+        cursor = conn.execute("""
+            UPDATE transcripts
+            SET ratings = ?, rated_at = ?, rating_status = 'complete'
+            WHERE id = ?
+        """, (ratings_json, rated_at, transcript_id))
+        
+        updated = cursor.rowcount > 0
+    
+    if updated:
+        print(f"💾 Saved ratings for transcript ID: {transcript_id}")
+    
+    return updated
+
+
+def set_rating_status(transcript_id: int, rating_status: str) -> bool:
+    """
+    Update the rating status of a transcript.
+    
+    Args:
+        transcript_id: The ID of the transcript
+        rating_status: 'pending', 'complete' or 'failed'
+    
+    Returns:
+        True if successful, False if transcript not found
+    """
+    with get_connection() as conn:
+        cursor = conn.execute("""
+            UPDATE transcripts
+            SET rating_status = ?
+            WHERE id = ?
+        """, (rating_status, transcript_id))
+        
+        updated = cursor.rowcount > 0
+    
+    return updated
+
+
+def requeue_rating(transcript_id: int) -> Optional[str]:
+    """
+    Mark a transcript as waiting to be rated again.
+    
+    Only a transcript whose rating failed, or that is still pending without
+    ratings, can be requeued; rated transcripts and open sessions are left alone.
+    
+    Args:
+        transcript_id: The ID of the transcript
+    
+    Returns:
+        'pending' if it was requeued, its current rating status if it cannot be,
+        or None if not found
+    """
+    with get_connection() as conn:
+        cursor = conn.execute("""
+            UPDATE transcripts
+            SET rating_status = 'pending'
+            WHERE id = ? AND ratings IS NULL AND COALESCE(rating_status, 'pending') IN ('pending', 'failed')
+        """, (transcript_id,))
+        
+        if cursor.rowcount > 0:
+            return "pending"
+        
+        row = conn.execute("SELECT rating_status, ratings FROM transcripts WHERE id = ?", (transcript_id,)).fetchone()
     
     if not row:
         return None
-    
-    return {
-        "id": row[0],
-        "transcript": json.loads(row[1]),
-        "call_duration": row[2],
-        "user_messages": row[3],
-        "assistant_messages": row[4],
-        "metadata": json.loads(row[5]) if row[5] else None,
-        "ratings": json.loads(row[6]) if row[6] else None,
-        "rated_at": row[7],
-        "created_at": row[8]
-    }
+    return row[0] or ("complete" if row[1] else "pending")
 
 
-def delete_transcript(transcript_id: int) -> bool:
+def get_pending_rating_ids() -> List[int]:
     """
-    Delete a transcript by ID.
+    Get the IDs of transcripts still waiting to be rated.
     
-    Args:
-        transcript_id: The ID of the transcript to delete
+    Transcripts saved before rating statuses existed count as pending if unrated.
     
     Returns:
-        True if deleted, False if not found
+        List of transcript IDs, oldest first
     """
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    
-    cursor.execute("DELETE FROM transcripts WHERE id = ?", (transcript_id,))
-    deleted = cursor.rowcount > 0
+    with get_connection() as conn:
+        rows = conn.execute("""
+            SELECT id
+            FROM transcripts
+            WHERE ratings IS NULL AND COALESCE(rating_status, 'pending') = 'pending'
+            ORDER BY id
+        """).fetchall()
+    
+    return [row[0] for row in rows]
+
+
+def get_improvement_points(transcript_id: int, cache_key: str) -> Optional[List[str]]:
+    """
+    Retrieve stored improvement points for a transcript.
     
-    conn.commit()
-    conn.close()
+    Args:
+        transcript_id: The ID of the transcript
+        cache_key: Content hash of the input the points were generated from
     
-    return deleted
+    Returns:
+        List of improvement points or None if none were stored for this key
+    """
+    with get_connection() as conn:
+        row = conn.execute("""
+            SELECT points
+            FROM improvement_points
+            WHERE transcript_id = ? AND cache_key = ?
+        """, (transcript_id, cache_key)).fetchone()
+    
+    return json.loads(row[0]) if row else None
 
 
-def save_ratings(transcript_id: int, ratings: Dict[str, Any]) -> bool:
+def save_improvement_points(transcript_id: int, cache_key: str, points: List[str], model: Optional[str] = None):
     """
-    Save ratings for a transcript.
+    Store generated improvement points for a transcript, replacing any with the same key.
     
     Args:
-        transcript_id: The ID of the transcript to rate
-        ratings: Dictionary containing the rating data
+        transcript_id: The ID of the transcript
+        cache_key: Content hash of the input the points were generated from
+        points: The generated improvement points
+        model: Name of the model that generated them
+    """
+    with get_connection() as conn:
+        conn.execute("""
+            INSERT OR REPLACE INTO improvement_points
+            (transcript_id, cache_key, points, model, created_at)
+            VALUES (?, ?, ?, ?, ?)
+        """, (transcript_id, cache_key, json.dumps(points), model, datetime.now().isoformat()))
+
+
+def _insert_problem(
+    cursor: sqlite3.Cursor,
+    title: str,
+    description: str,
+    difficulty: str,
+    details: Dict[str, Any],
+    source: str = "socratic",
+    leetcode_slug: Optional[str] = None,
+    starter_codes: Optional[Dict[str, str]] = None,
+    tags: Optional[List[str]] = None
+) -> Tuple[int, bool]:
+    """
+    Insert a problem with its snippets and tags inside the caller's transaction.
     
     Returns:
-        True if successful, False if transcript not found
+        Tuple of (problem ID, whether a new row was created)
     """
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    
-    ratings_json = json.dumps(ratings)
-    rated_at = datetime.now().isoformat()
+    details_json = json.dumps(details)
+    created_at = datetime.now().isoformat()
+    last_fetched_at = datetime.now().isoformat() if source == "leetcode" else None
     
+    # Insert problem (a LeetCode slug that is already saved is left untouched)
     cursor.execute("""
-        UPDATE transcripts
-        SET ratings = ?, rated_at = ?
-        WHERE id = ?
-    """, (ratings_json, rated_at, transcript_id))
-    
-    updated = cursor.rowcount > 0
-    conn.commit()
-    conn.close()
-    
-    if updated:
-        print(f"💾 Saved ratings for transcript ID: {transcript_id}")
-    
-    return updated
+        INSERT INTO problems 
+        (source, leetcode_slug, title, description, details, difficulty, created_at, last_fetched_at)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        ON CONFLICT(leetcode_slug) DO NOTHING
+    """, (source, leetcode_slug, title, description, details_json, difficulty, created_at, last_fetched_at))
+    
+    if cursor.rowcount == 0:
+        # Another request or worker saved this slug first - reuse its row
+        cursor.execute("SELECT id FROM problems WHERE leetcode_slug = ?", (leetcode_slug,))
+        return cursor.fetchone()[0], False
+    
+    problem_id = cursor.lastrowid
+    
+    if problem_id is None:
+        raise Exception("Failed to get problem ID")
+    
+    # Insert starter code snippets
+    if starter_codes:
+        cursor.executemany("""
+            INSERT INTO starter_code_snippets (problem_id, language, code)
+            VALUES (?, ?, ?)
+        """, [(problem_id, language, code) for language, code in starter_codes.items()])
+    
+    # Insert tags
+    if tags:
+        _link_tags(cursor, problem_id, tags)
+    
+    return problem_id, True
+
+
+def _link_tags(cursor: sqlite3.Cursor, problem_id: int, tags: List[str]):
+    """Link a problem to tags by name, creating tags that don't exist yet."""
+    for tag_name in tags:
+        # Insert tag if it doesn't exist
+        cursor.execute("""
+            INSERT OR IGNORE INTO tags (name) VALUES (?)
+        """, (tag_name,))
+        
+        # Get tag ID
+        cursor.execute("SELECT id FROM tags WHERE name = ?", (tag_name,))
+        tag_id = cursor.fetchone()[0]
+        
+        # Link problem to tag
+        cursor.execute("""
+            INSERT OR IGNORE INTO problem_tags (problem_id, tag_id)
+            VALUES (?, ?)
+        """, (problem_id, tag_id))
 
 
 def save_problem(
@@ -322,157 +1313,463 @@ def save_problem(
         starter_codes: Dictionary of language -> starter code
         tags: List of tag names
     
+    Saving is idempotent per LeetCode slug: if the slug already exists, nothing is
+    written and the existing problem's ID is returned.
+    
     Returns:
-        The ID of the newly created problem record
+        The ID of the newly created (or already saved) problem record
     """
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
+    with get_connection() as conn:
+        problem_id, created = _insert_problem(
+            conn.cursor(), title, description, difficulty, details,
+            source, leetcode_slug, starter_codes, tags
+        )
+        if created:
+            _materialize_payloads(conn, [problem_id])
     
-    try:
-        details_json = json.dumps(details)
-        created_at = datetime.now().isoformat()
-        last_fetched_at = datetime.now().isoformat() if source == "leetcode" else None
+    if not created:
+        print(f"💾 Problem '{leetcode_slug}' already saved with ID: {problem_id}")
+        return problem_id
+    
+    _invalidate_problem_ids()
+    invalidate_problem_cache(problem_id)
+    print(f"💾 Saved problem '{title}' with ID: {problem_id}")
+    return problem_id
+
+
+def save_problems(problems: List[Dict[str, Any]]) -> List[Tuple[Optional[int], Optional[str]]]:
+    """
+    Save many problems in a single transaction.
+    
+    Each problem is written under its own savepoint, so one that fails (e.g. a
+    constraint violation) is rolled back alone and the rest are still saved.
+    
+    Args:
+        problems: List of dictionaries with the keyword arguments of save_problem
+    
+    Returns:
+        (problem_id, error) per problem, in input order: the ID (the existing one
+        for slugs that were already saved) and None, or None and the error message
+    """
+    results: List[Tuple[Optional[int], Optional[str]]] = []
+    created_ids = []
+    
+    with get_connection() as conn:
+        cursor = conn.cursor()
+        if not conn.in_transaction:
+            # Releasing the first savepoint would otherwise commit
+            cursor.execute("BEGIN")
+        for problem in problems:
+            cursor.execute("SAVEPOINT save_problem")
+            try:
+                problem_id, created = _insert_problem(cursor, **problem)
+            except Exception as e:
+                cursor.execute("ROLLBACK TO save_problem")
+                results.append((None, str(e)))
+            else:
+                results.append((problem_id, None))
+                if created:
+                    created_ids.append(problem_id)
+            cursor.execute("RELEASE save_problem")
         
-        # Insert problem
+        cursor.execute("SAVEPOINT save_problem_payloads")
+        try:
+            _materialize_payloads(conn, created_ids)
+        except Exception as e:
+            # Missing payloads are built on first read
+            cursor.execute("ROLLBACK TO save_problem_payloads")
+            print(f"⚠️  Failed to build problem payloads, deferring to first read: {str(e)}")
+        cursor.execute("RELEASE save_problem_payloads")
+    
+    saved_ids = [problem_id for problem_id, _ in results if problem_id is not None]
+    _invalidate_problem_ids()
+    for problem_id in saved_ids:
+        invalidate_problem_cache(problem_id)
+    
+    print(f"💾 Saved {len(saved_ids)} problems in one transaction ({len(results) - len(saved_ids)} failed)")
+    return results
+
+
+def refresh_problem(
+    problem_id: int,
+    title: str,
+    description: str,
+    difficulty: str,
+    details: Dict[str, Any],
+    starter_codes: Optional[Dict[str, str]] = None,
+    tags: Optional[List[str]] = None
+) -> bool:
+    """
+    Update a saved problem in place with freshly scraped content.
+    
+    Starter code snippets and tags are diffed against what is stored: unchanged
+    rows are kept, changed snippets are updated, and only languages or tags that
+    appeared or disappeared are inserted or removed. last_fetched_at is reset.
+    
+    Args:
+        problem_id: The ID of the problem to update
+        title: Problem title
+        description: Problem description
+        difficulty: Problem difficulty (Easy/Medium/Hard)
+        details: JSON object containing examples, constraints, etc.
+        starter_codes: Dictionary of language -> starter code
+        tags: List of tag names
+    
+    Returns:
+        True if successful, False if problem not found
+    """
+    starter_codes = starter_codes or {}
+    tags = tags or []
+    
+    with get_connection() as conn:
+        cursor = conn.cursor()
         cursor.execute("""
-            INSERT INTO problems 
-            (source, leetcode_slug, title, description, details, difficulty, created_at, last_fetched_at)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-        """, (source, leetcode_slug, title, description, details_json, difficulty, created_at, last_fetched_at))
-        
-        problem_id = cursor.lastrowid
-        
-        if problem_id is None:
-            raise Exception("Failed to get problem ID")
-        
-        # Insert starter code snippets
-        if starter_codes:
-            for language, code in starter_codes.items():
-                cursor.execute("""
-                    INSERT INTO starter_code_snippets (problem_id, language, code)
-                    VALUES (?, ?, ?)
-                """, (problem_id, language, code))
-        
-        # Insert tags
-        if tags:
-            for tag_name in tags:
-                # Insert tag if it doesn't exist
-                cursor.execute("""
-                    INSERT OR IGNORE INTO tags (name) VALUES (?)
-                """, (tag_name,))
-                
-                # Get tag ID
-                cursor.execute("SELECT id FROM tags WHERE name = ?", (tag_name,))
-                tag_id = cursor.fetchone()[0]
-                
-                # Link problem to tag
-                cursor.execute("""
-                    INSERT INTO problem_tags (problem_id, tag_id)
-                    VALUES (?, ?)
-                """, (problem_id, tag_id))
-        
-        conn.commit()
-        print(f"💾 Saved problem '{title}' with ID: {problem_id}")
-        return problem_id
+            UPDATE problems
+            SET title = ?, description = ?, details = ?, difficulty = ?, last_fetched_at = ?
+            WHERE id = ?
+        """, (title, description, json.dumps(details), difficulty, datetime.now().isoformat(), problem_id))
         
-    except Exception as e:
-        conn.rollback()
-        raise e
-    finally:
-        conn.close()
+        if cursor.rowcount == 0:
+            return False
+        
+        # Diff starter code snippets by language (duplicate languages are dropped)
+        seen_languages = set()
+        stale_snippet_ids = []
+        changed_snippets = []
+        for snippet_id, language, code in cursor.execute("""
+            SELECT id, language, code
+            FROM starter_code_snippets
+            WHERE problem_id = ?
+            ORDER BY id
+        """, (problem_id,)).fetchall():
+            if language not in starter_codes or language in seen_languages:
+                stale_snippet_ids.append((snippet_id,))
+            elif starter_codes[language] != code:
+                changed_snippets.append((starter_codes[language], snippet_id))
+            seen_languages.add(language)
+        
+        cursor.executemany("DELETE FROM starter_code_snippets WHERE id = ?", stale_snippet_ids)
+        cursor.executemany("UPDATE starter_code_snippets SET code = ? WHERE id = ?", changed_snippets)
+        cursor.executemany("""
+            INSERT INTO starter_code_snippets (problem_id, language, code)
+            VALUES (?, ?, ?)
+        """, [
+            (problem_id, language, code)
+            for language, code in starter_codes.items()
+            if language not in seen_languages
+        ])
+        
+        # Diff tags by name
+        current_tags = dict(cursor.execute("""
+            SELECT t.name, t.id
+            FROM problem_tags pt
+            JOIN tags t ON t.id = pt.tag_id
+            WHERE pt.problem_id = ?
+        """, (problem_id,)).fetchall())
+        
+        cursor.executemany("""
+            DELETE FROM problem_tags WHERE problem_id = ? AND tag_id = ?
+        """, [(problem_id, tag_id) for name, tag_id in current_tags.items() if name not in tags])
+        _link_tags(cursor, problem_id, [name for name in tags if name not in current_tags])
+        
+        _materialize_payloads(conn, [problem_id])
+    
+    _invalidate_problem_ids()
+    invalidate_problem_cache(problem_id)
+    print(f"🔄 Refreshed problem '{title}' (ID: {problem_id})")
+    return True
 
 
-def get_problem_by_id(problem_id: int) -> Optional[Dict[str, Any]]:
+def get_problem_ids_by_slugs(leetcode_slugs: List[str]) -> Dict[str, int]:
     """
-    Retrieve a problem by ID with all related data.
+    Look up which LeetCode slugs are already saved.
     
     Args:
-        problem_id: The ID of the problem to retrieve
+        leetcode_slugs: LeetCode slugs to check
     
     Returns:
-        Dictionary containing problem data with starter codes and tags
+        Dictionary of slug -> problem ID for the slugs that exist
+    """
+    found: Dict[str, int] = {}
+    
+    with get_connection() as conn:
+        # Chunked to stay well below SQLite's bound-parameter limit
+        for start in range(0, len(leetcode_slugs), 500):
+            chunk = leetcode_slugs[start:start + 500]
+            placeholders = ", ".join("?" for _ in chunk)
+            for slug, problem_id in conn.execute(f"""
+                SELECT leetcode_slug, id
+                FROM problems
+                WHERE leetcode_slug IN ({placeholders})
+            """, chunk):
+                found[slug] = problem_id
+    
+    return found
+
+
+def _load_problems(conn: sqlite3.Connection, where: str = "", params: tuple = ()) -> List[Dict[str, Any]]:
     """
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
+    Load problems with their starter codes and tags using three set-based queries.
     
-    # Get problem data
-    cursor.execute("""
+    The problems, their snippets and their tags are each fetched in one query
+    filtered by the same WHERE clause, then stitched together in memory, so the
+    number of round trips does not grow with the number of problems.
+    
+    Args:
+        conn: Connection to run the queries on
+        where: Optional SQL WHERE clause over the problems table (e.g. "WHERE id = ?")
+        params: Parameters bound to the WHERE clause
+    
+    Returns:
+        List of problem dictionaries ordered by ID
+    """
+    problems: Dict[int, Dict[str, Any]] = {}
+    
+    for row in conn.execute(f"""
         SELECT id, source, leetcode_slug, title, description, details, 
                difficulty, created_at, last_fetched_at
         FROM problems
-        WHERE id = ?
-    """, (problem_id,))
+        {where}
+        ORDER BY id
+    """, params):
+        problems[row[0]] = {
+            "id": row[0],
+            "source": row[1],
+            "leetcode_slug": row[2],
+            "title": row[3],
+            "description": row[4],
+            "details": json.loads(row[5]),
+            "difficulty": row[6],
+            "created_at": row[7],
+            "last_fetched_at": row[8],
+            "starter_codes": {},
+            "tags": []
+        }
     
-    row = cursor.fetchone()
-    if not row:
-        conn.close()
-        return None
+    if not problems:
+        return []
     
-    problem = {
-        "id": row[0],
-        "source": row[1],
-        "leetcode_slug": row[2],
-        "title": row[3],
-        "description": row[4],
-        "details": json.loads(row[5]),
-        "difficulty": row[6],
-        "created_at": row[7],
-        "last_fetched_at": row[8]
-    }
+    selected_ids = f"SELECT id FROM problems {where}"
     
     # Get starter code snippets
-    cursor.execute("""
-        SELECT language, code
+    for problem_id, language, code in conn.execute(f"""
+        SELECT problem_id, language, code
         FROM starter_code_snippets
-        WHERE problem_id = ?
-    """, (problem_id,))
-    
-    starter_codes = {}
-    for lang_row in cursor.fetchall():
-        starter_codes[lang_row[0]] = lang_row[1]
-    problem["starter_codes"] = starter_codes
+        WHERE problem_id IN ({selected_ids})
+        ORDER BY problem_id, id
+    """, params):
+        problems[problem_id]["starter_codes"][language] = code
     
     # Get tags
-    cursor.execute("""
-        SELECT t.name
-        FROM tags t
-        JOIN problem_tags pt ON t.id = pt.tag_id
-        WHERE pt.problem_id = ?
-    """, (problem_id,))
+    for problem_id, tag_name in conn.execute(f"""
+        SELECT pt.problem_id, t.name
+        FROM problem_tags pt
+        JOIN tags t ON t.id = pt.tag_id
+        WHERE pt.problem_id IN ({selected_ids})
+        ORDER BY pt.problem_id, pt.tag_id
+    """, params):
+        problems[problem_id]["tags"].append(tag_name)
+    
+    return list(problems.values())
+
+
+def _materialize_payloads(conn: sqlite3.Connection, problem_ids: List[int]):
+    """
+    Build and store the serialized API payloads of problems inside the caller's transaction.
+    
+    Args:
+        conn: Connection whose transaction the problems were written in
+        problem_ids: IDs of the problems whose payloads should be (re)built
+    """
+    created_at = datetime.now().isoformat()
+    rows = []
+    
+    # Chunked to stay well below SQLite's bound-parameter limit
+    for start in range(0, len(problem_ids), 500):
+        chunk = problem_ids[start:start + 500]
+        placeholders = ", ".join("?" for _ in chunk)
+        for problem in _load_problems(conn, f"WHERE id IN ({placeholders})", tuple(chunk)):
+            for kind, build in problem_payloads.PAYLOAD_BUILDERS.items():
+                body = problem_payloads.serialize_payload(build(problem))
+                rows.append((problem["id"], kind, body, problem_payloads.payload_etag(body), created_at))
+    
+    conn.executemany("""
+        INSERT OR REPLACE INTO problem_payloads (problem_id, kind, body, etag, created_at)
+        VALUES (?, ?, ?, ?, ?)
+    """, rows)
+
+
+def get_problem_payload(problem_id: int, kind: str) -> Optional[Tuple[bytes, str, Dict[str, Any]]]:
+    """
+    Get the serialized API response for a problem, ready to send as-is.
     
-    tags = [tag_row[0] for tag_row in cursor.fetchall()]
-    problem["tags"] = tags
+    Payloads are built when a problem is saved or refreshed; problems saved
+    before payloads existed get theirs built on first read. Served from the
+    in-process problem cache when possible.
     
-    conn.close()
-    return problem
+    Args:
+        problem_id: The ID of the problem
+        kind: problem_payloads.PROBLEM or problem_payloads.INTERVIEW
+    
+    Returns:
+        Tuple of (JSON body, ETag, problem info with id, source, leetcode_slug and
+        last_fetched_at), or None if the problem doesn't exist
+    """
+    key = ("payload", kind, problem_id)
+    payload = _get_cached(key)
+    if payload is not None:
+        return payload
+    
+    query = """
+        SELECT pp.body, pp.etag, p.source, p.leetcode_slug, p.last_fetched_at
+        FROM problems p
+        LEFT JOIN problem_payloads pp ON pp.problem_id = p.id AND pp.kind = ?
+        WHERE p.id = ?
+    """
+    
+    with get_connection() as conn:
+        row = conn.execute(query, (kind, problem_id)).fetchone()
+        if row is None:
+            return None
+        if row[0] is None:
+            _materialize_payloads(conn, [problem_id])
+            row = conn.execute(query, (kind, problem_id)).fetchone()
+    
+    payload = (bytes(row[0]), row[1], {
+        "id": problem_id,
+        "source": row[2],
+        "leetcode_slug": row[3],
+        "last_fetched_at": row[4]
+    })
+    with _problem_cache_lock:
+        _problem_cache[key] = payload
+    return payload
 
 
-def get_problem_by_leetcode_slug(leetcode_slug: str) -> Optional[Dict[str, Any]]:
+def _cache_problems(problems: List[Dict[str, Any]]):
+    """Store freshly loaded problems in the problem cache."""
+    with _problem_cache_lock:
+        for problem in problems:
+            _problem_cache[("id", problem["id"])] = problem
+            if problem["leetcode_slug"]:
+                _problem_cache[("slug", problem["leetcode_slug"])] = problem["id"]
+
+
+def _get_cached(key: tuple) -> Any:
+    """Look up a problem cache entry, recording a hit or miss."""
+    with _problem_cache_lock:
+        value = _problem_cache.get(key)
+        if value is None:
+            _problem_cache.misses += 1
+        else:
+            _problem_cache.hits += 1
+        return value
+
+
+def _get_cached_by_slug(leetcode_slug: str) -> Tuple[Optional[int], Optional[Dict[str, Any]]]:
     """
-    Retrieve a problem by LeetCode slug.
+    Look up a problem through its slug entry, recording one hit or miss for both entries.
+    
+    Returns:
+        (problem_id, problem): the ID if the slug is cached, and the problem if it is cached too
+    """
+    with _problem_cache_lock:
+        problem_id = _problem_cache.get(("slug", leetcode_slug))
+        problem = _problem_cache.get(("id", problem_id)) if problem_id is not None else None
+        if problem is None:
+            _problem_cache.misses += 1
+        else:
+            _problem_cache.hits += 1
+        return problem_id, problem
+
+
+def invalidate_problem_cache(problem_id: int):
+    """
+    Drop a problem from the in-process cache.
     
     Args:
-        leetcode_slug: The LeetCode slug (e.g., 'two-sum')
+        problem_id: The ID of the problem whose cached data changed
+    """
+    with _problem_cache_lock:
+        problem = _problem_cache.pop(("id", problem_id), None)
+        if problem and problem["leetcode_slug"]:
+            _problem_cache.pop(("slug", problem["leetcode_slug"]), None)
+        for kind in problem_payloads.PAYLOAD_BUILDERS:
+            _problem_cache.pop(("payload", kind, problem_id), None)
+
+
+def get_problem_cache_stats() -> Dict[str, Any]:
+    """
+    Get counters for the in-process problem cache.
     
     Returns:
-        Dictionary containing problem data or None if not found
+        Dictionary with size, limits and hit/miss/eviction counters
     """
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
+    with _problem_cache_lock:
+        lookups = _problem_cache.hits + _problem_cache.misses
+        return {
+            "size": _problem_cache.currsize,
+            "max_size": _problem_cache.maxsize,
+            "ttl_seconds": _problem_cache.ttl,
+            "hits": _problem_cache.hits,
+            "misses": _problem_cache.misses,
+            "hit_rate": round(_problem_cache.hits / lookups, 4) if lookups else None,
+            "evictions": _problem_cache.evictions,
+            "expirations": _problem_cache.expirations
+        }
+
+
+def get_problem_by_id(problem_id: int) -> Optional[Dict[str, Any]]:
+    """
+    Retrieve a problem by ID with all related data.
     
-    cursor.execute("""
-        SELECT id
-        FROM problems
-        WHERE leetcode_slug = ?
-    """, (leetcode_slug,))
+    Served from the in-process problem cache when possible.
     
-    row = cursor.fetchone()
-    conn.close()
+    Args:
+        problem_id: The ID of the problem to retrieve
     
-    if not row:
-        return None
+    Returns:
+        Dictionary containing problem data with starter codes and tags
+    """
+    problem = _get_cached(("id", problem_id))
+    if problem is not None:
+        return problem
+    return _load_problem_by_id(problem_id)
+
+
+def _load_problem_by_id(problem_id: int) -> Optional[Dict[str, Any]]:
+    """Load a problem that missed the cache and cache it."""
+    with get_connection() as conn:
+        problems = _load_problems(conn, "WHERE id = ?", (problem_id,))
+    
+    _cache_problems(problems)
+    return problems[0] if problems else None
+
+
+def get_problem_by_leetcode_slug(leetcode_slug: str) -> Optional[Dict[str, Any]]:
+    """
+    Retrieve a problem by LeetCode slug.
+    
+    Served from the in-process problem cache when possible.
     
-    return get_problem_by_id(row[0])
+    Args:
+        leetcode_slug: The LeetCode slug (e.g., 'two-sum')
+    
+    Returns:
+        Dictionary containing problem data or None if not found
+    """
+    problem_id, problem = _get_cached_by_slug(leetcode_slug)
+    if problem is not None:
+        return problem
+    if problem_id is not None:
+        # The slug entry outlived the problem's entry
+        return _load_problem_by_id(problem_id)
+    
+    with get_connection() as conn:
+        problems = _load_problems(conn, "WHERE leetcode_slug = ?", (leetcode_slug,))
+    
+    _cache_problems(problems)
+    return problems[0] if problems else None
 
 
 def update_problem_last_fetched(problem_id: int) -> bool:
@@ -485,24 +1782,47 @@ def update_problem_last_fetched(problem_id: int) -> bool:
     Returns:
         True if successful, False if problem not found
     """
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    
     last_fetched_at = datetime.now().isoformat()
     
-    cursor.execute("""
-        UPDATE problems
-        SET last_fetched_at = ?
-        WHERE id = ?
-    """, (last_fetched_at, problem_id))
-    
-    updated = cursor.rowcount > 0
-    conn.commit()
-    conn.close()
+    with get_connection() as conn:
+        cursor = conn.execute("""
+            UPDATE problems
+            SET last_fetched_at = ?
+            WHERE id = ?
+        """, (last_fetched_at, problem_id))
+        
+        updated = cursor.rowcount > 0
     
+    invalidate_problem_cache(problem_id)
     return updated
 
 
+def record_problem_accesses(accesses: Dict[int, str]) -> int:
+    """
+    Store the latest access time of many problems in one transaction.
+    
+    Access times only move forward, so flushes from several workers can land in
+    any order. The problem cache is left untouched since it doesn't hold them.
+    
+    Args:
+        accesses: Dictionary of problem ID -> ISO timestamp of its latest access
+    
+    Returns:
+        Number of problems updated
+    """
+    if not accesses:
+        return 0
+    
+    with get_connection() as conn:
+        cursor = conn.executemany("""
+            UPDATE problems
+            SET last_accessed_at = ?
+            WHERE id = ? AND (last_accessed_at IS NULL OR last_accessed_at < ?)
+        """, [(accessed_at, problem_id, accessed_at) for problem_id, accessed_at in accesses.items()])
+        
+        return cursor.rowcount
+
+
 def get_all_problems() -> List[Dict[str, Any]]:
     """
     Retrieve all problems from the database (both socratic and leetcode sources).
@@ -510,57 +1830,94 @@ def get_all_problems() -> List[Dict[str, Any]]:
     Returns:
         List of dictionaries containing problem data with starter codes and tags
     """
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
+    with get_connection() as conn:
+        return _load_problems(conn)
+
+
+def _invalidate_problem_ids():
+    """Drop the cached ID lists used by get_random_problem."""
+    with _problem_ids_lock:
+        _problem_ids_cache.clear()
+
+
+def pick_random_problem_id(
+    difficulty: Optional[str] = None,
+    tag: Optional[str] = None,
+    source: Optional[str] = None
+) -> Optional[int]:
+    """
+    Pick the ID of a random problem, optionally filtered.
     
-    # Get all problems
-    cursor.execute("""
-        SELECT id, source, leetcode_slug, title, description, details, 
-               difficulty, created_at, last_fetched_at
-        FROM problems
-    """)
+    The IDs matching each filter are cached in memory, so a pick costs one
+    MAX(id) lookup regardless of pool size.
     
-    problems = []
-    for row in cursor.fetchall():
-        problem = {
-            "id": row[0],
-            "source": row[1],
-            "leetcode_slug": row[2],
-            "title": row[3],
-            "description": row[4],
-            "details": json.loads(row[5]),
-            "difficulty": row[6],
-            "created_at": row[7],
-            "last_fetched_at": row[8]
-        }
-        
-        # Get starter code snippets
-        cursor.execute("""
-            SELECT language, code
-            FROM starter_code_snippets
-            WHERE problem_id = ?
-        """, (row[0],))
-        
-        starter_codes = {}
-        for lang_row in cursor.fetchall():
-            starter_codes[lang_row[0]] = lang_row[1]
-        problem["starter_codes"] = starter_codes
-        
-        # Get tags
-        cursor.execute("""
-            SELECT t.name
-            FROM tags t
-            JOIN problem_tags pt ON t.id = pt.tag_id
-            WHERE pt.problem_id = ?
-        """, (row[0],))
+    Args:
+        difficulty: Only pick problems of this difficulty (Easy/Medium/Hard)
+        tag: Only pick problems with this tag name (case-insensitive)
+        source: Only pick problems from this source ('socratic' or 'leetcode')
+    
+    Returns:
+        A problem ID or None if no problem matches
+    """
+    clauses = []
+    params: List[Any] = []
+    if difficulty:
+        clauses.append("difficulty = ?")
+        params.append(difficulty.capitalize())
+    if source:
+        clauses.append("source = ?")
+        params.append(source.lower())
+    if tag:
+        clauses.append("""id IN (
+            SELECT pt.problem_id
+            FROM problem_tags pt
+            JOIN tags t ON t.id = pt.tag_id
+            WHERE t.name = ? COLLATE NOCASE
+        )""")
+        params.append(tag)
+    where = "WHERE " + " AND ".join(clauses) if clauses else ""
+    cache_key = (difficulty and difficulty.capitalize(), source and source.lower(), tag and tag.lower())
+    
+    with get_connection() as conn:
+        stamp = conn.execute("SELECT MAX(id) FROM problems").fetchone()[0]
         
-        tags = [tag_row[0] for tag_row in cursor.fetchall()]
-        problem["tags"] = tags
+        with _problem_ids_lock:
+            cached = _problem_ids_cache.get(cache_key)
         
-        problems.append(problem)
+        if cached is not None and cached[0] == stamp:
+            problem_ids = cached[1]
+        else:
+            problem_ids = [row[0] for row in conn.execute(f"SELECT id FROM problems {where}", params)]
+            with _problem_ids_lock:
+                _problem_ids_cache[cache_key] = (stamp, problem_ids)
+    
+    if not problem_ids:
+        return None
+    
+    return random.choice(problem_ids)
+
+
+def get_random_problem(
+    difficulty: Optional[str] = None,
+    tag: Optional[str] = None,
+    source: Optional[str] = None
+) -> Optional[Dict[str, Any]]:
+    """
+    Pick a random problem, optionally filtered, and load only that problem.
     
-    conn.close()
-    return problems
+    Args:
+        difficulty: Only pick problems of this difficulty (Easy/Medium/Hard)
+        tag: Only pick problems with this tag name (case-insensitive)
+        source: Only pick problems from this source ('socratic' or 'leetcode')
+    
+    Returns:
+        Dictionary containing problem data or None if no problem matches
+    """
+    problem_id = pick_random_problem_id(difficulty=difficulty, tag=tag, source=source)
+    if problem_id is None:
+        return None
+    
+    return get_problem_by_id(problem_id)
 
 
 def migrate_hardcoded_problems():
@@ -672,16 +2029,12 @@ def migrate_hardcoded_problems():
         }
     ]
     
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    
     # Check if any socratic problems already exist
-    cursor.execute("SELECT COUNT(*) FROM problems WHERE source = 'socratic'")
-    count = cursor.fetchone()[0]
+    with get_connection() as conn:
+        count = conn.execute("SELECT COUNT(*) FROM problems WHERE source = 'socratic'").fetchone()[0]
     
     if count > 0:
         print(f"✅ Socratic problems already migrated ({count} found)")
-        conn.close()
         return
     
     print("🔄 Migrating hardcoded Socratic problems to database...")
@@ -704,7 +2057,6 @@ def migrate_hardcoded_problems():
         except Exception as e:
             print(f"  ❌ Failed to migrate {problem['title']}: {e}")
     
-    conn.close()
     print(f"✅ Migration complete! {migrated_count}/{len(SOCRATIC_PROBLEMS)} problems migrated")
 
 
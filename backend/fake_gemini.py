@@ -0,0 +1,292 @@
+"""
+Local stand-in for the Gemini API.
+
+FakeGeminiClient mimics the parts of google-genai's Client used by
+GeminiRatingService (client.models.generate_content and
+client.aio.models.generate_content). It answers with schema-valid JSON after a
+simulated latency, can inject 429/503 errors, and records call and concurrency
+statistics, so rating throughput and the concurrency limits can be exercised
+offline. Enable it for the whole backend with GEMINI_FAKE=1.
+
+Run this module directly for offline load tests:
+    python fake_gemini.py load [concurrent_ratings]
+    python fake_gemini.py compare [interviews]
+    python fake_gemini.py incremental [interviews]
+"""
+
+import asyncio
+import enum
+import json
+import os
+import random
+import threading
+import time
+import typing
+from typing import Any, Dict, Optional, Type
+from pydantic import BaseModel
+from google.genai import errors as genai_errors
+
+
+# Simulated model behaviour
+FAKE_GEMINI_LATENCY = float(os.getenv("GEMINI_FAKE_LATENCY", "0.5"))  # seconds per call
+FAKE_GEMINI_ERROR_RATE = float(os.getenv("GEMINI_FAKE_ERROR_RATE", "0"))  # fraction of calls failing with 429/503
+FAKE_GEMINI_LATENCY_PER_1K_CHARS = float(os.getenv("GEMINI_FAKE_LATENCY_PER_1K_CHARS", "0"))  # extra seconds per 1,000 prompt characters
+
+
+class FakeResponse:
+    """Minimal stand-in for GenerateContentResponse"""
+    
+    def __init__(self, text: str):
+        self.text = text
+
+
+def fake_value(annotation: Any) -> Any:
+    """Build a placeholder value that validates against a type annotation."""
+    origin = typing.get_origin(annotation)
+    if origin is typing.Union:
+        args = [arg for arg in typing.get_args(annotation) if arg is not type(None)]
+        return fake_value(args[0]) if args else None
+    if origin in (list, typing.List):
+        (item_type,) = typing.get_args(annotation) or (str,)
+        return [fake_value(item_type) for _ in range(3)]
+    if origin in (dict, typing.Dict):
+        return {}
+    if isinstance(annotation, type):
+        if issubclass(annotation, BaseModel):
+            return fake_payload(annotation)
+        if issubclass(annotation, enum.Enum):
+            return random.choice(list(annotation)).value
+        if issubclass(annotation, bool):
+            return False
+        if issubclass(annotation, int):
+            return random.randint(1, 5)
+        if issubclass(annotation, float):
+            return round(random.random(), 2)
+    return "Placeholder feedback from the fake Gemini model."
+
+
+def fake_payload(schema: Type[BaseModel]) -> Dict[str, Any]:
+    """Build a dictionary that validates against a pydantic response schema."""
+    return {name: fake_value(field.annotation) for name, field in schema.model_fields.items()}
+
+
+class _FakeModels:
+    """Implements generate_content for both the sync and async surfaces"""
+    
+    def __init__(self, client: "FakeGeminiClient"):
+        self._client = client
+    
+    def generate_content(self, *, model: str, contents: Any, config: Optional[dict] = None) -> FakeResponse:
+        self._client._begin(contents)
+        try:
+            time.sleep(self._client.latency_for(contents))
+            return self._client._respond(config)
+        finally:
+            self._client._end()
+
+
+class _FakeAsyncModels(_FakeModels):
+    async def generate_content(self, *, model: str, contents: Any, config: Optional[dict] = None) -> FakeResponse:
+        self._client._begin(contents)
+        try:
+            await asyncio.sleep(self._client.latency_for(contents))
+            return self._client._respond(config)
+        finally:
+            self._client._end()
+
+
+class _FakeAio:
+    def __init__(self, client: "FakeGeminiClient"):
+        self.models = _FakeAsyncModels(client)
+
+
+class FakeGeminiClient:
+    """Offline replacement for google.genai.Client"""
+    
+    def __init__(
+        self,
+        latency: float = FAKE_GEMINI_LATENCY,
+        error_rate: float = FAKE_GEMINI_ERROR_RATE,
+        latency_per_1k_chars: float = FAKE_GEMINI_LATENCY_PER_1K_CHARS
+    ):
+        self.latency = latency
+        self.error_rate = error_rate
+        self.latency_per_1k_chars = latency_per_1k_chars
+        self.models = _FakeModels(self)
+        self.aio = _FakeAio(self)
+        
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.errors = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.prompt_chars = 0
+    
+    def latency_for(self, contents: Any) -> float:
+        """Simulated response time for a prompt: fixed latency plus a share proportional to its length."""
+        return self.latency + len(str(contents)) / 1000 * self.latency_per_1k_chars
+    
+    def _begin(self, contents: Any):
+        with self._lock:
+            self.calls += 1
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+            self.prompt_chars += len(str(contents))
+    
+    def _end(self):
+        with self._lock:
+            self.in_flight -= 1
+    
+    def _respond(self, config: Optional[dict]) -> FakeResponse:
+        if self.error_rate and random.random() < self.error_rate:
+            with self._lock:
+                self.errors += 1
+            code = random.choice([429, 503])
+            error_class = genai_errors.ClientError if code < 500 else genai_errors.ServerError
+            raise error_class(code, {"error": {"code": code, "message": "Simulated error", "status": "UNAVAILABLE"}})
+        
+        schema = (config or {}).get("response_schema")
+        if schema is None:
+            return FakeResponse("Placeholder response from the fake Gemini model.")
+        return FakeResponse(json.dumps(fake_payload(schema)))
+    
+    def stats(self) -> Dict[str, Any]:
+        """Call counters collected so far."""
+        with self._lock:
+            return {
+                "calls": self.calls,
+                "errors": self.errors,
+                "in_flight": self.in_flight,
+                "max_in_flight": self.max_in_flight,
+                "prompt_chars": self.prompt_chars
+            }
+
+
+def _sample_transcript(utterances: int = 200) -> list:
+    """Synthetic transcript for offline runs."""
+    return [{"type": "call-start", "timestamp": "", "secondsSinceStart": 0}] + [
+        {
+            "type": "transcript",
+            "role": "user" if i % 2 else "assistant",
+            "text": f"Utterance number {i} about the hash map approach.",
+            "timestamp": "",
+            "secondsSinceStart": i * 4.0
+        }
+        for i in range(1, utterances)
+    ]
+
+
+async def run_load_test(concurrent_ratings: int = 50):
+    """Rate many transcripts concurrently and report throughput and observed concurrency."""
+    from gemini_rating_service import GeminiRatingService, GEMINI_MAX_CONCURRENCY
+    
+    transcript = _sample_transcript()
+    client = FakeGeminiClient()
+    service = GeminiRatingService(client=client)
+    started = time.perf_counter()
+    results = await asyncio.gather(
+        *(service.rate_transcript_async(transcript) for _ in range(concurrent_ratings)),
+        return_exceptions=True
+    )
+    elapsed = time.perf_counter() - started
+    failures = sum(1 for result in results if isinstance(result, Exception))
+    
+    print(f"📊 {concurrent_ratings} ratings in {elapsed:.2f}s "
+          f"({concurrent_ratings / elapsed:.1f}/s, {failures} failed)")
+    print(f"   Concurrency limit: {GEMINI_MAX_CONCURRENCY}, observed max in flight: {client.max_in_flight}")
+    print(f"   Fake model stats: {client.stats()}")
+
+
+async def run_mode_comparison(interviews: int = 20):
+    """Compare the two-call (rate + improvements) path with the combined single call."""
+    from gemini_rating_service import GeminiRatingService
+    
+    transcript = _sample_transcript()
+    
+    async def separate(service):
+        await service.rate_transcript_async(transcript)
+        await service.generate_improvement_points_async(transcript)
+    
+    async def combined(service):
+        await service.assess_transcript_async(transcript)
+    
+    for mode, flow in (("separate", separate), ("combined", combined)):
+        client = FakeGeminiClient()
+        service = GeminiRatingService(client=client, rating_mode=mode)
+        started = time.perf_counter()
+        await asyncio.gather(*(flow(service) for _ in range(interviews)))
+        elapsed = time.perf_counter() - started
+        
+        print(f"📊 {mode:8s}: {client.calls / interviews:.1f} calls/interview, "
+              f"{client.prompt_chars // interviews} prompt chars/interview, "
+              f"{elapsed / interviews * 1000:.0f} ms/interview wall time ({interviews} interviews)")
+
+
+async def run_incremental_comparison(interviews: int = 10, utterances: int = 300, summary_every: int = 20):
+    """
+    Compare the time from call end to rating for full-transcript and incremental rating.
+    
+    In the incremental path the transcript is summarized every summary_every
+    segments during the call (not timed, like the rating queue's summary pass);
+    the last summary is a random 1..summary_every segments before the end. The
+    fake model's notes are padded to 2,000 characters, the length the 300-word
+    cap allows, so the final prompt is not understated.
+    """
+    from gemini_rating_service import GeminiRatingService, TranscriptRating
+    
+    metadata = {"problemTitle": "Two Sum", "problemType": "Easy", "language": "python"}
+    full_client, final_client, summary_client = FakeGeminiClient(), FakeGeminiClient(), FakeGeminiClient(latency=0)
+    full_service = GeminiRatingService(client=full_client, rating_mode="separate")
+    final_service = GeminiRatingService(client=final_client, rating_mode="separate", incremental=True)
+    summary_service = GeminiRatingService(client=summary_client, rating_mode="separate", incremental=True)
+    full_times, incremental_times = [], []
+    
+    for _ in range(interviews):
+        transcript = _sample_transcript(utterances)
+        
+        started = time.perf_counter()
+        rating = await full_service.rate_transcript_async(transcript, metadata)
+        full_times.append(time.perf_counter() - started)
+        
+        covered = len(transcript) - random.randint(1, summary_every)
+        summary = None
+        for start in range(0, covered, summary_every):
+            summary = await summary_service.summarize_transcript_async(
+                transcript[start:min(start + summary_every, covered)],
+                metadata,
+                summary.notes if summary else None
+            )
+            summary.notes = summary.notes.ljust(2000, ".")
+        
+        delta = transcript[covered:]
+        started = time.perf_counter()
+        rating = await final_service.rate_transcript_async(delta, metadata, summary.notes)
+        incremental_times.append(time.perf_counter() - started)
+        assert isinstance(rating, TranscriptRating)
+    
+    print(f"📊 {interviews} interviews of {utterances} segments "
+          f"(fake latency {FAKE_GEMINI_LATENCY}s + {FAKE_GEMINI_LATENCY_PER_1K_CHARS}s per 1,000 prompt chars)")
+    print(f"   full transcript: {full_client.prompt_chars // interviews:>7,} prompt chars at call end, "
+          f"{sum(full_times) / interviews * 1000:.0f} ms call end to rating")
+    print(f"   incremental:     {final_client.prompt_chars // interviews:>7,} prompt chars at call end, "
+          f"{sum(incremental_times) / interviews * 1000:.0f} ms call end to rating")
+    print(f"   during the call: {summary_client.calls / interviews:.1f} summary calls, "
+          f"{summary_client.prompt_chars // interviews:,} prompt chars per interview")
+
+
+# Offline load tests against the fake model:
+#   python fake_gemini.py load [concurrent_ratings]
+#   python fake_gemini.py compare [interviews]
+#   python fake_gemini.py incremental [interviews]
+if __name__ == "__main__":
+    import sys
+    
+    command = sys.argv[1] if len(sys.argv) > 1 else "load"
+    count = int(sys.argv[2]) if len(sys.argv) > 2 else None
+    
+    if command == "compare":
+        asyncio.run(run_mode_comparison(count or 20))
+    elif command == "incremental":
+        asyncio.run(run_incremental_comparison(count or 10))
+    else:
+        asyncio.run(run_load_test(count or 50))
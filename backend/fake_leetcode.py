@@ -0,0 +1,182 @@
+"""
+Local stand-in for the LeetCode GraphQL API.
+
+FakeLeetCodeServer answers the queries leetcode_scraper.py sends - the single
+getQuestionDetail query and the aliased batch query - after a simulated
+latency, and records request and concurrency statistics. The problem slug
+selects the behaviour:
+
+- missing-*: the question does not exist (null)
+- throttled-N-*: the first N requests asking for it get a 429
+- broken-N-*: the first N requests asking for it get a 503
+- partial-*: left out of batch responses (null plus an "errors" entry), found
+  when asked for alone
+- nobatch-*: any batch request asking for it fails with a 500
+- anything else: a generated question
+
+Serve it and point the backend at it:
+    python fake_leetcode.py serve [port]
+    LEETCODE_GRAPHQL_URL=http://127.0.0.1:8765/graphql uvicorn main:app
+
+`python -m bench.scraper` (from backend/) runs the async scraper against it.
+"""
+
+import asyncio
+import os
+import re
+import threading
+from collections import Counter
+from typing import Any, Dict, List, Optional, Tuple
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+
+
+# Simulated server behaviour
+FAKE_LEETCODE_LATENCY = float(os.getenv("LEETCODE_FAKE_LATENCY", "0.05"))  # seconds per request
+
+# "alias: question(titleSlug: $var)" selections; the single query has no alias
+_SELECTION_RE = re.compile(r'(?:(\w+)\s*:\s*)?question\s*\(\s*titleSlug\s*:\s*\$(\w+)\s*\)')
+_FAILURE_SLUG_RE = re.compile(r'(throttled|broken)-(\d+)-')
+
+_CONTENT = """<p>Given an array of integers <code>nums</code>&nbsp;and an integer <code>target</code>, return <em>indices of the two numbers such that they add up to <code>target</code></em> ({slug}).</p>
+
+<p>&nbsp;</p>
+<p><strong class="example">Example 1:</strong></p>
+
+<pre>
+<strong>Input:</strong> nums = [2,7,11,15], target = 9
+<strong>Output:</strong> [0,1]
+<strong>Explanation:</strong> Because nums[0] + nums[1] == 9, we return [0, 1].
+</pre>
+
+<p>&nbsp;</p>
+<p><strong>Constraints:</strong></p>
+
+<ul>
+	<li><code>2 &lt;= nums.length &lt;= 10<sup>4</sup></code></li>
+	<li><strong>Only one valid answer exists.</strong></li>
+</ul>
+"""
+
+
+def fake_question(slug: str) -> Dict[str, Any]:
+    """Build a `question` object with every field the scraper requests."""
+    title = " ".join(word.capitalize() for word in slug.split("-"))
+    return {
+        "questionId": str(abs(hash(slug)) % 100000),
+        "title": title,
+        "titleSlug": slug,
+        "content": _CONTENT.format(slug=slug),
+        "difficulty": "Easy",
+        "topicTags": [{"name": "Array"}, {"name": "Hash Table"}],
+        "codeSnippets": [
+            {"lang": "Python3", "langSlug": "python3", "code": "class Solution:\n    def twoSum(self, nums, target):\n        pass\n"},
+            {"lang": "Java", "langSlug": "java", "code": "class Solution {\n    public int[] twoSum(int[] nums, int target) {\n    }\n}\n"}
+        ],
+        "exampleTestcases": "[2,7,11,15]\n9",
+        "sampleTestCase": "[2,7,11,15]\n9"
+    }
+
+
+class FakeLeetCodeServer:
+    """Fake GraphQL endpoint (POST /graphql) with failure injection by slug"""
+    
+    def __init__(self, latency: float = FAKE_LEETCODE_LATENCY):
+        self.latency = latency
+        self._lock = threading.Lock()
+        self.reset()
+        self.app = Starlette(routes=[Route("/graphql", self._graphql, methods=["POST"])])
+    
+    def reset(self):
+        """Clear the statistics and the per-slug failure counters."""
+        with self._lock:
+            self.requests = 0
+            self.batch_requests = 0
+            self.single_requests = 0
+            self.statuses: Counter = Counter()
+            self.in_flight = 0
+            self.max_in_flight = 0
+            self._slug_requests: Counter = Counter()
+    
+    def requests_for(self, slug: str) -> int:
+        """Number of requests (single or batch) that asked for a slug."""
+        with self._lock:
+            return self._slug_requests[slug]
+    
+    def stats(self) -> Dict[str, Any]:
+        """Request counters."""
+        with self._lock:
+            return {
+                "requests": self.requests,
+                "batch_requests": self.batch_requests,
+                "single_requests": self.single_requests,
+                "statuses": dict(self.statuses),
+                "max_in_flight": self.max_in_flight
+            }
+    
+    def _failure_status(self, slugs: List[str]) -> Optional[int]:
+        """Status code the whole request fails with, if any (called with the lock held)."""
+        for slug in slugs:
+            match = _FAILURE_SLUG_RE.match(slug)
+            if match and self._slug_requests[slug] <= int(match.group(2)):
+                return 429 if match.group(1) == "throttled" else 503
+        if len(slugs) > 1 and any(slug.startswith("nobatch-") for slug in slugs):
+            return 500
+        return None
+    
+    async def _graphql(self, request: Request) -> JSONResponse:
+        payload = await request.json()
+        variables = payload.get("variables") or {}
+        selections: List[Tuple[str, str]] = [
+            (alias or "question", variables.get(variable, ""))
+            for alias, variable in _SELECTION_RE.findall(payload.get("query", ""))
+        ]
+        slugs = [slug for _, slug in selections]
+        
+        with self._lock:
+            self.requests += 1
+            if len(selections) > 1:
+                self.batch_requests += 1
+            else:
+                self.single_requests += 1
+            self._slug_requests.update(slugs)
+            status = self._failure_status(slugs)
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        
+        try:
+            await asyncio.sleep(self.latency)
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+                self.statuses[status or 200] += 1
+        
+        if status is not None:
+            return JSONResponse({"errors": [{"message": f"Fake error {status}"}]}, status_code=status)
+        
+        data: Dict[str, Any] = {}
+        errors = []
+        for alias, slug in selections:
+            if slug.startswith("missing-") or (len(selections) > 1 and slug.startswith("partial-")):
+                data[alias] = None
+                if slug.startswith("partial-"):
+                    errors.append({"message": "Fake partial failure", "path": [alias]})
+            else:
+                data[alias] = fake_question(slug)
+        
+        body: Dict[str, Any] = {"data": data}
+        if errors:
+            body["errors"] = errors
+        return JSONResponse(body)
+
+
+if __name__ == "__main__":
+    import sys
+    import uvicorn
+    
+    # python fake_leetcode.py serve [port]
+    port = int(sys.argv[2]) if len(sys.argv) > 2 else 8765
+    print(f"🧪 Fake LeetCode GraphQL API at http://127.0.0.1:{port}/graphql (latency {FAKE_LEETCODE_LATENCY}s)")
+    uvicorn.run(FakeLeetCodeServer().app, host="127.0.0.1", port=port, log_level="warning")
@@ -0,0 +1,51 @@
+"""
+Opt-in fast JSON serialization.
+
+With FAST_JSON=1 and orjson installed, the app renders every router's JSON
+responses with orjson (FastAPI's ORJSONResponse) instead of the standard
+library encoder, and the NDJSON export serializes its lines the same way.
+orjson is several times faster on large transcripts and produces equivalent
+JSON (compact, and UTF-8 rather than ASCII escapes). Without orjson, or with
+FAST_JSON unset, the standard JSONResponse is used.
+"""
+
+import json
+import os
+from typing import Any, Type, Union
+from fastapi.responses import JSONResponse
+
+try:
+    import orjson
+    from fastapi.responses import ORJSONResponse as FastJSONResponse
+    ORJSON_AVAILABLE = True
+except ImportError:
+    FastJSONResponse = JSONResponse
+    ORJSON_AVAILABLE = False
+
+
+# Render JSON responses with orjson when it is installed
+FAST_JSON = os.getenv("FAST_JSON", "0").lower() in ("1", "true", "yes")
+
+if FAST_JSON and not ORJSON_AVAILABLE:
+    print("⚠️  Warning: FAST_JSON is set but orjson is not installed - using the standard JSON encoder")
+
+FAST_JSON_ENABLED = FAST_JSON and ORJSON_AVAILABLE
+
+
+def get_json_response_class() -> Type[JSONResponse]:
+    """Response class for the app's JSON responses (pass as FastAPI's default_response_class)."""
+    return FastJSONResponse if FAST_JSON_ENABLED else JSONResponse
+
+
+def dumps(content: Any) -> str:
+    """Serialize a value to a compact JSON string with the configured encoder."""
+    if FAST_JSON_ENABLED:
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS).decode("utf-8")
+    return json.dumps(content)
+
+
+def loads(data: Union[bytes, str]) -> Any:
+    """Parse a JSON document with the configured decoder."""
+    if FAST_JSON_ENABLED:
+        return orjson.loads(data)
+    return json.loads(data)
@@ -3,9 +3,38 @@ Gemini AI service for rating interview transcripts.
 """
 import os
 import enum
-from typing import List, Optional
+import json
+import asyncio
+import hashlib
+from typing import List, Optional, Type
 from pydantic import BaseModel, Field
 from google import genai
+from google.genai import errors as genai_errors
+from tenacity import AsyncRetrying, retry_if_exception, stop_after_attempt, wait_random_exponential
+from transcript_compaction import compact_transcript, estimate_tokens, fit_lines_to_budget
+
+
+# Limits for the async Gemini path
+GEMINI_MAX_CONCURRENCY = int(os.getenv("GEMINI_MAX_CONCURRENCY", "4"))  # in-flight calls per process
+GEMINI_TIMEOUT_SECONDS = float(os.getenv("GEMINI_TIMEOUT_SECONDS", "60"))  # per attempt
+GEMINI_MAX_ATTEMPTS = int(os.getenv("GEMINI_MAX_ATTEMPTS", "4"))
+
+# Bump whenever the improvement prompt or schema changes, so stored results are regenerated
+IMPROVEMENT_PROMPT_VERSION = 2
+
+# 'separate': one call to rate at submit time and one for improvement points on demand
+# 'combined': a single call at submit time produces both, and both are stored
+GEMINI_RATING_MODE = os.getenv("GEMINI_RATING_MODE", "separate").lower()
+
+# Summarize transcript sessions while the call is running, so the final rating
+# only sends the running summary plus what was said since (see rating_queue.py)
+GEMINI_INCREMENTAL_RATING = os.getenv("GEMINI_INCREMENTAL_RATING", "0").lower() in ("1", "true", "yes")
+
+# Merge speech-to-text fragments and drop fillers and stale partials before formatting (see transcript_compaction.py)
+GEMINI_COMPACT_TRANSCRIPT = os.getenv("GEMINI_COMPACT_TRANSCRIPT", "1").lower() in ("1", "true", "yes")
+
+# Estimated tokens the formatted transcript may take; the oldest lines are left out beyond it (0 for no limit)
+GEMINI_TRANSCRIPT_TOKEN_BUDGET = int(os.getenv("GEMINI_TRANSCRIPT_TOKEN_BUDGET", "16000"))
 
 
 class Grade(str, enum.Enum):
@@ -47,25 +76,76 @@ class ImprovementPoints(BaseModel):
     )
 
 
+class InterviewAssessment(BaseModel):
+    """Rating and improvement points produced together by a single Gemini call"""
+    rating: TranscriptRating = Field(description="Grades and feedback for the interview")
+    improvements: ImprovementPoints = Field(description="Three specific and actionable improvement points")
+
+
+class RunningSummary(BaseModel):
+    """Notes on the part of an interview heard so far"""
+    notes: str = Field(description="Notes on the interview so far for the final evaluation: the approach, key decisions, code written, mistakes and how they were handled, with short quotes (at most 300 words)")
+
+
 class GeminiRatingService:
     """Service to rate interview transcripts using Gemini AI"""
-    
-    def __init__(self, api_key: Optional[str] = None):
-        """Initialize the Gemini client"""
+
+    def __init__(
+        self,
+        api_key: Optional[str] = None,
+        client=None,
+        rating_mode: str = GEMINI_RATING_MODE,
+        incremental: bool = GEMINI_INCREMENTAL_RATING,
+        compact: bool = GEMINI_COMPACT_TRANSCRIPT,
+        token_budget: int = GEMINI_TRANSCRIPT_TOKEN_BUDGET
+    ):
+        """
+        Initialize the Gemini client.
+        
+        Args:
+            api_key: Gemini API key (defaults to the GEMINI_API_KEY environment variable)
+            client: Pre-built client to use instead, e.g. fake_gemini.FakeGeminiClient
+            rating_mode: 'separate' or 'combined' (see GEMINI_RATING_MODE)
+            incremental: Summarize sessions during the call (see GEMINI_INCREMENTAL_RATING)
+            compact: Compact transcripts before formatting (see GEMINI_COMPACT_TRANSCRIPT)
+            token_budget: Estimated tokens a formatted transcript may take (see GEMINI_TRANSCRIPT_TOKEN_BUDGET)
+        """
+        if rating_mode not in ("separate", "combined"):
+            raise ValueError(f"Unknown rating mode '{rating_mode}', expected 'separate' or 'combined'")
+        
+        self.model = 'gemini-2.5-flash'
+        self.rating_mode = rating_mode
+        self.incremental = incremental
+        self.compact = compact
+        self.token_budget = token_budget
+        
+        if client is not None:
+            self.api_key = api_key
+            self.client = client
+            return
+        
         self.api_key = api_key or os.getenv("GEMINI_API_KEY")
         if not self.api_key:
             raise ValueError("GEMINI_API_KEY environment variable not set")
         
         self.client = genai.Client(api_key=self.api_key)
-        self.model = 'gemini-2.5-flash'
-    
-    def format_transcript_for_rating(self, transcript: List[dict], metadata: Optional[dict] = None) -> str:
+
+    def format_transcript_for_rating(
+        self,
+        transcript: List[dict],
+        metadata: Optional[dict] = None,
+        summary: Optional[str] = None
+    ) -> str:
         """
         Format transcript data into a readable string for Gemini.
         
+        Unless disabled, the segments are compacted first and the result is kept
+        within the service's token budget (see transcript_compaction.py).
+        
         Args:
             transcript: List of transcript segments
             metadata: Optional metadata about the interview
+            summary: Notes on the earlier part of the interview; transcript then holds only what followed
             
         Returns:
             Formatted string representation of the transcript
@@ -85,16 +165,26 @@ class GeminiRatingService:
                 formatted.append(f"Duration: {metadata['duration']:.1f} seconds")
             formatted.append("")
         
-        formatted.append("=== INTERVIEW TRANSCRIPT ===")
+        if summary:
+            formatted.append("=== NOTES ON THE EARLIER PART OF THE INTERVIEW ===")
+            formatted.append(summary)
+            formatted.append("")
+            formatted.append("=== INTERVIEW TRANSCRIPT (continued) ===")
+        else:
+            formatted.append("=== INTERVIEW TRANSCRIPT ===")
+        
+        if self.compact:
+            transcript = compact_transcript(transcript)
         
         # Format each transcript segment
+        lines = []
         for segment in transcript:
             seg_type = segment.get('type')
             
             if seg_type == 'call-start':
-                formatted.append("[INTERVIEW STARTED]")
+                lines.append("[INTERVIEW STARTED]")
             elif seg_type == 'call-end':
-                formatted.append(f"[INTERVIEW ENDED after {segment.get('secondsSinceStart', 0):.1f}s]")
+                lines.append(f"[INTERVIEW ENDED after {segment.get('secondsSinceStart', 0):.1f}s]")
             elif seg_type == 'transcript':
                 role = segment.get('role', 'unknown')
                 text = segment.get('text', '')
@@ -102,24 +192,21 @@ class GeminiRatingService:
                 
                 # Format as conversation
                 speaker = "INTERVIEWER" if role == "assistant" else "CANDIDATE"
-                formatted.append(f"[{seconds:6.1f}s] {speaker}: {text}")
+                lines.append(f"[{seconds:6.1f}s] {speaker}: {text}")
+        
+        # The context and notes always stay; the transcript gets what is left of the budget
+        if self.token_budget > 0:
+            remaining = max(1, self.token_budget - estimate_tokens("\n".join(formatted)))
+            lines = fit_lines_to_budget(lines, remaining)
+        formatted.extend(lines)
         
         return "\n".join(formatted)
 
-    def generate_improvement_points(self, transcript: List[dict], metadata: Optional[dict] = None) -> ImprovementPoints:
-        """
-        Generate 3 improvement points for an interview transcript using Gemini AI.
-        
-        Args:
-            transcript: List of transcript segments from the interview
-            metadata: Optional metadata about the interview
-            
-        Returns:
-            ImprovementPoints object with a list of suggestions.
-        """
+    def build_improvement_prompt(self, transcript: List[dict], metadata: Optional[dict] = None) -> str:
+        """Build the prompt asking Gemini for three improvement points."""
         formatted_transcript = self.format_transcript_for_rating(transcript, metadata)
         
-        prompt = f"""You are an expert technical interviewer providing feedback on a coding interview.
+        return f"""You are an expert technical interviewer providing feedback on a coding interview.
 Based on the following transcript, provide exactly three specific and actionable improvement points for the candidate.
 Focus on areas where they could have performed better in communication, problem-solving, or implementation.
 
@@ -127,44 +214,46 @@ Focus on areas where they could have performed better in communication, problem-
 
 Return a list of three strings, each being a concrete suggestion for improvement."""
 
-        try:
-            # Call Gemini API with structured output
-            response = self.client.models.generate_content(
-                model=self.model,
-                contents=prompt,
-                config={
-                    'response_mime_type': 'application/json',
-                    'response_schema': ImprovementPoints,
-                }
-            )
-            
-            # Parse the response
-            import json
-            if not response.text:
-                raise ValueError("Empty response from Gemini API for improvement points")
-            improvement_data = json.loads(response.text)
-            return ImprovementPoints(**improvement_data)
-            
-        except Exception as e:
-            print(f"Error generating improvement points with Gemini: {str(e)}")
-            raise
-
-    def rate_transcript(self, transcript: List[dict], metadata: Optional[dict] = None) -> TranscriptRating:
+    def improvement_cache_key(self, transcript: List[dict], metadata: Optional[dict] = None) -> str:
         """
-        Rate an interview transcript using Gemini AI.
+        Content hash identifying a set of improvement points.
         
-        Args:
-            transcript: List of transcript segments from the interview
-            metadata: Optional metadata about the interview
-            
-        Returns:
-            TranscriptRating object with grades and feedback
+        Covers the prompt version, the model and the formatted transcript, so stored
+        points are reused only for identical input - whether they came from
+        generate_improvement_points or a combined assess_transcript call.
         """
-        # Format the transcript
         formatted_transcript = self.format_transcript_for_rating(transcript, metadata)
+        digest = hashlib.sha256()
+        digest.update(f"{IMPROVEMENT_PROMPT_VERSION}\n{self.model}\n".encode())
+        digest.update(formatted_transcript.encode())
+        return digest.hexdigest()
+
+    def build_summary_prompt(self, transcript: List[dict], metadata: Optional[dict] = None, summary: Optional[str] = None) -> str:
+        """Build the prompt asking Gemini to extend the running summary of an interview in progress."""
+        formatted_transcript = self.format_transcript_for_rating(transcript, metadata, summary)
+        
+        return f"""You are an expert technical interviewer taking notes during a coding interview that is still in progress.
+
+{formatted_transcript}
+
+Rewrite the notes so they cover the whole interview so far, including the transcript above. Keep
+everything a final evaluation of communication, problem solving and implementation would need -
+the approach, key decisions, code written, mistakes and how they were handled - with short quotes,
+in at most 300 words."""
+
+    def build_rating_prompt(self, transcript: List[dict], metadata: Optional[dict] = None, summary: Optional[str] = None) -> str:
+        """
+        Build the prompt asking Gemini to grade the interview.
         
-        # Create the prompt
-        prompt = f"""You are an expert technical interviewer evaluating a coding interview transcript.
+        With a summary, the earlier part of the interview is given as the running
+        notes and the transcript holds only the segments that followed.
+        """
+        formatted_transcript = self.format_transcript_for_rating(transcript, metadata, summary)
+        intro = "You are an expert technical interviewer evaluating a coding interview transcript."
+        if summary:
+            intro += "\nThe earlier part of the interview is given as notes taken while it was running; the rest is verbatim."
+        
+        return f"""{intro}
 
 {formatted_transcript}
 
@@ -199,36 +288,243 @@ Also provide:
 
 Be constructive but honest in your assessment. Focus on specific examples from the transcript."""
 
+    def build_assessment_prompt(self, transcript: List[dict], metadata: Optional[dict] = None, summary: Optional[str] = None) -> str:
+        """Build the prompt asking Gemini for the rating and improvement points in one response."""
+        return self.build_rating_prompt(transcript, metadata, summary) + """
+
+Finally, provide exactly three specific and actionable improvement points for the candidate,
+focusing on where they could have performed better in communication, problem-solving, or implementation.
+
+Return the ratings under "rating" and the three improvement points under "improvements"."""
+
+    def _generate(self, prompt: str, schema: Type[BaseModel]) -> BaseModel:
+        """Call Gemini synchronously with structured output and parse the response."""
+        response = self.client.models.generate_content(
+            model=self.model,
+            contents=prompt,
+            config={
+                'response_mime_type': 'application/json',
+                'response_schema': schema,
+            }
+        )
+        return _parse_response(response, schema)
+
+    async def _generate_async(self, prompt: str, schema: Type[BaseModel]) -> BaseModel:
+        """
+        Call Gemini asynchronously with structured output and parse the response.
+        
+        Each attempt waits for a slot in the process-wide concurrency limit and is
+        bounded by GEMINI_TIMEOUT_SECONDS. Rate limits (429), server errors (5xx)
+        and timeouts are retried with jittered exponential backoff; the slot is
+        released while backing off.
+        """
+        async for attempt in AsyncRetrying(
+            stop=stop_after_attempt(GEMINI_MAX_ATTEMPTS),
+            wait=wait_random_exponential(multiplier=1, max=30),
+            retry=retry_if_exception(_is_retryable),
+            reraise=True
+        ):
+            with attempt:
+                # asyncio.timeout rather than wait_for, which can swallow a cancellation
+                # arriving as the call completes (and so hang RatingQueue.stop)
+                async with _get_semaphore(), asyncio.timeout(GEMINI_TIMEOUT_SECONDS):
+                    response = await self.client.aio.models.generate_content(
+                        model=self.model,
+                        contents=prompt,
+                        config={
+                            'response_mime_type': 'application/json',
+                            'response_schema': schema,
+                        }
+                    )
+                return _parse_response(response, schema)
+
+    def generate_improvement_points(self, transcript: List[dict], metadata: Optional[dict] = None) -> ImprovementPoints:
+        """
+        Generate 3 improvement points for an interview transcript using Gemini AI.
+        
+        Args:
+            transcript: List of transcript segments from the interview
+            metadata: Optional metadata about the interview
+            
+        Returns:
+            ImprovementPoints object with a list of suggestions.
+        """
+        prompt = self.build_improvement_prompt(transcript, metadata)
+
+        try:
+            return self._generate(prompt, ImprovementPoints)
+        except Exception as e:
+            print(f"Error generating improvement points with Gemini: {str(e)}")
+            raise
+
+    async def generate_improvement_points_async(self, transcript: List[dict], metadata: Optional[dict] = None) -> ImprovementPoints:
+        """
+        Async variant of generate_improvement_points that does not block the event loop.
+        
+        Args:
+            transcript: List of transcript segments from the interview
+            metadata: Optional metadata about the interview
+            
+        Returns:
+            ImprovementPoints object with a list of suggestions.
+        """
+        prompt = self.build_improvement_prompt(transcript, metadata)
+
         try:
-            # Call Gemini API with structured output
-            response = self.client.models.generate_content(
-                model=self.model,
-                contents=prompt,
-                config={
-                    'response_mime_type': 'application/json',
-                    'response_schema': TranscriptRating,
-                }
-            )
+            return await self._generate_async(prompt, ImprovementPoints)
+        except Exception as e:
+            print(f"Error generating improvement points with Gemini: {str(e)}")
+            raise
+
+    def rate_transcript(self, transcript: List[dict], metadata: Optional[dict] = None, summary: Optional[str] = None) -> TranscriptRating:
+        """
+        Rate an interview transcript using Gemini AI.
+        
+        Args:
+            transcript: List of transcript segments from the interview
+            metadata: Optional metadata about the interview
+            summary: Running notes on the earlier part of the interview, if transcript holds only what followed
             
-            # Parse the response
-            import json
-            if not response.text:
-                raise ValueError("Empty response from Gemini API")
-            rating_data = json.loads(response.text)
-            return TranscriptRating(**rating_data)
+        Returns:
+            TranscriptRating object with grades and feedback
+        """
+        prompt = self.build_rating_prompt(transcript, metadata, summary)
+
+        try:
+            return self._generate(prompt, TranscriptRating)
+        except Exception as e:
+            print(f"Error rating transcript with Gemini: {str(e)}")
+            raise
+
+    async def rate_transcript_async(self, transcript: List[dict], metadata: Optional[dict] = None, summary: Optional[str] = None) -> TranscriptRating:
+        """
+        Async variant of rate_transcript that does not block the event loop.
+        
+        Args:
+            transcript: List of transcript segments from the interview
+            metadata: Optional metadata about the interview
+            summary: Running notes on the earlier part of the interview, if transcript holds only what followed
             
+        Returns:
+            TranscriptRating object with grades and feedback
+        """
+        prompt = self.build_rating_prompt(transcript, metadata, summary)
+
+        try:
+            return await self._generate_async(prompt, TranscriptRating)
         except Exception as e:
             print(f"Error rating transcript with Gemini: {str(e)}")
             raise
 
 
+    async def summarize_transcript_async(
+        self,
+        transcript: List[dict],
+        metadata: Optional[dict] = None,
+        summary: Optional[str] = None
+    ) -> RunningSummary:
+        """
+        Extend the running summary of an interview that is still in progress.
+        
+        Args:
+            transcript: The segments since the previous summary (all segments for the first one)
+            metadata: Optional metadata about the interview
+            summary: Notes of the previous summary, if any
+            
+        Returns:
+            RunningSummary with notes covering the whole interview so far
+        """
+        prompt = self.build_summary_prompt(transcript, metadata, summary)
+
+        try:
+            return await self._generate_async(prompt, RunningSummary)
+        except Exception as e:
+            print(f"Error summarizing transcript with Gemini: {str(e)}")
+            raise
+
+    def assess_transcript(self, transcript: List[dict], metadata: Optional[dict] = None, summary: Optional[str] = None) -> InterviewAssessment:
+        """
+        Rate a transcript and generate improvement points with a single Gemini call.
+        
+        Args:
+            transcript: List of transcript segments from the interview
+            metadata: Optional metadata about the interview
+            summary: Running notes on the earlier part of the interview, if transcript holds only what followed
+            
+        Returns:
+            InterviewAssessment with the rating and the improvement points
+        """
+        prompt = self.build_assessment_prompt(transcript, metadata, summary)
+
+        try:
+            return self._generate(prompt, InterviewAssessment)
+        except Exception as e:
+            print(f"Error assessing transcript with Gemini: {str(e)}")
+            raise
+
+    async def assess_transcript_async(self, transcript: List[dict], metadata: Optional[dict] = None, summary: Optional[str] = None) -> InterviewAssessment:
+        """
+        Async variant of assess_transcript that does not block the event loop.
+        
+        Args:
+            transcript: List of transcript segments from the interview
+            metadata: Optional metadata about the interview
+            summary: Running notes on the earlier part of the interview, if transcript holds only what followed
+            
+        Returns:
+            InterviewAssessment with the rating and the improvement points
+        """
+        prompt = self.build_assessment_prompt(transcript, metadata, summary)
+
+        try:
+            return await self._generate_async(prompt, InterviewAssessment)
+        except Exception as e:
+            print(f"Error assessing transcript with Gemini: {str(e)}")
+            raise
+
+
+def _parse_response(response, schema: Type[BaseModel]) -> BaseModel:
+    """Validate a structured-output response against its schema."""
+    if not response.text:
+        raise ValueError(f"Empty response from Gemini API for {schema.__name__}")
+    return schema(**json.loads(response.text))
+
+
+def _is_retryable(error: BaseException) -> bool:
+    """Retry on rate limiting, server errors and timeouts."""
+    if isinstance(error, asyncio.TimeoutError):
+        return True
+    if isinstance(error, genai_errors.APIError):
+        return error.code == 429 or (error.code or 0) >= 500
+    return False
+
+
+# Process-wide limit on in-flight async Gemini calls (created on first use)
+_llm_semaphore: Optional[asyncio.Semaphore] = None
+
+
+def _get_semaphore() -> asyncio.Semaphore:
+    global _llm_semaphore
+    if _llm_semaphore is None:
+        _llm_semaphore = asyncio.Semaphore(GEMINI_MAX_CONCURRENCY)
+    return _llm_semaphore
+
+
 # Singleton instance
 _rating_service: Optional[GeminiRatingService] = None
 
 
 def get_rating_service() -> GeminiRatingService:
-    """Get or create the Gemini rating service singleton"""
+    """
+    Get or create the Gemini rating service singleton.
+    
+    Set GEMINI_FAKE=1 to use the local stand-in from fake_gemini instead of the real API.
+    """
     global _rating_service
     if _rating_service is None:
-        _rating_service = GeminiRatingService()
+        if os.getenv("GEMINI_FAKE", "").lower() in ("1", "true", "yes"):
+            from fake_gemini import FakeGeminiClient
+            _rating_service = GeminiRatingService(client=FakeGeminiClient())
+        else:
+            _rating_service = GeminiRatingService()
     return _rating_service
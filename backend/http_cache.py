@@ -0,0 +1,158 @@
+"""
+HTTP caching middleware: ETags, conditional requests and Cache-Control per route.
+
+Problems and rated transcripts rarely change once written, but the scores and
+profile pages fetch them again on every visit (and poll the rating while it is
+pending). For GET requests on the routes in the cache rules below, this
+middleware:
+
+- adds a strong ETag - the one the endpoint already set (problem payloads carry
+  a precomputed one), or a hash of the response body
+- answers 304 Not Modified without a body when If-None-Match matches
+- sets the route's Cache-Control, unless the endpoint set its own
+
+Problems are public and may be cached for HTTP_CACHE_PROBLEM_MAX_AGE seconds.
+Transcript data is private and sent with "no-cache", so browsers keep a copy
+but revalidate it each time (a 304 when nothing changed). With
+HTTP_CACHE_CDN_MODE enabled, problem responses also get s-maxage and
+stale-while-revalidate so a CDN in front of the API can serve them.
+
+It is a pure ASGI middleware, so responses it doesn't handle pass through untouched.
+"""
+
+import hashlib
+import os
+import re
+from typing import List, Optional, Pattern, Tuple
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+
+# Seconds browsers may reuse a problem without revalidating it
+HTTP_CACHE_PROBLEM_MAX_AGE = int(os.getenv("HTTP_CACHE_PROBLEM_MAX_AGE", "300"))
+
+# Add shared-cache directives for a CDN in front of the API
+HTTP_CACHE_CDN_MODE = os.getenv("HTTP_CACHE_CDN_MODE", "0").lower() in ("1", "true", "yes")
+
+# Seconds a CDN may serve a problem (s-maxage) and keep serving it while revalidating
+HTTP_CACHE_CDN_MAX_AGE = int(os.getenv("HTTP_CACHE_CDN_MAX_AGE", "86400"))
+
+# Cache rule: (path pattern, Cache-Control value, whether to add an ETag and answer 304s)
+CacheRule = Tuple[Pattern, str, bool]
+
+# ETag as sent in If-None-Match: optional weak prefix, and a content-coding
+# suffix added when the response was compressed ("<tag>-gzip")
+_ETAG_RE = re.compile(r'(?:W/)?"(.*?)(?:-(?:gzip|br))?"')
+
+
+def default_cache_rules(cdn_mode: bool = HTTP_CACHE_CDN_MODE) -> List[CacheRule]:
+    """
+    Build the per-route cache rules.
+    
+    Args:
+        cdn_mode: Whether to add shared-cache directives to public responses
+    
+    Returns:
+        List of cache rules; the first rule matching a path applies
+    """
+    problem_cache_control = f"public, max-age={HTTP_CACHE_PROBLEM_MAX_AGE}"
+    if cdn_mode:
+        problem_cache_control += f", s-maxage={HTTP_CACHE_CDN_MAX_AGE}, stale-while-revalidate={HTTP_CACHE_CDN_MAX_AGE}"
+    
+    return [
+        (re.compile(r"/api/problem/\d+"), problem_cache_control, True),
+        # A random pick must never be reused
+        (re.compile(r"/api/leetcode"), "no-store", False),
+        # Transcripts, ratings and improvement points: cached by the browser, revalidated every time
+        (re.compile(r"/api/transcript/(?:\d+|latest)(?:/rating|/improvements)?"), "private, no-cache", True),
+        (re.compile(r"/api/transcripts"), "private, no-cache", True),
+    ]
+
+
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    """Weak comparison of an ETag against an If-None-Match header (RFC 9110)."""
+    if if_none_match.strip() == "*":
+        return True
+    
+    expected = _ETAG_RE.fullmatch(etag)
+    if expected is None:
+        return False
+    
+    for candidate in if_none_match.split(","):
+        match = _ETAG_RE.fullmatch(candidate.strip())
+        if match and match.group(1) == expected.group(1):
+            return True
+    return False
+
+
+class HTTPCacheMiddleware:
+    """Adds ETags, 304 responses and Cache-Control to GET responses of cacheable routes"""
+    
+    def __init__(self, app: ASGIApp, rules: Optional[List[CacheRule]] = None):
+        self.app = app
+        self.rules = rules if rules is not None else default_cache_rules()
+    
+    def _match(self, path: str) -> Optional[CacheRule]:
+        for rule in self.rules:
+            if rule[0].fullmatch(path):
+                return rule
+        return None
+    
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http" or scope["method"] != "GET":
+            await self.app(scope, receive, send)
+            return
+        
+        rule = self._match(scope["path"])
+        if rule is None:
+            await self.app(scope, receive, send)
+            return
+        
+        _, cache_control, use_etag = rule
+        if_none_match = Headers(scope=scope).get("if-none-match")
+        start: Optional[Message] = None
+        body_parts: List[bytes] = []
+        
+        async def send_with_cache_headers(message: Message):
+            nonlocal start
+            
+            if message["type"] == "http.response.start":
+                if message["status"] != 200:
+                    # Errors are passed through as they are
+                    await send(message)
+                    return
+                headers = MutableHeaders(scope=message)
+                if "cache-control" not in headers:
+                    headers["Cache-Control"] = cache_control
+                if not use_etag:
+                    await send(message)
+                    return
+                start = message  # held back until the body is complete
+                return
+            
+            if start is None:
+                await send(message)
+                return
+            
+            body_parts.append(message.get("body", b""))
+            if message.get("more_body", False):
+                return
+            
+            body = b"".join(body_parts)
+            headers = MutableHeaders(scope=start)
+            etag = headers.get("etag")
+            if etag is None:
+                etag = '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+                headers["ETag"] = etag
+            
+            if if_none_match and _etag_matches(if_none_match, etag):
+                del headers["content-length"]
+                del headers["content-type"]
+                await send({"type": "http.response.start", "status": 304, "headers": headers.raw})
+                await send({"type": "http.response.body", "body": b""})
+                return
+            
+            await send(start)
+            await send({"type": "http.response.body", "body": body})
+        
+        await self.app(scope, receive, send_with_cache_headers)
@@ -1,6 +1,7 @@
-from fastapi import APIRouter
-import random
-from database import get_all_problems
+from fastapi import APIRouter, HTTPException, Response
+from typing import Optional
+from database import get_problem_payload, pick_random_problem_id
+import problem_payloads
 
 router = APIRouter()
 
@@ -12,31 +13,25 @@ router = APIRouter()
 # List of 5 LeetCode problems (DEPRECATED - kept for reference only)
 
 @router.get("/api/leetcode")
-async def get_random_leetcode_problem():
+async def get_random_leetcode_problem(
+    difficulty: Optional[str] = None,
+    tag: Optional[str] = None,
+    source: Optional[str] = None
+):
     """
     Returns a random problem from the database.
     This includes BOTH the original 5 Socratic problems AND any user-scraped LeetCode problems.
-    """
-    # Get all problems from database (socratic + leetcode sources)
-    all_problems = get_all_problems()
-    
     
+    Optional query parameters narrow the pool, e.g. /api/leetcode?difficulty=Medium&tag=Array&source=leetcode
+    """
+    # Pick a random problem without loading the whole pool
+    problem_id = pick_random_problem_id(difficulty=difficulty, tag=tag, source=source)
+    payload = get_problem_payload(problem_id, problem_payloads.INTERVIEW) if problem_id is not None else None
     
-    # Pick a random problem from the database
-    random_problem = random.choice(all_problems)
+    if not payload:
+        raise HTTPException(status_code=404, detail="No problems found matching the given filters")
     
-    # Transform database format to match the original API response format
-    # This ensures frontend compatibility
-    return {
-        "id": random_problem["id"],
-        "title": random_problem["title"],
-        "type": random_problem.get("tags", ["General"])[0].lower() if random_problem.get("tags") else "general",
-        "description": random_problem["description"],
-        "example_test_case": random_problem["details"].get("examples", [{}])[0] if random_problem["details"].get("examples") else {},
-        "expected_solution": random_problem["details"].get("expected_solution", ""),
-        "starter_code": random_problem["starter_codes"].get("python", "# No starter code available"),
-        "difficulty": random_problem["difficulty"],
-        "tags": random_problem.get("tags", []),
-        "source": random_problem.get("source", "unknown")
-    }
-
+    # The response in the original API format (for frontend compatibility) is
+    # prebuilt when the problem is saved, so it is sent without re-serializing
+    body, etag, _ = payload
+    return Response(content=body, media_type="application/json", headers={"ETag": etag})
@@ -6,14 +6,81 @@ It extracts problem details including title, description, examples, constraints,
 difficulty, tags, and starter code.
 """
 
+import os
+import time
+import asyncio
 import requests
+import httpx
 import json
 import re
-from typing import Dict, Any, Optional, List
+import html
+from typing import Dict, Any, Optional, List, AsyncIterator, Tuple
+from tenacity import AsyncRetrying, retry_if_exception, stop_after_attempt, wait_random_exponential
 
+try:
+    import h2  # noqa: F401 - presence enables HTTP/2 in httpx
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
 
-# LeetCode GraphQL endpoint
-LEETCODE_GRAPHQL_URL = "https://leetcode.com/graphql"
+
+# LeetCode GraphQL endpoint (override to point at a local fake server)
+LEETCODE_GRAPHQL_URL = os.getenv("LEETCODE_GRAPHQL_URL", "https://leetcode.com/graphql")
+
+# Connection pool and retry settings for the async client
+LEETCODE_MAX_CONNECTIONS = int(os.getenv("LEETCODE_MAX_CONNECTIONS", "10"))
+LEETCODE_TIMEOUT_SECONDS = float(os.getenv("LEETCODE_TIMEOUT_SECONDS", "10"))
+LEETCODE_MAX_ATTEMPTS = int(os.getenv("LEETCODE_MAX_ATTEMPTS", "3"))
+
+# Questions fetched per GraphQL request by the batch scraper
+LEETCODE_BATCH_SIZE = int(os.getenv("LEETCODE_BATCH_SIZE", "20"))
+
+# Upper bound on requests sent to LeetCode per second, across all async scrapes
+LEETCODE_REQUESTS_PER_SECOND = float(os.getenv("LEETCODE_REQUESTS_PER_SECOND", "4"))
+
+# Fields requested for every question
+QUESTION_FIELDS = """
+    questionId
+    title
+    titleSlug
+    content
+    difficulty
+    topicTags {
+      name
+    }
+    codeSnippets {
+      lang
+      langSlug
+      code
+    }
+    exampleTestcases
+    sampleTestCase
+"""
+
+# GraphQL query to fetch problem details
+QUESTION_DETAIL_QUERY = """
+query getQuestionDetail($titleSlug: String!) {
+  question(titleSlug: $titleSlug) {%s  }
+}
+""" % QUESTION_FIELDS
+
+REQUEST_HEADERS = {
+    "Content-Type": "application/json",
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36"
+}
+
+# Map language slugs to our supported languages
+LANGUAGE_MAP = {
+    "python3": "python",
+    "python": "python",
+    "javascript": "javascript",
+    "java": "java",
+    "cpp": "cpp",
+    "c++": "cpp",
+    "golang": "go",
+    "go": "go",
+    "rust": "rust"
+}
 
 
 def extract_leetcode_slug(url: str) -> Optional[str]:
@@ -41,10 +108,61 @@ def extract_leetcode_slug(url: str) -> Optional[str]:
     return None
 
 
+def build_problem(question: Optional[Dict[str, Any]], leetcode_slug: str) -> Dict[str, Any]:
+    """
+    Convert a GraphQL `question` object into our problem format.
+    
+    Args:
+        question: The `question` field of a getQuestionDetail response
+        leetcode_slug: The problem slug the question was fetched for
+    
+    Returns:
+        Problem dictionary (see scrape_leetcode_problem)
+    
+    Raises:
+        Exception: If the question is missing (problem not found)
+    """
+    # Check if question exists
+    if not question:
+        raise Exception(f"Problem '{leetcode_slug}' not found on LeetCode")
+    
+    # Parse the content (HTML description)
+    description_html = question["content"]
+    
+    # Extract examples and constraints from HTML
+    parsed_details = parse_problem_content(description_html)
+    
+    # Extract starter code for supported languages
+    starter_codes = {}
+    for snippet in question["codeSnippets"]:
+        lang_slug = snippet["langSlug"].lower()
+        if lang_slug in LANGUAGE_MAP:
+            our_lang = LANGUAGE_MAP[lang_slug]
+            # Only keep the first occurrence of each language
+            if our_lang not in starter_codes:
+                starter_codes[our_lang] = snippet["code"]
+    
+    # Extract tags
+    tags = [tag["name"] for tag in question["topicTags"]]
+    
+    # Build result
+    return {
+        "title": question["title"],
+        "description": description_html,  # Store full HTML for rich formatting
+        "difficulty": question["difficulty"],
+        "details": parsed_details,
+        "starter_codes": starter_codes,
+        "tags": tags,
+        "leetcode_slug": leetcode_slug
+    }
+
+
 def scrape_leetcode_problem(leetcode_slug: str) -> Dict[str, Any]:
     """
     Scrape a LeetCode problem using the GraphQL API.
     
+    Blocking - request handlers should use scrape_leetcode_problem_async instead.
+    
     Args:
         leetcode_slug: The problem slug (e.g., 'two-sum')
     
@@ -56,7 +174,8 @@ def scrape_leetcode_problem(leetcode_slug: str) -> Dict[str, Any]:
             'difficulty': str,  # 'Easy', 'Medium', or 'Hard'
             'details': {
                 'examples': [{'input': str, 'output': str, 'explanation': str}],
-                'constraints': [str]
+                'constraints': [str],
+                'description_text': str
             },
             'starter_codes': {'python': str, 'javascript': str, ...},
             'tags': [str]
@@ -65,101 +184,24 @@ def scrape_leetcode_problem(leetcode_slug: str) -> Dict[str, Any]:
     Raises:
         Exception: If scraping fails or problem not found
     """
-    
-    # GraphQL query to fetch problem details
-    query = """
-    query getQuestionDetail($titleSlug: String!) {
-      question(titleSlug: $titleSlug) {
-        questionId
-        title
-        titleSlug
-        content
-        difficulty
-        topicTags {
-          name
-        }
-        codeSnippets {
-          lang
-          langSlug
-          code
-        }
-        exampleTestcases
-        sampleTestCase
-      }
-    }
-    """
-    
     variables = {
         "titleSlug": leetcode_slug
     }
     
-    headers = {
-        "Content-Type": "application/json",
-        "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36"
-    }
-    
     try:
         # Make GraphQL request
         response = requests.post(
             LEETCODE_GRAPHQL_URL,
-            json={"query": query, "variables": variables},
-            headers=headers,
-            timeout=10
+            json={"query": QUESTION_DETAIL_QUERY, "variables": variables},
+            headers=REQUEST_HEADERS,
+            timeout=LEETCODE_TIMEOUT_SECONDS
         )
         response.raise_for_status()
         
         data = response.json()
+        result = build_problem((data.get("data") or {}).get("question"), leetcode_slug)
         
-        # Check if question exists
-        if not data.get("data") or not data["data"].get("question"):
-            raise Exception(f"Problem '{leetcode_slug}' not found on LeetCode")
-        
-        question = data["data"]["question"]
-        
-        # Parse the content (HTML description)
-        description_html = question["content"]
-        
-        # Extract examples and constraints from HTML
-        parsed_details = parse_problem_content(description_html)
-        
-        # Map language slugs to our supported languages
-        language_map = {
-            "python3": "python",
-            "python": "python",
-            "javascript": "javascript",
-            "java": "java",
-            "cpp": "cpp",
-            "c++": "cpp",
-            "golang": "go",
-            "go": "go",
-            "rust": "rust"
-        }
-        
-        # Extract starter code for supported languages
-        starter_codes = {}
-        for snippet in question["codeSnippets"]:
-            lang_slug = snippet["langSlug"].lower()
-            if lang_slug in language_map:
-                our_lang = language_map[lang_slug]
-                # Only keep the first occurrence of each language
-                if our_lang not in starter_codes:
-                    starter_codes[our_lang] = snippet["code"]
-        
-        # Extract tags
-        tags = [tag["name"] for tag in question["topicTags"]]
-        
-        # Build result
-        result = {
-            "title": question["title"],
-            "description": description_html,  # Store full HTML for rich formatting
-            "difficulty": question["difficulty"],
-            "details": parsed_details,
-            "starter_codes": starter_codes,
-            "tags": tags,
-            "leetcode_slug": leetcode_slug
-        }
-        
-        print(f"✅ Successfully scraped problem: {question['title']}")
+        print(f"✅ Successfully scraped problem: {result['title']}")
         return result
         
     except requests.exceptions.Timeout:
@@ -170,86 +212,362 @@ def scrape_leetcode_problem(leetcode_slug: str) -> Dict[str, Any]:
         raise Exception(f"Error scraping LeetCode problem: {str(e)}")
 
 
-def parse_problem_content(html_content: str) -> Dict[str, Any]:
+# Long-lived async client shared by all scrapes (keep-alive connection pool)
+_http_client: Optional[httpx.AsyncClient] = None
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """Get or create the shared async HTTP client for LeetCode requests"""
+    global _http_client
+    if _http_client is None or _http_client.is_closed:
+        _http_client = httpx.AsyncClient(
+            headers=REQUEST_HEADERS,
+            timeout=httpx.Timeout(LEETCODE_TIMEOUT_SECONDS),
+            transport=httpx.AsyncHTTPTransport(
+                http2=HTTP2_AVAILABLE,
+                limits=httpx.Limits(
+                    max_connections=LEETCODE_MAX_CONNECTIONS,
+                    max_keepalive_connections=LEETCODE_MAX_CONNECTIONS,
+                    keepalive_expiry=60
+                ),
+                retries=2  # connection failures only
+            )
+        )
+    return _http_client
+
+
+async def close_http_client():
+    """Close the shared async HTTP client (called on application shutdown)"""
+    global _http_client
+    if _http_client is not None:
+        await _http_client.aclose()
+        _http_client = None
+
+
+class RateLimiter:
+    """Spaces out request starts so at most `rate` requests begin per second"""
+    
+    def __init__(self, rate: float):
+        self.interval = 1.0 / rate if rate > 0 else 0.0
+        self._next_slot = 0.0
+        self._lock: Optional[asyncio.Lock] = None
+    
+    async def wait(self):
+        """Sleep until the next request slot is available."""
+        if not self.interval:
+            return
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            now = time.monotonic()
+            delay = self._next_slot - now
+            self._next_slot = max(now, self._next_slot) + self.interval
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+
+_rate_limiter = RateLimiter(LEETCODE_REQUESTS_PER_SECOND)
+
+
+def _is_retryable(error: BaseException) -> bool:
+    """Retry on rate limiting, server errors and transport failures."""
+    if isinstance(error, httpx.HTTPStatusError):
+        return error.response.status_code == 429 or error.response.status_code >= 500
+    return isinstance(error, httpx.TransportError)
+
+
+async def post_graphql(payload: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    POST a GraphQL payload to LeetCode with retries and return the decoded JSON.
+    
+    Every attempt waits for the shared rate limiter. 429s, 5xx responses and
+    transport errors are retried with jittered backoff.
     """
-    Parse the HTML content to extract examples and constraints.
+    async for attempt in AsyncRetrying(
+        stop=stop_after_attempt(LEETCODE_MAX_ATTEMPTS),
+        wait=wait_random_exponential(multiplier=0.5, max=8),
+        retry=retry_if_exception(_is_retryable),
+        reraise=True
+    ):
+        with attempt:
+            await _rate_limiter.wait()
+            response = await get_http_client().post(LEETCODE_GRAPHQL_URL, json=payload)
+            response.raise_for_status()
+            return response.json()
+
+
+async def scrape_leetcode_problem_async(leetcode_slug: str) -> Dict[str, Any]:
+    """
+    Scrape a LeetCode problem without blocking the event loop.
+    
+    Uses the shared keep-alive client (HTTP/2 when the h2 package is installed).
     
     Args:
-        html_content: HTML description from LeetCode
+        leetcode_slug: The problem slug (e.g., 'two-sum')
+    
+    Returns:
+        Dictionary containing problem data (see scrape_leetcode_problem)
+    
+    Raises:
+        Exception: If scraping fails or problem not found
+    """
+    try:
+        data = await post_graphql({
+            "query": QUESTION_DETAIL_QUERY,
+            "variables": {"titleSlug": leetcode_slug}
+        })
+        result = build_problem((data.get("data") or {}).get("question"), leetcode_slug)
+        
+        print(f"✅ Successfully scraped problem: {result['title']}")
+        return result
+        
+    except httpx.TimeoutException:
+        raise Exception("Request to LeetCode timed out. Please try again.")
+    except httpx.HTTPError as e:
+        raise Exception(f"Failed to fetch problem from LeetCode: {str(e)}")
+    except Exception as e:
+        raise Exception(f"Error scraping LeetCode problem: {str(e)}")
+
+
+def build_batch_query(leetcode_slugs: List[str]) -> Dict[str, Any]:
+    """
+    Compose one GraphQL document fetching several questions via aliases.
+    
+    Args:
+        leetcode_slugs: Problem slugs to fetch; question i is aliased as q{i}
     
     Returns:
-        Dictionary with 'examples' and 'constraints' lists
+        GraphQL payload with 'query' and 'variables'
     """
-    details = {
-        "examples": [],
-        "constraints": []
+    variable_definitions = ", ".join(f"$s{i}: String!" for i in range(len(leetcode_slugs)))
+    selections = "".join(
+        f"  q{i}: question(titleSlug: $s{i}) {{{QUESTION_FIELDS}  }}\n"
+        for i in range(len(leetcode_slugs))
+    )
+    return {
+        "query": f"query getQuestionDetails({variable_definitions}) {{\n{selections}}}\n",
+        "variables": {f"s{i}": slug for i, slug in enumerate(leetcode_slugs)}
     }
+
+
+async def _scrape_chunk(leetcode_slugs: List[str]) -> List[Tuple[str, Optional[Dict[str, Any]], Optional[str]]]:
+    """
+    Fetch one chunk of questions in a single request.
     
-    # Extract examples using regex
-    # LeetCode format: <strong>Example 1:</strong> or <strong class="example">Example 1:</strong>
-    example_pattern = r'<strong[^>]*>Example\s+\d+:?</strong>(.*?)(?=<strong[^>]*>Example\s+\d+:?</strong>|<strong[^>]*>Constraints:?</strong>|$)'
-    example_matches = re.finditer(example_pattern, html_content, re.DOTALL | re.IGNORECASE)
+    Questions missing from the combined response (partial errors, or the whole
+    request failing) are retried one by one with scrape_leetcode_problem_async.
+    """
+    try:
+        data = (await post_graphql(build_batch_query(leetcode_slugs))).get("data") or {}
+    except Exception as e:
+        print(f"⚠️  Batch request for {len(leetcode_slugs)} problems failed, falling back to single requests: {str(e)}")
+        data = {}
     
-    for match in example_matches:
-        example_text = match.group(1)
-        
-        # Extract Input, Output, and Explanation
-        input_match = re.search(r'<strong>Input:?</strong>\s*(.*?)(?=<strong>|$)', example_text, re.DOTALL)
-        output_match = re.search(r'<strong>Output:?</strong>\s*(.*?)(?=<strong>|$)', example_text, re.DOTALL)
-        explanation_match = re.search(r'<strong>Explanation:?</strong>\s*(.*?)(?=<strong>|$)', example_text, re.DOTALL)
-        
-        example = {
-            "input": clean_html(input_match.group(1)) if input_match else "",
-            "output": clean_html(output_match.group(1)) if output_match else "",
-            "explanation": clean_html(explanation_match.group(1)) if explanation_match else ""
-        }
-        
-        details["examples"].append(example)
+    results = []
+    fallback_slugs = []
+    for i, slug in enumerate(leetcode_slugs):
+        question = data.get(f"q{i}")
+        if not question:
+            fallback_slugs.append(slug)
+            continue
+        try:
+            results.append((slug, build_problem(question, slug), None))
+        except Exception:
+            fallback_slugs.append(slug)
+    
+    async def fetch_single(slug: str):
+        try:
+            return slug, await scrape_leetcode_problem_async(slug), None
+        except Exception as e:
+            return slug, None, str(e)
+    
+    results.extend(await asyncio.gather(*(fetch_single(slug) for slug in fallback_slugs)))
+    return results
+
+
+async def scrape_leetcode_problems_batch_async(
+    leetcode_slugs: List[str],
+    chunk_size: int = LEETCODE_BATCH_SIZE,
+    concurrency: int = 1
+) -> AsyncIterator[Tuple[str, Optional[Dict[str, Any]], Optional[str]]]:
+    """
+    Scrape many LeetCode problems using batched GraphQL requests.
+    
+    Slugs are split into chunks of chunk_size; each chunk is fetched with one
+    aliased query, so N problems cost about N / chunk_size upstream requests.
+    
+    Args:
+        leetcode_slugs: Problem slugs to fetch
+        chunk_size: Questions per GraphQL request
+        concurrency: Chunks fetched at the same time
+    
+    Yields:
+        (slug, problem data or None, error message or None) as each chunk completes
+    """
+    chunks = [leetcode_slugs[i:i + chunk_size] for i in range(0, len(leetcode_slugs), max(1, chunk_size))]
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+    
+    async def fetch_chunk(chunk: List[str]):
+        async with semaphore:
+            return await _scrape_chunk(chunk)
+    
+    tasks = [asyncio.create_task(fetch_chunk(chunk)) for chunk in chunks]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            for result in await next_done:
+                yield result
+    finally:
+        # Stop outstanding requests if the consumer stops early
+        for task in tasks:
+            task.cancel()
+
+
+# Bold labels that start a section of the problem statement ("Example 1:",
+# "Input:", "Constraints:", "Follow-up:", ...); group 1 or 2 is the label name.
+# Apart from "Example N", a label needs its colon (inside the bold tag or right
+# after it), so bold words in running text ("<strong>Note</strong> that ...")
+# stay part of the current section.
+_SECTION_LABEL_RE = re.compile(
+    r'<(?:strong|b)\b[^>]*>\s*(?:'
+    r'(example\s+\d+)\s*:?(?:\s|&nbsp;)*</(?:strong|b)>'
+    r'|(constraints|input|output|explanation|follow[\s-]*up|note)'
+    r'(?:\s*:(?:\s|&nbsp;)*</(?:strong|b)>|(?:\s|&nbsp;)*</(?:strong|b)>:)'
+    r')',
+    re.IGNORECASE
+)
+
+_LIST_ITEM_RE = re.compile(r'<li\b[^>]*>(.*?)</li>', re.DOTALL | re.IGNORECASE)
+_LIST_END_RE = re.compile(r'</(?:ul|ol)>', re.IGNORECASE)
+_PARAGRAPH_END_RE = re.compile(r'</(?:p|div)>', re.IGNORECASE)
+_BLOCK_TAG_RE = re.compile(
+    r'</?(?:p|div|pre|br|li|ul|ol|blockquote|table|tr|h[1-6])\b[^>]*>',
+    re.IGNORECASE
+)
+_SUP_TAG_RE = re.compile(r'<sup\b[^>]*>', re.IGNORECASE)
+_TAG_RE = re.compile(r'<[^>]+>')
+
+
+def _html_to_lines(fragment: str) -> List[str]:
+    """Convert an HTML fragment to its non-empty lines of text, one per block element."""
+    text = html.unescape(_TAG_RE.sub('', _SUP_TAG_RE.sub('^', _BLOCK_TAG_RE.sub('\n', fragment))))
+    lines = (" ".join(line.split()) for line in text.split("\n"))
+    return [line for line in lines if line]
+
+
+def _parse_constraints(fragment: str) -> List[str]:
+    """Extract constraints from the HTML that follows the "Constraints:" label."""
+    list_end = _LIST_END_RE.search(fragment)
+    items = _LIST_ITEM_RE.findall(fragment, 0, list_end.start() if list_end else len(fragment))
+    if items:
+        return [item for item in map(clean_html, items) if item]
+    
+    # Not a list: take the lines up to the end of the first paragraph with text
+    for paragraph_end in _PARAGRAPH_END_RE.finditer(fragment):
+        lines = _html_to_lines(fragment[:paragraph_end.start()])
+        if lines:
+            return lines
+    return _html_to_lines(fragment)
+
+
+def parse_problem_content(html_content: str) -> Dict[str, Any]:
+    """
+    Parse the HTML content to extract examples, constraints and a plain-text description.
+    
+    One scan with a precompiled pattern finds every bold section label
+    ("Example 1:", "Input:", "Constraints:", "Follow-up:", ...). The HTML
+    between consecutive labels belongs to the earlier one and is cleaned once,
+    so the work stays linear in the size of the statement.
+    
+    Args:
+        html_content: HTML description from LeetCode
+    
+    Returns:
+        Dictionary with 'examples' and 'constraints' lists, and 'description_text'
+        (the statement before the first example, one paragraph per line)
+    """
+    examples: List[Dict[str, str]] = []
+    constraints: List[str] = []
+    description_end = len(html_content)
     
-    # Extract constraints
-    constraints_pattern = r'<strong[^>]*>Constraints:?</strong>(.*?)(?=</?(?:p|div|strong)>|$)'
-    constraints_match = re.search(constraints_pattern, html_content, re.DOTALL | re.IGNORECASE)
+    section = "description"
+    field = None          # example field or "constraints" the open span belongs to
+    field_start = 0
     
-    if constraints_match:
-        constraints_text = constraints_match.group(1)
-        # Split by <li> tags or line breaks
-        constraint_items = re.findall(r'<li>(.*?)</li>', constraints_text, re.DOTALL)
+    def close_span(end: int):
+        nonlocal constraints
+        if field == "constraints":
+            constraints = _parse_constraints(html_content[field_start:end])
+        elif field is not None:
+            examples[-1][field] = clean_html(html_content[field_start:end])
+    
+    for label in _SECTION_LABEL_RE.finditer(html_content):
+        kind = (label.group(1) or label.group(2)).lower()
         
-        if not constraint_items:
-            # Fallback: split by line breaks
-            constraint_items = [line.strip() for line in constraints_text.split('\n') if line.strip()]
+        if kind.startswith("example"):
+            if section == "description":
+                description_end = label.start()
+            close_span(label.start())
+            section, field = "example", None
+            examples.append({"input": "", "output": "", "explanation": ""})
+        elif kind == "constraints":
+            if section == "description":
+                description_end = label.start()
+            close_span(label.start())
+            section, field = "constraints", "constraints"
+        elif kind in ("input", "output", "explanation") and section == "example":
+            close_span(label.start())
+            field = kind
+        elif (kind == "note" or kind.startswith("follow")) and section != "description":
+            close_span(label.start())
+            section, field = "end", None
+        else:
+            continue  # plain bold text inside the current span
         
-        details["constraints"] = [clean_html(item) for item in constraint_items if clean_html(item)]
+        field_start = label.end()
+    
+    close_span(len(html_content))
     
-    return details
+    return {
+        "examples": examples,
+        "constraints": constraints,
+        "description_text": "\n".join(_html_to_lines(html_content[:description_end]))
+    }
 
 
-def clean_html(html: str) -> str:
+def clean_html(html_text: str) -> str:
     """
     Remove HTML tags and clean up text.
     
     Args:
-        html: HTML string
+        html_text: HTML string
+    
+    Returns:
+        Clean text string (superscripts are kept as "^", e.g. 10<sup>4</sup> -> 10^4)
+    """
+    if "<sup" in html_text:
+        html_text = _SUP_TAG_RE.sub('^', html_text)
+    
+    # Remove HTML tags, decode entities and collapse whitespace
+    return " ".join(html.unescape(_TAG_RE.sub('', html_text)).split())
+
+
+def parse_slug_or_url(entry: str) -> Optional[str]:
+    """
+    Get the problem slug from either a LeetCode URL or a bare slug.
+    
+    Args:
+        entry: e.g. 'https://leetcode.com/problems/two-sum/' or 'two-sum'
     
     Returns:
-        Clean text string
+        Problem slug or None if the entry is neither
     """
-    # Remove HTML tags
-    text = re.sub(r'<[^>]+>', '', html)
-    
-    # Replace HTML entities
-    text = text.replace('&lt;', '<')
-    text = text.replace('&gt;', '>')
-    text = text.replace('&amp;', '&')
-    text = text.replace('&quot;', '"')
-    text = text.replace('&#39;', "'")
-    text = text.replace('&nbsp;', ' ')
-    
-    # Remove extra whitespace
-    text = re.sub(r'\s+', ' ', text)
-    text = text.strip()
-    
-    return text
+    entry = entry.strip()
+    slug = extract_leetcode_slug(entry)
+    if slug:
+        return slug
+    if re.fullmatch(r'[a-zA-Z0-9-]+', entry):
+        return entry
+    return None
 
 
 def validate_leetcode_url(url: str) -> bool:
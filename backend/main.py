@@ -1,16 +1,33 @@
+from dotenv import load_dotenv
+
+# Load environment variables from .env file
+# (before the routers are imported, since modules read their settings at import time)
+load_dotenv()
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from vapi_endpoint import router as vapi_router
 from leetcode_endpoint import router as leetcode_router
 from transcript_endpoint import router as transcript_router
 from scrape_endpoint import router as scrape_router
-from database import migrate_hardcoded_problems
-from dotenv import load_dotenv
+from database import migrate_hardcoded_problems, close_all_connections
+from rating_queue import get_rating_queue
+from problem_refresh import get_access_tracker
+from vapi_events import get_event_pipeline
+from leetcode_scraper import close_http_client
+from http_cache import HTTPCacheMiddleware
+from compression import CompressionMiddleware
+from fast_json import get_json_response_class
 
-# Load environment variables from .env file
-load_dotenv()
+# JSON responses are rendered with orjson when FAST_JSON=1 (and orjson is installed)
+app = FastAPI(default_response_class=get_json_response_class())
 
-app = FastAPI()
+# ETags, 304s and Cache-Control for problem and transcript reads
+# (added before CORS so that 304 responses still get CORS headers)
+app.add_middleware(HTTPCacheMiddleware)
+
+# gzip/brotli compression (outside the HTTP cache, which sees uncompressed bodies)
+app.add_middleware(CompressionMiddleware)
 
 # Configure CORS
 app.add_middleware(
@@ -19,6 +36,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Before-Id", "ETag"],
 )
 
 # Migrate hardcoded Socratic problems to database on startup
@@ -27,8 +45,20 @@ app.add_middleware(
 async def startup_event():
     print("🚀 Starting up server...")
     migrate_hardcoded_problems()
+    await get_rating_queue().start()
+    await get_access_tracker().start()
+    await get_event_pipeline().start()
     print("✅ Server ready!")
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    # Write buffered call events before the rating queue stops
+    await get_event_pipeline().stop()
+    await get_rating_queue().stop()
+    await get_access_tracker().stop()
+    await close_http_client()
+    close_all_connections()
+
 # Include routers
 app.include_router(vapi_router)
 app.include_router(leetcode_router)
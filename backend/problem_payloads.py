@@ -0,0 +1,96 @@
+"""
+Ready-to-serve problem payloads.
+
+The problem endpoints used to rebuild their response on every request: load the
+problem with its snippets and tags, parse its details JSON, reshape it for the
+frontend and serialize it again. Problems change only when they are saved or
+refreshed, so database.py builds both response shapes at that point with the
+functions below and stores the serialized bytes (with an ETag) in the
+problem_payloads table. Hot reads then return those bytes unchanged.
+
+This module only builds payloads; it must not import database.py.
+"""
+
+import hashlib
+import json
+from typing import Any, Callable, Dict
+
+
+# GET /api/problem/{id} (the ProblemResponse shape)
+PROBLEM = "problem"
+
+# GET /api/leetcode (the random-problem shape used by the interview page)
+INTERVIEW = "interview"
+
+
+def build_problem_payload(problem: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Build the /api/problem/{id} response for a problem.
+    
+    Args:
+        problem: Problem dictionary as loaded by the database module
+    
+    Returns:
+        Dictionary with the fields of ProblemResponse, in the same order
+    """
+    return {
+        "id": problem["id"],
+        "title": problem["title"],
+        "description": problem["description"],
+        "difficulty": problem["difficulty"],
+        "details": problem["details"],
+        "starter_codes": problem["starter_codes"],
+        "tags": problem["tags"],
+        "source": problem["source"],
+        "leetcode_slug": problem.get("leetcode_slug")
+    }
+
+
+def build_interview_payload(problem: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Build the /api/leetcode response for a problem.
+    
+    This is the format of the original hardcoded problem list, which the
+    interview page still expects: the first example, Python starter code and
+    the first tag (lowercased) as the problem type.
+    
+    Args:
+        problem: Problem dictionary as loaded by the database module
+    
+    Returns:
+        Dictionary in the random-problem response format
+    """
+    return {
+        "id": problem["id"],
+        "title": problem["title"],
+        "type": problem.get("tags", ["General"])[0].lower() if problem.get("tags") else "general",
+        "description": problem["description"],
+        "example_test_case": problem["details"].get("examples", [{}])[0] if problem["details"].get("examples") else {},
+        "expected_solution": problem["details"].get("expected_solution", ""),
+        "starter_code": problem["starter_codes"].get("python", "# No starter code available"),
+        "difficulty": problem["difficulty"],
+        "tags": problem.get("tags", []),
+        "source": problem.get("source", "unknown")
+    }
+
+
+PAYLOAD_BUILDERS: Dict[str, Callable[[Dict[str, Any]], Dict[str, Any]]] = {
+    PROBLEM: build_problem_payload,
+    INTERVIEW: build_interview_payload
+}
+
+
+def serialize_payload(payload: Dict[str, Any]) -> bytes:
+    """Serialize a payload exactly like FastAPI's JSONResponse does."""
+    return json.dumps(
+        payload,
+        ensure_ascii=False,
+        allow_nan=False,
+        indent=None,
+        separators=(",", ":")
+    ).encode("utf-8")
+
+
+def payload_etag(body: bytes) -> str:
+    """Strong ETag for a serialized payload."""
+    return '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
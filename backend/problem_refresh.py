@@ -0,0 +1,168 @@
+"""
+Stale-while-revalidate refresh and access tracking for cached LeetCode problems.
+
+Saved LeetCode problems are always served straight from the database. When one
+is served whose last_fetched_at is older than PROBLEM_REFRESH_TTL, it is
+re-scraped in a background task and updated in place with
+database.refresh_problem, so the next request sees fresh content without this
+one waiting for LeetCode.
+
+Access times are not written per request: ProblemAccessTracker keeps the latest
+access per problem in memory and a background task writes them to
+problems.last_accessed_at in one transaction every PROBLEM_ACCESS_FLUSH_SECONDS.
+"""
+
+import asyncio
+import os
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional, Set
+from cachetools import TTLCache
+import database
+from leetcode_scraper import scrape_leetcode_problem_async
+from singleflight import SingleFlight
+
+
+# Age after which a saved LeetCode problem is re-scraped in the background
+PROBLEM_REFRESH_TTL = float(os.getenv("PROBLEM_REFRESH_TTL", str(7 * 24 * 3600)))
+
+# Seconds to wait before retrying a refresh that failed
+PROBLEM_REFRESH_RETRY_SECONDS = float(os.getenv("PROBLEM_REFRESH_RETRY_SECONDS", "300"))
+
+# Seconds between writes of buffered problem access times
+PROBLEM_ACCESS_FLUSH_SECONDS = float(os.getenv("PROBLEM_ACCESS_FLUSH_SECONDS", "30"))
+
+# Coalesces refreshes of the same slug
+_refresh_flights = SingleFlight()
+
+# Slugs whose last refresh failed, skipped until their entry expires
+_failed_refreshes: TTLCache = TTLCache(maxsize=4096, ttl=PROBLEM_REFRESH_RETRY_SECONDS)
+
+# Strong references to running refresh tasks (the event loop only keeps weak ones)
+_refresh_tasks: Set[asyncio.Task] = set()
+
+
+def is_stale(problem: Dict[str, Any]) -> bool:
+    """
+    Whether a saved problem is due for a background refresh.
+    
+    Only LeetCode problems are refreshed; Socratic problems have no upstream.
+    """
+    if problem["source"] != "leetcode" or not problem.get("leetcode_slug"):
+        return False
+    if not problem.get("last_fetched_at"):
+        return True
+    
+    age = datetime.now() - datetime.fromisoformat(problem["last_fetched_at"])
+    return age > timedelta(seconds=PROBLEM_REFRESH_TTL)
+
+
+async def _refresh(problem_id: int, leetcode_slug: str):
+    print(f"🔄 Refreshing stale problem from LeetCode: {leetcode_slug}")
+    
+    try:
+        scraped_data = await scrape_leetcode_problem_async(leetcode_slug)
+        database.refresh_problem(
+            problem_id,
+            title=scraped_data["title"],
+            description=scraped_data["description"],
+            difficulty=scraped_data["difficulty"],
+            details=scraped_data["details"],
+            starter_codes=scraped_data["starter_codes"],
+            tags=scraped_data["tags"]
+        )
+    except Exception as e:
+        _failed_refreshes[leetcode_slug] = True
+        print(f"⚠️  Warning: Failed to refresh problem '{leetcode_slug}': {str(e)}")
+
+
+def schedule_refresh_if_stale(problem: Dict[str, Any]) -> bool:
+    """
+    Start a background refresh of a problem if it is stale.
+    
+    Must be called from the event loop. At most one refresh per slug runs at a
+    time, and a slug whose refresh failed is not retried for
+    PROBLEM_REFRESH_RETRY_SECONDS.
+    
+    Args:
+        problem: Problem dictionary as returned by the database module
+    
+    Returns:
+        True if a refresh was started or is already running
+    """
+    if not is_stale(problem):
+        return False
+    
+    leetcode_slug = problem["leetcode_slug"]
+    if leetcode_slug in _failed_refreshes:
+        return False
+    
+    key = f"refresh:{leetcode_slug}"
+    if _refresh_flights.in_flight(key):
+        return True
+    
+    task = asyncio.create_task(_refresh_flights.do(key, lambda: _refresh(problem["id"], leetcode_slug)))
+    _refresh_tasks.add(task)
+    task.add_done_callback(_refresh_tasks.discard)
+    return True
+
+
+class ProblemAccessTracker:
+    """Buffers problem access times in memory and writes them in batches"""
+    
+    def __init__(self, flush_seconds: float = PROBLEM_ACCESS_FLUSH_SECONDS):
+        self.flush_seconds = flush_seconds
+        self._pending: Dict[int, str] = {}
+        self._task: Optional[asyncio.Task] = None
+    
+    def touch(self, problem_id: int):
+        """Record an access to a problem (repeated accesses before a flush coalesce)."""
+        self._pending[problem_id] = datetime.now().isoformat()
+    
+    def flush(self) -> int:
+        """
+        Write buffered access times to the database.
+        
+        Returns:
+            Number of problems updated
+        """
+        if not self._pending:
+            return 0
+        
+        pending, self._pending = self._pending, {}
+        try:
+            return database.record_problem_accesses(pending)
+        except Exception as e:
+            # Keep the times for the next flush unless newer ones arrived meanwhile
+            for problem_id, accessed_at in pending.items():
+                self._pending.setdefault(problem_id, accessed_at)
+            print(f"⚠️  Warning: Failed to record problem accesses: {str(e)}")
+            return 0
+    
+    async def start(self):
+        """Start the periodic flush task."""
+        self._task = asyncio.create_task(self._flush_loop(), name="problem-access-flush")
+    
+    async def stop(self):
+        """Stop the flush task and write whatever is still buffered."""
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        self.flush()
+    
+    async def _flush_loop(self):
+        while True:
+            await asyncio.sleep(self.flush_seconds)
+            self.flush()
+
+
+# Singleton instance
+_access_tracker: Optional[ProblemAccessTracker] = None
+
+
+def get_access_tracker() -> ProblemAccessTracker:
+    """Get or create the problem access tracker singleton"""
+    global _access_tracker
+    if _access_tracker is None:
+        _access_tracker = ProblemAccessTracker()
+    return _access_tracker
@@ -0,0 +1,250 @@
+"""
+Background rating queue for interview transcripts.
+
+Rating a transcript with Gemini takes several seconds, so it happens outside the
+request path: the transcript endpoint saves the transcript with rating_status
+'pending', enqueues its ID and returns immediately. A pool of asyncio worker
+tasks rates queued transcripts and stores the results with database.save_ratings.
+
+Jobs are not persisted separately - on startup every unrated transcript that is
+still 'pending' is re-queued, so jobs interrupted by a restart are recovered.
+
+Transcripts recorded through a session are queued when the session is closed.
+Sessions that stop receiving segments for TRANSCRIPT_SESSION_IDLE_SECONDS
+(the client went away before closing them) are closed and queued by the queue's
+sweep task.
+
+With GEMINI_INCREMENTAL_RATING, open sessions are also summarized while the call
+is running: every RUNNING_SUMMARY_INTERVAL_SECONDS, sessions with at least
+RUNNING_SUMMARY_MIN_SEGMENTS segments not covered by their running summary get
+new notes. Up to RUNNING_SUMMARY_CONCURRENCY sessions are summarized at a time
+(all Gemini calls also share GEMINI_MAX_CONCURRENCY), so final ratings keep part
+of the Gemini concurrency. The final rating then only sends the notes and the
+segments that followed them.
+"""
+
+import asyncio
+import os
+from typing import List, Optional, Set
+import database
+from gemini_rating_service import GEMINI_INCREMENTAL_RATING, get_rating_service
+
+
+# Number of transcripts rated concurrently
+RATING_WORKERS = int(os.getenv("RATING_WORKERS", "2"))
+
+# Seconds without new segments after which an open transcript session is closed and rated
+TRANSCRIPT_SESSION_IDLE_SECONDS = float(os.getenv("TRANSCRIPT_SESSION_IDLE_SECONDS", "1800"))
+
+# Seconds between sweeps for idle sessions
+_SESSION_SWEEP_INTERVAL = 60
+
+# Seconds stop() waits for cancelled tasks to finish
+_STOP_TIMEOUT_SECONDS = 10
+
+# Seconds between passes over open sessions to extend their running summaries
+RUNNING_SUMMARY_INTERVAL_SECONDS = float(os.getenv("RUNNING_SUMMARY_INTERVAL_SECONDS", "60"))
+
+# New segments a session needs before its running summary is extended
+RUNNING_SUMMARY_MIN_SEGMENTS = int(os.getenv("RUNNING_SUMMARY_MIN_SEGMENTS", "20"))
+
+# Sessions summarized at the same time in one pass
+RUNNING_SUMMARY_CONCURRENCY = int(os.getenv("RUNNING_SUMMARY_CONCURRENCY", "2"))
+
+
+class RatingQueue:
+    """Queue of transcript IDs waiting to be rated, drained by worker tasks"""
+    
+    def __init__(self, workers: int = RATING_WORKERS):
+        self.workers = max(1, workers)
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+        self._queued: Set[int] = set()  # queued or in progress, to skip duplicates
+    
+    async def start(self):
+        """Start the worker tasks and re-queue transcripts left pending by a previous run."""
+        self._queue = asyncio.Queue()
+        self._tasks = [
+            asyncio.create_task(self._worker(), name=f"rating-worker-{i}")
+            for i in range(self.workers)
+        ]
+        self._tasks.append(asyncio.create_task(self._sweep_idle_sessions(), name="rating-session-sweep"))
+        if GEMINI_INCREMENTAL_RATING:
+            self._tasks.append(asyncio.create_task(self._summarize_sessions(), name="rating-session-summaries"))
+        
+        database.close_idle_transcript_sessions(TRANSCRIPT_SESSION_IDLE_SECONDS)
+        pending_ids = database.get_pending_rating_ids()
+        for transcript_id in pending_ids:
+            self.enqueue(transcript_id)
+        
+        print(f"✅ Rating queue started with {self.workers} workers ({len(pending_ids)} pending jobs recovered)")
+    
+    async def stop(self):
+        """Cancel the workers. Unfinished jobs stay 'pending' and are recovered on next start."""
+        for task in self._tasks:
+            task.cancel()
+        if self._tasks:
+            # A task that ignores its cancellation must not block app shutdown
+            _, pending = await asyncio.wait(self._tasks, timeout=_STOP_TIMEOUT_SECONDS)
+            for task in pending:
+                print(f"⚠️  Rating queue task {task.get_name()} did not stop within {_STOP_TIMEOUT_SECONDS}s")
+        self._tasks = []
+        self._queue = None
+        self._queued.clear()
+    
+    def enqueue(self, transcript_id: int) -> bool:
+        """
+        Queue a transcript for rating.
+        
+        Args:
+            transcript_id: The ID of the transcript to rate
+        
+        Returns:
+            True if queued, False if it was already queued or being rated
+        """
+        if self._queue is None:
+            raise RuntimeError("Rating queue is not running")
+        
+        if transcript_id in self._queued:
+            return False
+        
+        self._queued.add(transcript_id)
+        self._queue.put_nowait(transcript_id)
+        return True
+    
+    def is_queued(self, transcript_id: int) -> bool:
+        """Whether a transcript is waiting in the queue or being rated."""
+        return transcript_id in self._queued
+    
+    @property
+    def size(self) -> int:
+        """Number of transcripts queued or being rated."""
+        return len(self._queued)
+    
+    async def _sweep_idle_sessions(self):
+        while True:
+            await asyncio.sleep(_SESSION_SWEEP_INTERVAL)
+            try:
+                for transcript_id in database.close_idle_transcript_sessions(TRANSCRIPT_SESSION_IDLE_SECONDS):
+                    print(f"⏱️  Closed idle transcript session {transcript_id}")
+                    self.enqueue(transcript_id)
+            except Exception as e:
+                print(f"⚠️  Unexpected error closing idle transcript sessions: {str(e)}")
+    
+    async def _summarize_sessions(self):
+        semaphore = asyncio.Semaphore(max(1, RUNNING_SUMMARY_CONCURRENCY))
+        
+        async def summarize(transcript_id: int):
+            async with semaphore:
+                await self._summarize(transcript_id)
+        
+        while True:
+            await asyncio.sleep(RUNNING_SUMMARY_INTERVAL_SECONDS)
+            try:
+                due_ids = database.get_transcripts_due_for_summary(RUNNING_SUMMARY_MIN_SEGMENTS)
+                results = await asyncio.gather(*(summarize(transcript_id) for transcript_id in due_ids), return_exceptions=True)
+                for transcript_id, result in zip(due_ids, results):
+                    if isinstance(result, Exception):
+                        print(f"⚠️  Unexpected error summarizing transcript {transcript_id}: {str(result)}")
+            except Exception as e:
+                print(f"⚠️  Unexpected error summarizing transcript sessions: {str(e)}")
+    
+    async def _summarize(self, transcript_id: int):
+        """Extend a session's running summary with the segments it does not cover yet."""
+        running = database.get_transcript_summary(transcript_id)
+        # Without a usable summary, start over from the first segment
+        segments = database.get_transcript_segments_after(transcript_id, running["through_seq"] if running else -1)
+        transcript = database.get_transcript_metadata(transcript_id)
+        if not segments or not transcript:
+            return
+        
+        try:
+            rating_service = get_rating_service()
+            summary = await rating_service.summarize_transcript_async(
+                transcript=[segment for _, segment in segments],
+                metadata=transcript["metadata"],
+                summary=running["summary"]["notes"] if running else None
+            )
+        except Exception as e:
+            # The next pass tries again; the final rating works without a summary
+            print(f"⚠️  Warning: Failed to summarize transcript {transcript_id}: {str(e)}")
+            return
+        
+        database.save_transcript_summary(
+            transcript_id,
+            through_seq=segments[-1][0],
+            segment_count=(running["segment_count"] if running else 0) + len(segments),
+            summary=summary.dict(),
+            model=rating_service.model
+        )
+    
+    async def _worker(self):
+        assert self._queue is not None
+        queue = self._queue
+        while True:
+            transcript_id = await queue.get()
+            try:
+                await self._rate(transcript_id)
+            except Exception as e:
+                print(f"⚠️  Unexpected error rating transcript {transcript_id}: {str(e)}")
+            finally:
+                self._queued.discard(transcript_id)
+                queue.task_done()
+    
+    async def _rate(self, transcript_id: int):
+        transcript = database.get_transcript(transcript_id)
+        if not transcript or transcript["ratings"]:
+            return
+        
+        print(f"🤖 Rating transcript ID: {transcript_id}")
+        
+        try:
+            rating_service = get_rating_service()
+            
+            # With a running summary, only the segments it does not cover are sent
+            running = database.get_transcript_summary(transcript_id) if rating_service.incremental else None
+            segments, notes = transcript["transcript"], None
+            if running:
+                segments = [segment for _, segment in database.get_transcript_segments_after(transcript_id, running["through_seq"])]
+                notes = running["summary"]["notes"]
+            
+            if rating_service.rating_mode == "combined":
+                # One call yields both the rating and the improvement points
+                assessment = await rating_service.assess_transcript_async(
+                    transcript=segments,
+                    metadata=transcript["metadata"],
+                    summary=notes
+                )
+                rating = assessment.rating
+                cache_key = rating_service.improvement_cache_key(transcript["transcript"], transcript["metadata"])
+                database.save_improvement_points(
+                    transcript_id, cache_key, assessment.improvements.points, rating_service.model
+                )
+            else:
+                rating = await rating_service.rate_transcript_async(
+                    transcript=segments,
+                    metadata=transcript["metadata"],
+                    summary=notes
+                )
+        except Exception as e:
+            print(f"⚠️  Warning: Failed to rate transcript {transcript_id}: {str(e)}")
+            database.set_rating_status(transcript_id, "failed")
+            return
+        
+        database.save_ratings(transcript_id, rating.dict())
+        
+        print(f"   ✅ Rating complete for transcript {transcript_id}: "
+              f"{rating.communication_grade.value} / {rating.problem_solving_grade.value} / "
+              f"{rating.implementation_grade.value}")
+
+
+# Singleton instance
+_rating_queue: Optional[RatingQueue] = None
+
+
+def get_rating_queue() -> RatingQueue:
+    """Get or create the rating queue singleton"""
+    global _rating_queue
+    if _rating_queue is None:
+        _rating_queue = RatingQueue()
+    return _rating_queue
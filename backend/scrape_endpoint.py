@@ -4,24 +4,44 @@ LeetCode Scraping API Endpoint
 This module provides endpoints to scrape LeetCode problems and retrieve cached problems.
 """
 
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, UploadFile, File, Response
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-from typing import Optional
+from typing import Optional, List, AsyncIterator
+import fast_json
+import os
 import database
+import problem_payloads
+from problem_refresh import get_access_tracker, schedule_refresh_if_stale
+from singleflight import SingleFlight
 from leetcode_scraper import (
     extract_leetcode_slug,
-    scrape_leetcode_problem,
+    parse_slug_or_url,
+    scrape_leetcode_problem_async,
+    scrape_leetcode_problems_batch_async,
     validate_leetcode_url
 )
 
 router = APIRouter()
 
+# Coalesces concurrent scrapes of the same LeetCode slug
+_scrape_flights = SingleFlight()
+
+# Batch imports: GraphQL requests in flight per batch, and the largest accepted batch
+BATCH_SCRAPE_CONCURRENCY = int(os.getenv("BATCH_SCRAPE_CONCURRENCY", "4"))
+BATCH_SCRAPE_MAX_ITEMS = int(os.getenv("BATCH_SCRAPE_MAX_ITEMS", "1000"))
+
 
 class ScrapeLeetCodeRequest(BaseModel):
     """Request model for scraping a LeetCode problem."""
     url: str
 
 
+class BatchScrapeRequest(BaseModel):
+    """Request model for importing many LeetCode problems."""
+    urls: List[str]  # LeetCode problem URLs or bare slugs
+
+
 class ScrapeLeetCodeResponse(BaseModel):
     """Response model for scrape endpoint."""
     problem_id: int
@@ -52,7 +72,8 @@ async def scrape_leetcode(request: ScrapeLeetCodeRequest):
     1. Validates the LeetCode URL
     2. Extracts the problem slug
     3. Checks if the problem exists in the database (cache)
-    4. If cached, returns the cached problem ID
+    4. If cached, returns the cached problem ID right away (a problem older than
+       PROBLEM_REFRESH_TTL is re-scraped and updated in the background)
     5. If not cached, scrapes from LeetCode, saves to database, and returns new problem ID
     
     Args:
@@ -91,10 +112,11 @@ async def scrape_leetcode(request: ScrapeLeetCodeRequest):
         problem_id = cached_problem["id"]
         title = cached_problem["title"]
         
-        # Update last_fetched_at timestamp
-        database.update_problem_last_fetched(problem_id)
+        # Record the access (written in batches) and re-scrape in the background if stale
+        get_access_tracker().touch(problem_id)
+        refreshing = schedule_refresh_if_stale(cached_problem)
         
-        print(f"✅ Found cached problem: {title} (ID: {problem_id})")
+        print(f"✅ Found cached problem: {title} (ID: {problem_id}){' - refreshing in background' if refreshing else ''}")
         
         return ScrapeLeetCodeResponse(
             problem_id=problem_id,
@@ -103,13 +125,19 @@ async def scrape_leetcode(request: ScrapeLeetCodeRequest):
             message=f"Retrieved cached problem: {title}"
         )
     
-    # Problem not in cache - scrape from LeetCode
-    try:
+    # Problem not in cache - scrape from LeetCode.
+    # Concurrent requests for the same slug share a single scrape and insert.
+    async def scrape_and_save():
+        # An earlier flight for this slug may have finished while we were waiting
+        cached_problem = database.get_problem_by_leetcode_slug(leetcode_slug)
+        if cached_problem:
+            return cached_problem["id"], cached_problem["title"], True
+        
         print(f"🌐 Scraping problem from LeetCode: {leetcode_slug}")
         
-        scraped_data = scrape_leetcode_problem(leetcode_slug)
+        scraped_data = await scrape_leetcode_problem_async(leetcode_slug)
         
-        # Save to database
+        # Save to database (idempotent per slug, so races across workers resolve to one row)
         problem_id = database.save_problem(
             title=scraped_data["title"],
             description=scraped_data["description"],
@@ -122,12 +150,16 @@ async def scrape_leetcode(request: ScrapeLeetCodeRequest):
         )
         
         print(f"✅ Scraped and saved problem: {scraped_data['title']} (ID: {problem_id})")
+        return problem_id, scraped_data["title"], False
+    
+    try:
+        problem_id, title, cached = await _scrape_flights.do(leetcode_slug, scrape_and_save)
         
         return ScrapeLeetCodeResponse(
             problem_id=problem_id,
-            title=scraped_data["title"],
-            cached=False,
-            message=f"Successfully scraped problem: {scraped_data['title']}"
+            title=title,
+            cached=cached,
+            message=f"Retrieved cached problem: {title}" if cached else f"Successfully scraped problem: {title}"
         )
         
     except Exception as e:
@@ -140,13 +172,136 @@ async def scrape_leetcode(request: ScrapeLeetCodeRequest):
         )
 
 
+async def _batch_scrape_events(entries: List[str]) -> AsyncIterator[str]:
+    """
+    Import a list of LeetCode problems, yielding NDJSON progress lines.
+    
+    Entries are deduplicated against the database in one query, missing problems
+    are fetched with batched GraphQL requests (bounded concurrency, rate limited
+    by the scraper), and all fetched problems are inserted in a single transaction.
+    A problem that fails to save is reported as failed without affecting the
+    others, and the "done" line is always sent.
+    """
+    slugs: List[str] = []
+    invalid: List[str] = []
+    for entry in entries:
+        slug = parse_slug_or_url(entry)
+        if slug is None:
+            invalid.append(entry)
+        elif slug not in slugs:
+            slugs.append(slug)
+    
+    existing = database.get_problem_ids_by_slugs(slugs)
+    missing = [slug for slug in slugs if slug not in existing]
+    
+    def event(**fields) -> str:
+        return fast_json.dumps(fields) + "\n"
+    
+    yield event(type="start", total=len(slugs), cached=len(existing), to_fetch=len(missing), invalid=len(invalid))
+    
+    for entry in invalid:
+        yield event(type="item", input=entry, status="invalid")
+    for slug, problem_id in existing.items():
+        yield event(type="item", slug=slug, status="cached", problem_id=problem_id)
+    
+    scraped = []
+    failed = 0
+    async for slug, scraped_data, error in scrape_leetcode_problems_batch_async(
+        missing, concurrency=BATCH_SCRAPE_CONCURRENCY
+    ):
+        if error:
+            failed += 1
+            yield event(type="item", slug=slug, status="failed", error=error)
+        else:
+            scraped.append(scraped_data)
+            yield event(type="item", slug=slug, status="fetched", title=scraped_data["title"])
+    
+    saved = 0
+    if scraped:
+        try:
+            results = database.save_problems([
+                {
+                    "title": data["title"],
+                    "description": data["description"],
+                    "difficulty": data["difficulty"],
+                    "details": data["details"],
+                    "source": "leetcode",
+                    "leetcode_slug": data["leetcode_slug"],
+                    "starter_codes": data["starter_codes"],
+                    "tags": data["tags"]
+                }
+                for data in scraped
+            ])
+        except Exception as e:
+            # The transaction as a whole failed (e.g. the database is locked)
+            print(f"❌ Error saving batch import: {str(e)}")
+            results = [(None, str(e))] * len(scraped)
+        
+        for data, (problem_id, error) in zip(scraped, results):
+            if error:
+                failed += 1
+                yield event(type="item", slug=data["leetcode_slug"], status="failed", error=f"Failed to save: {error}")
+            else:
+                saved += 1
+                yield event(type="item", slug=data["leetcode_slug"], status="saved", problem_id=problem_id)
+    
+    print(f"✅ Batch import finished: {saved} saved, {len(existing)} cached, {failed} failed, {len(invalid)} invalid")
+    yield event(type="done", saved=saved, cached=len(existing), failed=failed, invalid=len(invalid))
+
+
+def _batch_scrape_response(entries: List[str]) -> StreamingResponse:
+    if not entries:
+        raise HTTPException(status_code=400, detail="No LeetCode URLs or slugs provided")
+    if len(entries) > BATCH_SCRAPE_MAX_ITEMS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Too many problems in one batch ({len(entries)}); the limit is {BATCH_SCRAPE_MAX_ITEMS}"
+        )
+    
+    return StreamingResponse(_batch_scrape_events(entries), media_type="application/x-ndjson")
+
+
+@router.post("/api/scrape_leetcode/batch")
+async def scrape_leetcode_batch(request: BatchScrapeRequest):
+    """
+    Import many LeetCode problems at once.
+    
+    Accepts LeetCode problem URLs or bare slugs and streams NDJSON progress:
+    a "start" line with counts, one "item" line per problem as it is found
+    cached, fetched, saved, failed or rejected as invalid, and a final "done" line.
+    
+    Example:
+        {"urls": ["https://leetcode.com/problems/two-sum/", "valid-parentheses"]}
+    """
+    return _batch_scrape_response(request.urls)
+
+
+@router.post("/api/scrape_leetcode/batch/file")
+async def scrape_leetcode_batch_file(file: UploadFile = File(...)):
+    """
+    Import a study-list file: one LeetCode URL or slug per line.
+    
+    Blank lines and lines starting with '#' are ignored. Streams the same NDJSON
+    progress as /api/scrape_leetcode/batch.
+    """
+    content = (await file.read()).decode("utf-8", errors="replace")
+    entries = [
+        line.strip()
+        for line in content.splitlines()
+        if line.strip() and not line.strip().startswith("#")
+    ]
+    
+    return _batch_scrape_response(entries)
+
+
 @router.get("/api/problem/{problem_id}", response_model=ProblemResponse)
 async def get_problem(problem_id: int):
     """
     Retrieve a problem by ID.
     
     This endpoint fetches a complete problem with all related data including
-    starter code snippets and tags.
+    starter code snippets and tags. The response body is prebuilt when the
+    problem is saved and carries an ETag.
     
     Args:
         problem_id: The database ID of the problem
@@ -159,27 +314,22 @@ async def get_problem(problem_id: int):
     """
     print(f"🔍 Fetching problem with ID: {problem_id}")
     
-    problem = database.get_problem_by_id(problem_id)
+    # Served from the JSON body prebuilt when the problem was saved
+    payload = database.get_problem_payload(problem_id, problem_payloads.PROBLEM)
     
-    if not problem:
+    if not payload:
         raise HTTPException(
             status_code=404,
             detail=f"Problem with ID {problem_id} not found"
         )
     
-    print(f"✅ Retrieved problem: {problem['title']}")
+    body, etag, problem = payload
+    get_access_tracker().touch(problem_id)
+    schedule_refresh_if_stale(problem)
+    
+    print(f"✅ Retrieved problem ID: {problem_id}")
     
-    return ProblemResponse(
-        id=problem["id"],
-        title=problem["title"],
-        description=problem["description"],
-        difficulty=problem["difficulty"],
-        details=problem["details"],
-        starter_codes=problem["starter_codes"],
-        tags=problem["tags"],
-        source=problem["source"],
-        leetcode_slug=problem.get("leetcode_slug")
-    )
+    return Response(content=body, media_type="application/json", headers={"ETag": etag})
 
 
 @router.get("/api/problems/stats")
@@ -194,5 +344,6 @@ async def get_problems_stats():
     # Could be expanded to return more detailed stats
     return {
         "status": "ok",
-        "message": "Problem database is operational"
+        "message": "Problem database is operational",
+        "cache": database.get_problem_cache_stats()
     }
@@ -0,0 +1,46 @@
+"""
+Single-flight coalescing of concurrent async work.
+
+When several requests need the same expensive result at the same time (e.g. the
+first page loads of a scores page all asking for improvement points), only the
+first caller runs the work; the others await the same in-flight task and receive
+its result or exception.
+"""
+
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+
+class SingleFlight:
+    """Deduplicates concurrent calls that share a key"""
+    
+    def __init__(self):
+        self._tasks: Dict[Hashable, asyncio.Task] = {}
+    
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Run fn() unless a call with the same key is already in flight, and return its result.
+        
+        The work runs as its own task, so a caller that is cancelled (e.g. a client
+        disconnect) does not cancel the work other callers are waiting on.
+        
+        Args:
+            key: Identifies the work being coalesced
+            fn: Zero-argument coroutine function performing the work
+        
+        Returns:
+            The result of the single shared execution
+        """
+        task = self._tasks.get(key)
+        if task is None:
+            task = asyncio.ensure_future(fn())
+            self._tasks[key] = task
+            task.add_done_callback(lambda _: self._tasks.pop(key, None))
+        return await asyncio.shield(task)
+    
+    def in_flight(self, key: Hashable) -> bool:
+        """Whether work for a key is currently running."""
+        return key in self._tasks
+    
+    def __len__(self) -> int:
+        return len(self._tasks)
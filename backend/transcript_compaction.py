@@ -0,0 +1,134 @@
+"""
+Compaction of interview transcripts before they are sent to Gemini.
+
+Speech-to-text delivers a long call as many short fragments, and
+format_transcript_for_rating used to emit one timestamped line per fragment.
+compact_transcript shrinks the segments first:
+
+- fragments that are only a disfluency ("um", "uh", "erm") are dropped;
+  short answers and backchannels ("yes", "okay", "mm hmm") are kept
+- a fragment that the next fragment of the same speaker repeats or extends (a
+  streaming partial stored next to its final) is dropped
+- consecutive fragments of the same speaker are merged into one utterance,
+  timestamped with its first fragment
+
+fit_lines_to_budget then keeps the formatted transcript within a token budget
+(estimated locally as characters / 4): the opening lines are kept, and the
+oldest utterances after them are replaced by one line saying how much was left
+out. The running summary of incremental rating (rating_queue.py) is the
+model-written alternative for the early part of long calls.
+
+Run `python -m bench.prompt_tokens [limit]` from backend/ to compare prompt
+tokens and estimated model latency with and without compaction on stored
+transcripts (a synthetic speech-to-text corpus is used if the database has none).
+"""
+
+import re
+from typing import Dict, List, Optional
+
+# Transcript lines kept verbatim at the start of the call when the budget is exceeded
+_OPENING_LINES = 4
+
+# Fragments consisting only of these (after normalization) carry nothing for the rating.
+# Only true disfluencies: "mhm", "uh huh" and the like can be the answer to a question.
+_FILLERS = {"um", "umm", "uh", "uhh", "uhm", "er", "erm"}
+
+_NON_WORD_RE = re.compile(r"[^\w\s']+")
+_SPACE_RE = re.compile(r"\s+")
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count of a prompt (about four characters per token for English text)."""
+    return (len(text) + 3) // 4
+
+
+def _normalize(text: str) -> str:
+    """Lowercase text without punctuation and repeated spaces, for comparing fragments."""
+    return _SPACE_RE.sub(" ", _NON_WORD_RE.sub(" ", text.lower())).strip()
+
+
+def compact_transcript(transcript: List[Dict]) -> List[Dict]:
+    """
+    Drop filler and duplicate fragments and merge consecutive fragments of the same speaker.
+    
+    Args:
+        transcript: List of transcript segments
+    
+    Returns:
+        New list of segments; the input is not modified
+    """
+    # Transcript fragments worth keeping, with their normalized text
+    kept: List[Dict] = []
+    normalized: List[Optional[str]] = []
+    for segment in transcript:
+        if segment.get('type') != 'transcript':
+            kept.append(segment)
+            normalized.append(None)
+            continue
+        
+        text = (segment.get('text') or '').strip()
+        key = _normalize(text)
+        if not key or key in _FILLERS:
+            continue
+        
+        # A previous fragment of this speaker that this one repeats or extends is a stale partial
+        if (
+            normalized
+            and normalized[-1] is not None
+            and kept[-1].get('role') == segment.get('role')
+            and (key == normalized[-1] or key.startswith(normalized[-1] + " "))
+        ):
+            kept.pop()
+            normalized.pop()
+        
+        kept.append(segment)
+        normalized.append(key)
+    
+    compacted: List[Dict] = []
+    for segment in kept:
+        previous = compacted[-1] if compacted else None
+        if (
+            segment.get('type') == 'transcript'
+            and previous is not None
+            and previous.get('type') == 'transcript'
+            and previous.get('role') == segment.get('role')
+        ):
+            compacted[-1] = {**previous, 'text': f"{previous['text']} {segment['text'].strip()}"}
+        elif segment.get('type') == 'transcript':
+            compacted.append({**segment, 'text': (segment.get('text') or '').strip()})
+        else:
+            compacted.append(segment)
+    
+    return compacted
+
+
+def fit_lines_to_budget(lines: List[str], max_tokens: int) -> List[str]:
+    """
+    Leave out the oldest transcript lines after the opening until the rest fits a token budget.
+    
+    Args:
+        lines: Formatted transcript lines, oldest first
+        max_tokens: Token budget for the joined lines (0 or less to keep everything)
+    
+    Returns:
+        The lines that fit, with a marker line where lines were left out
+    """
+    if max_tokens <= 0 or estimate_tokens("\n".join(lines)) <= max_tokens:
+        return lines
+    
+    # Characters of the joined text; each line costs its length plus a newline
+    budget_chars = max_tokens * 4
+    total = sum(len(line) + 1 for line in lines)
+    opening = lines[:_OPENING_LINES]
+    rest = lines[_OPENING_LINES:]
+    marker_chars = 80
+    
+    dropped = 0
+    while dropped < len(rest) - 1 and total + marker_chars > budget_chars:
+        total -= len(rest[dropped]) + 1
+        dropped += 1
+    
+    if dropped == 0:
+        return lines
+    marker = f"[... {dropped} earlier transcript lines left out to fit the prompt size ...]"
+    return opening + [marker] + rest[dropped:]
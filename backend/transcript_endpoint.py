@@ -1,12 +1,19 @@
-from fastapi import APIRouter, HTTPException
-from pydantic import BaseModel
+from fastapi import APIRouter, HTTPException, Query, Response, WebSocket, WebSocketDisconnect
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, Field, ValidationError
 from typing import List, Optional, Literal
 from datetime import datetime
+import fast_json
 import database
 from gemini_rating_service import get_rating_service, TranscriptRating
+from rating_queue import get_rating_queue
+from singleflight import SingleFlight
 
 router = APIRouter()
 
+# Coalesces concurrent improvement-point generations for the same transcript
+_improvement_flights = SingleFlight()
+
 
 class TranscriptSegment(BaseModel):
     type: Literal["transcript", "call-start", "call-end"]
@@ -69,8 +76,12 @@ async def receive_transcript(request: TranscriptRequest):
         "transcript_summary": {
             "user_messages": <count>,
             "assistant_messages": <count>
-        }
+        },
+        "rating_status": "pending"
     }
+    
+    Rating runs in the background; poll GET /api/transcript/{transcript_id}/rating
+    until rating_status is "complete" (or "failed").
     """
     try:
         if not request.transcript or len(request.transcript) == 0:
@@ -107,36 +118,9 @@ async def receive_transcript(request: TranscriptRequest):
             metadata=request.metadata
         )
         
-        # Automatically rate the transcript with Gemini AI
-        ratings_dict = None
-        try:
-            print(f"\n{'='*60}")
-            print(f"🤖 Auto-rating transcript ID: {transcript_id}")
-            print(f"   Duration: {call_duration:.1f}s")
-            print(f"   Messages: {user_messages} user, {assistant_messages} assistant")
-            
-            rating_service = get_rating_service()
-            print(f"   Sending to Gemini API for rating...")
-            
-            rating = rating_service.rate_transcript(
-                transcript=transcript_dict,
-                metadata=request.metadata
-            )
-            
-            # Save ratings to database
-            ratings_dict = rating.dict()
-            database.save_ratings(transcript_id, ratings_dict)
-            
-            print(f"   ✅ Auto-rating complete and saved!")
-            print(f"   Communication: {rating.communication_grade}")
-            print(f"   Problem Solving: {rating.problem_solving_grade}")
-            print(f"   Implementation: {rating.implementation_grade}")
-            print(f"{'='*60}\n")
-            
-        except Exception as rating_error:
-            print(f"⚠️  Warning: Failed to auto-rate transcript: {str(rating_error)}")
-            print(f"   Transcript saved but ratings not available")
-            # Continue even if rating fails - transcript is still saved
+        # Queue the transcript for rating with Gemini AI - rating happens in the background
+        get_rating_queue().enqueue(transcript_id)
+        print(f"🤖 Queued transcript ID {transcript_id} for rating")
         
         response_data = {
             "status": "success",
@@ -148,12 +132,13 @@ async def receive_transcript(request: TranscriptRequest):
                 "user_messages": user_messages,
                 "assistant_messages": assistant_messages
             },
-            "ratings": ratings_dict,
-            "auto_rated": ratings_dict is not None
+            "rating_status": "pending",
+            "ratings": None,
+            "auto_rated": False
         }
         
         return response_data
-        
+    
     except HTTPException:
         raise
     except Exception as e:
@@ -161,34 +146,313 @@ async def receive_transcript(request: TranscriptRequest):
         raise HTTPException(status_code=500, detail=f"Error processing transcript: {str(e)}")
 
 
-@router.get("/api/transcripts")
-async def get_all_transcripts():
+class SessionSegment(TranscriptSegment):
+    seq: int = Field(..., ge=0)  # position in the transcript, assigned by the client
+
+
+class OpenSessionRequest(BaseModel):
+    metadata: Optional[dict] = None
+
+
+class AppendSegmentsRequest(BaseModel):
+    segments: List[SessionSegment]
+
+
+class CloseSessionRequest(BaseModel):
+    metadata: Optional[dict] = None
+
+
+def _append_segments(transcript_id: int, segments: List[SessionSegment]) -> dict:
+    """Append a batch to a session, raising 404/409 like the HTTP endpoint."""
+    state = database.append_transcript_segments(
+        transcript_id,
+        [(seg.seq, seg.dict(exclude={"seq"})) for seg in segments]
+    )
+    
+    if state is None:
+        raise HTTPException(status_code=404, detail=f"Transcript with ID {transcript_id} not found")
+    if state["rating_status"] != "recording":
+        raise HTTPException(status_code=409, detail=f"Transcript session {transcript_id} is already closed")
+    
+    return {"transcript_id": transcript_id, **state}
+
+
+@router.post("/api/transcript/session")
+async def open_transcript_session(request: Optional[OpenSessionRequest] = None):
     """
-    GET endpoint to retrieve all transcripts.
+    POST endpoint to start recording a transcript while the call is running.
+    
+    Segments are then appended with POST /api/transcript/session/{transcript_id}/segments
+    (or over the WebSocket at /api/transcript/session/{transcript_id}/stream) and the
+    session is closed with POST /api/transcript/session/{transcript_id}/close, which
+    queues the rating. Sessions that receive no segments for TRANSCRIPT_SESSION_IDLE_SECONDS
+    are closed automatically, so an interview survives a lost close request.
+    
+    Expected JSON payload (optional):
+    {
+        "metadata": {"userId": "optional-user-id", "sessionId": "optional-session-id"}
+    }
     
     Returns:
+    {
+        "transcript_id": 7,
+        "rating_status": "recording"
+    }
+    """
+    try:
+        transcript_id = database.open_transcript_session(request.metadata if request else None)
+        
+        return {
+            "transcript_id": transcript_id,
+            "rating_status": "recording"
+        }
+    
+    except Exception as e:
+        print(f"Error opening transcript session: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Error opening transcript session: {str(e)}")
+
+
+@router.post("/api/transcript/session/{transcript_id}/segments")
+async def append_transcript_segments(transcript_id: int, request: AppendSegmentsRequest):
+    """
+    POST endpoint to append a batch of segments to an open session.
+    
+    Every segment carries a "seq" (0, 1, 2, ... in call order). Segments whose
+    seq was already received are ignored, so a batch can be retried safely.
+    
+    Expected JSON payload:
+    {
+        "segments": [
+            {
+                "seq": 3,
+                "type": "transcript",
+                "role": "user",
+                "text": "Hello, I need help with this problem",
+                "timestamp": "2025-10-04T12:00:05.000Z",
+                "secondsSinceStart": 5.0
+            }
+        ]
+    }
+    
+    Returns:
+    {
+        "transcript_id": 7,
+        "segment_count": 4,
+        "user_messages": 2,
+        "assistant_messages": 1,
+        "call_duration": 5.0,
+        "rating_status": "recording",
+        "inserted": 1
+    }
+    """
+    try:
+        return _append_segments(transcript_id, request.segments)
+    
+    except HTTPException:
+        raise
+    except Exception as e:
+        print(f"Error appending transcript segments: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Error appending transcript segments: {str(e)}")
+
+
+@router.websocket("/api/transcript/session/{transcript_id}/stream")
+async def stream_transcript_segments(websocket: WebSocket, transcript_id: int):
+    """
+    WebSocket endpoint to append segments to an open session.
+    
+    Each message is a JSON batch in the same format as
+    POST /api/transcript/session/{transcript_id}/segments and is answered with
+    the same counters, or with {"error": "...", "status_code": ...}. Closing
+    the socket does not close the session.
+    """
+    await websocket.accept()
+    try:
+        while True:
+            message = await websocket.receive_text()
+            try:
+                batch = AppendSegmentsRequest.model_validate_json(message)
+                await websocket.send_json(_append_segments(transcript_id, batch.segments))
+            except ValidationError as e:
+                await websocket.send_json({"error": str(e), "status_code": 422})
+            except HTTPException as e:
+                await websocket.send_json({"error": e.detail, "status_code": e.status_code})
+                if e.status_code in (404, 409):
+                    await websocket.close(code=1008)
+                    return
+    except WebSocketDisconnect:
+        pass
+
+
+@router.post("/api/transcript/session/{transcript_id}/close")
+async def close_transcript_session(transcript_id: int, request: Optional[CloseSessionRequest] = None):
+    """
+    POST endpoint to finish a session and queue its rating.
+    
+    The counters are kept up to date while segments arrive, so closing takes
+    the same time for any call length. Closing an already closed session
+    returns its current state without queueing the rating again.
+    
+    Expected JSON payload (optional):
+    {
+        "metadata": {"duration": 300}   (merged into the metadata given when opening)
+    }
+    
+    Returns the same shape as POST /api/transcript.
+    """
+    try:
+        transcript = database.get_transcript_metadata(transcript_id)
+        if not transcript:
+            raise HTTPException(status_code=404, detail=f"Transcript with ID {transcript_id} not found")
+        if transcript["rating_status"] == "recording" and not transcript["segment_count"]:
+            raise HTTPException(status_code=400, detail="Transcript cannot be empty")
+        
+        closed = database.close_transcript_session(transcript_id, request.metadata if request else None)
+        if closed:
+            # Queue the transcript for rating with Gemini AI - rating happens in the background
+            get_rating_queue().enqueue(transcript_id)
+            print(f"🤖 Queued transcript ID {transcript_id} for rating")
+            transcript = database.get_transcript_metadata(transcript_id)
+        
+        return {
+            "status": "success",
+            "message": "Transcript session closed" if closed else "Transcript session was already closed",
+            "transcript_id": transcript_id,
+            "segments_count": transcript["segment_count"],
+            "call_duration": transcript["call_duration"],
+            "transcript_summary": {
+                "user_messages": transcript["user_messages"],
+                "assistant_messages": transcript["assistant_messages"]
+            },
+            "rating_status": transcript["rating_status"],
+            "ratings": transcript["ratings"],
+            "auto_rated": False
+        }
+    
+    except HTTPException:
+        raise
+    except Exception as e:
+        print(f"Error closing transcript session: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Error closing transcript session: {str(e)}")
+
+
+@router.get("/api/transcripts")
+async def get_all_transcripts(
+    response: Response,
+    before_id: Optional[int] = None,
+    limit: int = Query(50, ge=1, le=200),
+    view: Literal["summary", "full"] = "summary",
+    session_id: Optional[str] = None,
+    user_id: Optional[str] = None
+):
+    """
+    GET endpoint to list transcripts, newest first, one page at a time.
+    
+    Query parameters:
+        before_id: Return transcripts older than this ID (use X-Next-Before-Id from the previous page)
+        limit: Page size (1-200, default 50)
+        view: "summary" (default, no transcript segments) or "full"
+        session_id / user_id: Filter on metadata.sessionId / metadata.userId
+    
+    The X-Next-Before-Id response header is set when more transcripts are available.
+    
+    Returns (summary view):
     [
         {
             "id": 2,
-            "transcript": [...],
             "call_duration": 300.0,
             "user_messages": 5,
             "assistant_messages": 5,
             "metadata": {...},
-            "created_at": "2025-10-04T12:00:00"
+            "created_at": "2025-10-04T12:00:00",
+            "rated_at": "2025-10-04T12:00:10",
+            "rating_status": "complete",
+            "grades": {
+                "communication_grade": "A",
+                "problem_solving_grade": "B+",
+                "implementation_grade": "B"
+            }
         },
         {...}
     ]
     """
     try:
-        transcripts = database.get_all_transcripts()
-        return transcripts
+        # Fetch one extra row to learn whether another page exists
+        transcripts = database.list_transcripts(
+            before_id=before_id,
+            limit=limit + 1,
+            view=view,
+            session_id=session_id,
+            user_id=user_id
+        )
         
+        if len(transcripts) > limit:
+            transcripts = transcripts[:limit]
+            response.headers["X-Next-Before-Id"] = str(transcripts[-1]["id"])
+        
+        return transcripts
+    
     except Exception as e:
         print(f"Error retrieving transcripts: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Error retrieving transcripts: {str(e)}")
 
 
+@router.get("/api/transcripts/stats")
+async def get_transcript_stats(session_id: Optional[str] = None, user_id: Optional[str] = None):
+    """
+    GET endpoint for totals over all transcripts (GET /api/transcripts returns one page at a time).
+    
+    Query parameters:
+        session_id / user_id: Filter on metadata.sessionId / metadata.userId
+    
+    Returns:
+    {
+        "count": 120,
+        "total_duration": 36000.0,
+        "average_duration": 300.0
+    }
+    """
+    try:
+        return database.get_transcript_totals(session_id=session_id, user_id=user_id)
+    
+    except Exception as e:
+        print(f"Error retrieving transcript stats: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Error retrieving transcript stats: {str(e)}")
+
+
+@router.get("/api/transcripts/export")
+async def export_transcripts(
+    since: Optional[str] = None,
+    until: Optional[str] = None,
+    after_id: Optional[int] = None
+):
+    """
+    GET endpoint to stream every transcript with its ratings as NDJSON.
+    
+    One JSON object per line, oldest first, in the same shape as
+    GET /api/transcript/{transcript_id}. Memory use stays constant regardless
+    of table size.
+    
+    Query parameters:
+        since / until: ISO timestamps bounding created_at (since inclusive, until exclusive)
+        after_id: Resume an interrupted export - pass the "id" of the last line received
+    
+    Example:
+        curl "http://127.0.0.1:8001/api/transcripts/export?since=2025-10-01T00:00:00" > transcripts.ndjson
+    """
+    for name, value in (("since", since), ("until", until)):
+        if value is not None:
+            try:
+                datetime.fromisoformat(value)
+            except ValueError:
+                raise HTTPException(status_code=400, detail=f"'{name}' must be an ISO 8601 timestamp")
+    
+    def generate_lines():
+        for transcript in database.iter_transcripts(after_id=after_id, since=since, until=until):
+            yield fast_json.dumps(transcript) + "\n"
+    
+    return StreamingResponse(generate_lines(), media_type="application/x-ndjson")
+
+
 @router.get("/api/transcript/latest")
 async def get_latest_transcript():
     """
@@ -212,7 +476,7 @@ async def get_latest_transcript():
             raise HTTPException(status_code=404, detail="No transcripts found")
         
         return transcript
-        
+    
     except HTTPException:
         raise
     except Exception as e:
@@ -221,10 +485,20 @@ async def get_latest_transcript():
 
 
 @router.get("/api/transcript/{transcript_id}")
-async def get_transcript(transcript_id: int):
+async def get_transcript(
+    transcript_id: int,
+    view: Literal["full", "metadata"] = "full",
+    start: Optional[float] = Query(None, ge=0),
+    end: Optional[float] = Query(None, ge=0)
+):
     """
     GET endpoint to retrieve a specific transcript by ID.
     
+    Query parameters:
+        view: "full" (default) or "metadata" (no segments; includes segment_count instead)
+        start / end: Only include segments from start (inclusive) to end (exclusive),
+                     in seconds since the call started
+    
     Returns:
     {
         "id": 1,
@@ -237,13 +511,16 @@ async def get_transcript(transcript_id: int):
     }
     """
     try:
-        transcript = database.get_transcript(transcript_id)
+        if view == "metadata":
+            transcript = database.get_transcript_metadata(transcript_id)
+        else:
+            transcript = database.get_transcript(transcript_id, start_seconds=start, end_seconds=end)
         
         if not transcript:
             raise HTTPException(status_code=404, detail=f"Transcript with ID {transcript_id} not found")
         
         return transcript
-        
+    
     except HTTPException:
         raise
     except Exception as e:
@@ -274,7 +551,7 @@ async def delete_transcript(transcript_id: int):
             "message": "Transcript deleted",
             "transcript_id": transcript_id
         }
-        
+    
     except HTTPException:
         raise
     except Exception as e:
@@ -288,28 +565,119 @@ async def transcript_health():
     return {"status": "healthy", "endpoint": "transcript"}
 
 
+@router.get("/api/transcript/{transcript_id}/rating")
+async def get_rating_status(transcript_id: int):
+    """
+    GET endpoint to poll the rating of a transcript.
+    
+    Returns:
+    {
+        "transcript_id": 1,
+        "rating_status": "pending" | "complete" | "failed",
+        "ratings": {...} or null,
+        "rated_at": "2025-10-04T12:05:10" or null
+    }
+    """
+    try:
+        # Polled while the rating runs, so the segments are not loaded
+        transcript = database.get_transcript_metadata(transcript_id)
+        
+        if not transcript:
+            raise HTTPException(status_code=404, detail=f"Transcript with ID {transcript_id} not found")
+        
+        return {
+            "transcript_id": transcript_id,
+            "rating_status": transcript["rating_status"],
+            "ratings": transcript["ratings"],
+            "rated_at": transcript["rated_at"]
+        }
+    
+    except HTTPException:
+        raise
+    except Exception as e:
+        print(f"Error retrieving rating: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Error retrieving rating: {str(e)}")
+
+
+@router.post("/api/transcript/{transcript_id}/rating")
+async def requeue_rating(transcript_id: int):
+    """
+    POST endpoint to (re)queue a transcript for rating, e.g. after a failed attempt.
+    
+    Only transcripts whose rating failed or is still pending can be queued;
+    rated transcripts and sessions that are still recording get a 409.
+    
+    Returns:
+    {
+        "transcript_id": 1,
+        "rating_status": "pending"
+    }
+    """
+    try:
+        rating_status = database.requeue_rating(transcript_id)
+        if rating_status is None:
+            raise HTTPException(status_code=404, detail=f"Transcript with ID {transcript_id} not found")
+        if rating_status != "pending":
+            raise HTTPException(
+                status_code=409,
+                detail=f"Transcript {transcript_id} cannot be queued for rating while it is '{rating_status}'"
+            )
+        
+        get_rating_queue().enqueue(transcript_id)
+        
+        return {
+            "transcript_id": transcript_id,
+            "rating_status": "pending"
+        }
+    
+    except HTTPException:
+        raise
+    except Exception as e:
+        print(f"Error queueing rating: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Error queueing rating: {str(e)}")
+
+
 @router.get("/api/transcript/{transcript_id}/improvements")
-async def get_improvement_points(transcript_id: int):
+async def get_improvement_points(transcript_id: int, refresh: bool = False):
     """
-    GET endpoint to generate and retrieve 3 improvement points for a specific transcript.
+    GET endpoint to retrieve 3 improvement points for a specific transcript.
+    
+    Points are generated once and stored, keyed by a hash of the formatted
+    transcript, prompt version and model; later requests return the stored
+    points. Concurrent first requests share a single generation.
+    Pass ?refresh=true to force regeneration.
     """
     try:
         # Retrieve the transcript from the database
         transcript_data = database.get_transcript(transcript_id)
         if not transcript_data:
             raise HTTPException(status_code=404, detail=f"Transcript with ID {transcript_id} not found")
-
+        
         # Initialize the Gemini service
         rating_service = get_rating_service()
-
-        # Generate improvement points
-        improvement_points = rating_service.generate_improvement_points(
+        
+        cache_key = rating_service.improvement_cache_key(
             transcript=transcript_data['transcript'],
             metadata=transcript_data.get('metadata')
         )
-
-        return improvement_points.dict()
-
+        
+        if not refresh:
+            stored_points = database.get_improvement_points(transcript_id, cache_key)
+            if stored_points is not None:
+                return {"points": stored_points}
+        
+        async def generate():
+            # Generate improvement points and store them for later requests
+            improvement_points = await rating_service.generate_improvement_points_async(
+                transcript=transcript_data['transcript'],
+                metadata=transcript_data.get('metadata')
+            )
+            database.save_improvement_points(transcript_id, cache_key, improvement_points.points, rating_service.model)
+            return improvement_points.points
+        
+        points = await _improvement_flights.do((transcript_id, cache_key), generate)
+        return {"points": points}
+    
     except HTTPException:
         raise
     except Exception as e:
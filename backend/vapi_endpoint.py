@@ -1,13 +1,30 @@
-from fastapi import APIRouter, HTTPException
-from pydantic import BaseModel
-from typing import Optional, Dict, Any
+from fastapi import APIRouter, HTTPException, Request
+from pydantic import BaseModel, Field
+from typing import Optional, Dict, List
+import fast_json
+from code_state import CodeVersionMismatch, get_code_state_store
+from vapi_events import get_event_pipeline
 
 router = APIRouter()
 
 
+class CodeEdit(BaseModel):
+    offset: int = Field(..., ge=0)  # character offset in the code as left by the previous edit
+    delete: int = Field(0, ge=0)  # number of characters removed at offset
+    insert: str = ""  # text inserted at offset
+
+
+class CodeDelta(BaseModel):
+    base_version: int  # code_version from the last acknowledged response
+    edits: Optional[List[CodeEdit]] = None
+    diff: Optional[str] = None  # unified diff against the acknowledged code
+
+
 class VapiWebhookRequest(BaseModel):
     transcript: str
-    code_context: Optional[Dict[str, str]] = None  # expects {'code': '<entire code as string>'}
+    call_id: Optional[str] = None  # VAPI call ID; the code is tracked per call
+    code_context: Optional[Dict[str, str]] = None  # full snapshot: {'code': '<entire code as string>', 'language': '...'}
+    code_delta: Optional[CodeDelta] = None  # changes since base_version
 
 
 @router.post("/api/vapi_webhook")
@@ -15,25 +32,78 @@ async def vapi_webhook(request: VapiWebhookRequest):
     """
     POST endpoint to receive VAPI webhook data.
     
+    The code is stored per call. Send the entire code once as code_context,
+    then only code_delta with the code_version of the last response as
+    base_version. A delta that doesn't match the server's copy gets a 409 with
+    the current version; send code_context again to resync.
+    
     Expected JSON payload:
     {
         "transcript": "speech-to-text output string",
+        "call_id": "vapi-call-id",
         "code_context": {
             "code": "<entire code as string>"
         }
     }
+    or, after the first snapshot:
+    {
+        "transcript": "speech-to-text output string",
+        "call_id": "vapi-call-id",
+        "code_delta": {
+            "base_version": 3,
+            "edits": [{"offset": 120, "delete": 4, "insert": "seen"}]
+        }
+    }
+    
+    Returns:
+    {
+        "status": "success",
+        "message": "Webhook received successfully",
+        "code_version": 4
+    }
     """
     try:
         if not request.transcript or not request.transcript.strip():
             raise HTTPException(status_code=400, detail="Transcript cannot be empty")
         
+        if request.code_delta is not None and not request.call_id:
+            raise HTTPException(status_code=400, detail="call_id is required with code_delta")
+        
+        store = get_code_state_store()
+        code_version = None
+        
+        if request.call_id:
+            if request.code_context is not None and "code" in request.code_context:
+                code_version = store.snapshot(
+                    request.call_id,
+                    request.code_context["code"],
+                    request.code_context.get("language")
+                )
+            elif request.code_delta is not None:
+                delta = request.code_delta
+                try:
+                    code_version = store.apply_delta(
+                        request.call_id,
+                        delta.base_version,
+                        edits=[edit.dict() for edit in delta.edits] if delta.edits else None,
+                        diff=delta.diff
+                    )
+                except CodeVersionMismatch as e:
+                    raise HTTPException(
+                        status_code=409,
+                        detail={
+                            "message": f"{str(e)} - send the full code as code_context",
+                            "code_version": e.current_version
+                        }
+                    )
+            else:
+                state = store.get(request.call_id)
+                code_version = state.version if state else None
+        
         response_data = {
             "status": "success",
             "message": "Webhook received successfully",
-            "received": {
-                "transcript": request.transcript,
-                "code_context": request.code_context,
-            }
+            "code_version": code_version
         }
         
         return response_data
@@ -42,3 +112,69 @@ async def vapi_webhook(request: VapiWebhookRequest):
         raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
+
+
+@router.get("/api/vapi_webhook/{call_id}/code")
+async def get_call_code(call_id: str):
+    """
+    GET endpoint to retrieve the code the server holds for a call.
+    
+    Returns:
+    {
+        "call_id": "vapi-call-id",
+        "code_version": 4,
+        "language": "python",
+        "code": "<entire code as string>"
+    }
+    """
+    state = get_code_state_store().get(call_id)
+    if state is None:
+        raise HTTPException(status_code=404, detail=f"No code stored for call {call_id}")
+    
+    return {
+        "call_id": call_id,
+        "code_version": state.version,
+        "language": state.language,
+        "code": state.code
+    }
+
+
+@router.post("/api/vapi_events")
+async def vapi_events(request: Request):
+    """
+    POST endpoint for VAPI server messages (the assistant's server URL).
+    
+    Events are only buffered here; transcripts are written to the database in
+    batches by the event pipeline (see vapi_events.py). Partial transcripts are
+    collapsed into the final one, and the call's transcript is queued for
+    rating when the end-of-call report arrives.
+    
+    Expected JSON payload:
+    {
+        "message": {
+            "type": "transcript",
+            "transcriptType": "final",
+            "role": "user",
+            "transcript": "I would use a hash map",
+            "timestamp": 1759579205000,
+            "call": {"id": "vapi-call-id"}
+        }
+    }
+    """
+    try:
+        payload = fast_json.loads(await request.body())
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Request body must be JSON")
+    
+    message = payload.get("message") if isinstance(payload, dict) else None
+    if not isinstance(message, dict):
+        raise HTTPException(status_code=400, detail="Expected a 'message' object")
+    
+    get_event_pipeline().handle(message)
+    return {"status": "ok"}
+
+
+@router.get("/api/vapi_events/stats")
+async def vapi_events_stats():
+    """GET endpoint for the event pipeline's counters (events, flushes, buffered segments)."""
+    return get_event_pipeline().stats()
@@ -0,0 +1,335 @@
+"""
+Pipeline for VAPI server events.
+
+VAPI sends server messages for every call - partial and final transcripts,
+speech updates, status updates - at tens per second per call. Writing each one
+to the database would mean a transaction per event, so POST /api/vapi_events
+only updates in-memory state:
+
+- each call has a bounded ring buffer (VAPI_EVENT_BUFFER_SIZE) of segments
+  waiting to be written
+- partial transcripts never enter the buffer: only the latest partial per role
+  is kept, and the final transcript replaces it (a partial still open when the
+  call ends is written as the last utterance)
+- speech and status updates only update counters and the call's state
+
+A background task flushes every VAPI_EVENT_FLUSH_MS milliseconds: the pending
+segments of all calls are appended to their transcript sessions in a single
+transaction (a session is opened on a call's first flush), each call under its
+own savepoint so that a call that cannot be written does not hold back the
+others. Its segments are kept for the next flush, and after
+VAPI_CALL_MAX_FLUSH_FAILURES failed flushes in a row the call is dropped. When a
+call ends, its session is closed in the same transaction and the transcript is
+queued for rating.
+A call without events for VAPI_CALL_IDLE_SECONDS is ended the same way. Events
+that arrive for a call after it ended are ignored, so a late event cannot start
+a second transcript for the same call.
+
+Run `python -m bench.vapi_load [calls] [seconds] [events_per_second]` from
+backend/ to drive the pipeline with simulated calls through the full app (in
+process, one worker).
+"""
+
+import asyncio
+import os
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Any, Deque, Dict, List, Optional, Tuple
+from cachetools import LRUCache
+import database
+from rating_queue import get_rating_queue
+
+
+# Milliseconds between flushes of buffered segments to the database
+VAPI_EVENT_FLUSH_MS = float(os.getenv("VAPI_EVENT_FLUSH_MS", "250"))
+
+# Segments buffered per call before the oldest are dropped
+VAPI_EVENT_BUFFER_SIZE = int(os.getenv("VAPI_EVENT_BUFFER_SIZE", "512"))
+
+# Seconds without events after which a call is ended and its transcript closed
+VAPI_CALL_IDLE_SECONDS = float(os.getenv("VAPI_CALL_IDLE_SECONDS", "600"))
+
+# Consecutive failed flushes of a call after which its buffered segments are discarded
+VAPI_CALL_MAX_FLUSH_FAILURES = int(os.getenv("VAPI_CALL_MAX_FLUSH_FAILURES", "5"))
+
+
+@dataclass
+class CallBuffer:
+    """In-memory state of one call"""
+    call_id: str
+    started_at: float  # epoch seconds of the call's first event
+    last_event_at: float
+    segments: Deque[Dict[str, Any]] = field(default_factory=lambda: deque(maxlen=VAPI_EVENT_BUFFER_SIZE))
+    partials: Dict[str, Tuple[str, float]] = field(default_factory=dict)  # role -> (text, epoch seconds)
+    speaking: Dict[str, bool] = field(default_factory=dict)
+    transcript_id: Optional[int] = None
+    next_seq: int = 0
+    ended: bool = False
+    dropped: int = 0
+    failures: int = 0  # consecutive flushes that failed to write this call
+
+
+def _event_time(message: Dict[str, Any]) -> float:
+    """Epoch seconds of a server message (VAPI timestamps are epoch milliseconds)."""
+    timestamp = message.get("timestamp")
+    if isinstance(timestamp, (int, float)):
+        return timestamp / 1000
+    return time.time()
+
+
+def _segment(call: CallBuffer, segment_type: str, at: float, role: Optional[str] = None, text: Optional[str] = None) -> Dict[str, Any]:
+    """Build a segment in the format stored by the transcript endpoints."""
+    return {
+        "type": segment_type,
+        "role": role,
+        "text": text,
+        "timestamp": datetime.fromtimestamp(at, timezone.utc).isoformat().replace("+00:00", "Z"),
+        "secondsSinceStart": round(max(0.0, at - call.started_at), 3)
+    }
+
+
+class VapiEventPipeline:
+    """Buffers VAPI events per call and writes them in batches"""
+    
+    def __init__(self, flush_ms: float = VAPI_EVENT_FLUSH_MS, idle_seconds: float = VAPI_CALL_IDLE_SECONDS):
+        self.flush_interval = flush_ms / 1000
+        self.idle_seconds = idle_seconds
+        self._calls: Dict[str, CallBuffer] = {}
+        # Recently ended calls -> their transcript ID, to ignore events arriving after the end
+        self._ended_calls: LRUCache = LRUCache(maxsize=4096)
+        self._task: Optional[asyncio.Task] = None
+        self._stats = {
+            "events": 0,
+            "partials_collapsed": 0,
+            "ignored": 0,
+            "segments_written": 0,
+            "segments_dropped": 0,
+            "segments_lost": 0,
+            "calls_ended": 0,
+            "calls_timed_out": 0,
+            "calls_failed": 0,
+            "flushes": 0,
+            "flush_errors": 0,
+            "call_write_errors": 0,
+            "last_flush_ms": 0.0,
+            "max_flush_ms": 0.0
+        }
+    
+    async def start(self):
+        """Start the background flusher."""
+        self._task = asyncio.create_task(self._flush_loop(), name="vapi-event-flush")
+        print(f"✅ VAPI event pipeline started (flush every {self.flush_interval * 1000:.0f} ms)")
+    
+    async def stop(self):
+        """Stop the flusher and write what is still buffered."""
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        self.flush()
+    
+    def handle(self, message: Dict[str, Any]) -> bool:
+        """
+        Record one VAPI server message.
+        
+        Args:
+            message: The "message" object of a VAPI server request
+        
+        Returns:
+            True if the message belonged to a call and was recorded, False if it was ignored
+        """
+        self._stats["events"] += 1
+        call_id = (message.get("call") or {}).get("id") or message.get("callId")
+        if not call_id:
+            self._stats["ignored"] += 1
+            return False
+        
+        at = _event_time(message)
+        call = self._calls.get(call_id)
+        if call is None and call_id in self._ended_calls:
+            self._stats["ignored"] += 1
+            return False
+        if call is None:
+            call = CallBuffer(call_id=call_id, started_at=at, last_event_at=time.time())
+            self._calls[call_id] = call
+            self._push(call, _segment(call, "call-start", at))
+        elif call.ended:
+            self._stats["ignored"] += 1
+            return False
+        call.last_event_at = time.time()
+        
+        event_type = message.get("type")
+        if event_type == "transcript":
+            role = "user" if message.get("role") == "user" else "assistant"
+            text = message.get("transcript") or ""
+            if message.get("transcriptType", "final") == "partial":
+                if role in call.partials:
+                    self._stats["partials_collapsed"] += 1
+                call.partials[role] = (text, at)
+            else:
+                if role in call.partials:
+                    self._stats["partials_collapsed"] += 1
+                    del call.partials[role]
+                self._push(call, _segment(call, "transcript", at, role, text))
+        elif event_type == "speech-update":
+            role = "user" if message.get("role") == "user" else "assistant"
+            call.speaking[role] = message.get("status") == "started"
+        elif event_type == "end-of-call-report" or (event_type == "status-update" and message.get("status") == "ended"):
+            self._end(call, at)
+        elif event_type != "status-update":
+            self._stats["ignored"] += 1
+        
+        return True
+    
+    def _push(self, call: CallBuffer, segment: Dict[str, Any]):
+        if len(call.segments) == call.segments.maxlen:
+            if call.dropped == 0:
+                print(f"⚠️  VAPI call {call.call_id}: {call.segments.maxlen} segments waiting to be written, dropping the oldest")
+            call.dropped += 1
+            self._stats["segments_dropped"] += 1
+        call.segments.append(segment)
+    
+    def _end(self, call: CallBuffer, at: float):
+        # An utterance still in progress when the call ends is kept as it was last heard
+        for role, (text, heard_at) in sorted(call.partials.items(), key=lambda item: item[1][1]):
+            if text:
+                self._push(call, _segment(call, "transcript", heard_at, role, text))
+        call.partials.clear()
+        self._push(call, _segment(call, "call-end", at))
+        call.ended = True
+    
+    def flush(self) -> int:
+        """
+        Write the buffered segments of every call in one transaction.
+        
+        Each call is written under its own savepoint: a call that fails is rolled
+        back alone and keeps its segments for the next flush.
+        
+        Returns:
+            Number of segments written
+        """
+        self._end_idle_calls()
+        pending = [call for call in self._calls.values() if call.segments or call.ended]
+        if not pending:
+            return 0
+        
+        started = time.perf_counter()
+        # (call, transcript ID, segments stored, session closed by this flush, session still recording)
+        written_calls: List[Tuple[CallBuffer, int, int, bool, bool]] = []
+        failed_calls: List[Tuple[CallBuffer, Exception]] = []
+        try:
+            with database.get_connection() as conn:
+                if not conn.in_transaction:
+                    # Releasing the first savepoint would otherwise commit
+                    conn.execute("BEGIN")
+                # Helpers below share this transaction
+                for call in pending:
+                    conn.execute("SAVEPOINT vapi_call")
+                    try:
+                        transcript_id = call.transcript_id
+                        if transcript_id is None:
+                            transcript_id = database.open_transcript_session({"vapiCallId": call.call_id})
+                        stored, recording = len(call.segments), True
+                        if call.segments:
+                            result = database.append_transcript_segments(
+                                transcript_id,
+                                [(call.next_seq + index, segment) for index, segment in enumerate(call.segments)]
+                            )
+                            stored = result["inserted"] if result else 0
+                            recording = result is not None and result["rating_status"] == "recording"
+                        closed = bool(call.ended and database.close_transcript_session(transcript_id))
+                    except Exception as e:
+                        conn.execute("ROLLBACK TO vapi_call")
+                        failed_calls.append((call, e))
+                    else:
+                        written_calls.append((call, transcript_id, stored, closed, recording))
+                    conn.execute("RELEASE vapi_call")
+        except Exception as e:
+            self._stats["flush_errors"] += 1
+            print(f"⚠️  Failed to write VAPI events (kept for the next flush): {str(e)}")
+            return 0
+        
+        # Committed: release the buffers of the calls that were written
+        written = 0
+        for call, transcript_id, stored, closed, recording in written_calls:
+            call.transcript_id = transcript_id
+            call.failures = 0
+            lost = len(call.segments) - stored
+            call.next_seq += len(call.segments)
+            written += stored
+            call.segments.clear()
+            if lost:
+                # The session was closed (or deleted) elsewhere, e.g. by close_idle_transcript_sessions
+                self._stats["segments_lost"] += lost
+                print(f"⚠️  VAPI call {call.call_id}: {lost} segments not stored, transcript {transcript_id} is no longer recording")
+            if closed:
+                get_rating_queue().enqueue(transcript_id)
+            if call.ended or not recording:
+                self._retire(call)
+                self._stats["calls_ended"] += 1
+                if call.dropped:
+                    print(f"⚠️  VAPI call {call.call_id} ended with {call.dropped} segments dropped (transcript {transcript_id})")
+        
+        for call, error in failed_calls:
+            self._stats["call_write_errors"] += 1
+            call.failures += 1
+            if call.failures < VAPI_CALL_MAX_FLUSH_FAILURES:
+                print(f"⚠️  Failed to write VAPI call {call.call_id} (kept for the next flush): {str(error)}")
+                continue
+            # Its session, if one was opened, is closed by close_idle_transcript_sessions
+            self._retire(call)
+            self._stats["calls_failed"] += 1
+            self._stats["segments_lost"] += len(call.segments)
+            print(f"⚠️  Dropping VAPI call {call.call_id} after {call.failures} failed flushes, "
+                  f"{len(call.segments)} segments lost: {str(error)}")
+        
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        self._stats["flushes"] += 1
+        self._stats["segments_written"] += written
+        self._stats["last_flush_ms"] = round(elapsed_ms, 2)
+        self._stats["max_flush_ms"] = round(max(self._stats["max_flush_ms"], elapsed_ms), 2)
+        return written
+    
+    def _retire(self, call: CallBuffer):
+        # Later events for the call are ignored instead of starting a new transcript
+        del self._calls[call.call_id]
+        self._ended_calls[call.call_id] = call.transcript_id
+    
+    def _end_idle_calls(self):
+        # Calls whose end-of-call report never arrived; their transcripts are closed by this flush
+        cutoff = time.time() - self.idle_seconds
+        for call in self._calls.values():
+            if not call.ended and call.last_event_at < cutoff:
+                print(f"⏱️  VAPI call {call.call_id} idle for {self.idle_seconds:.0f}s, ending it")
+                self._end(call, call.last_event_at)
+                self._stats["calls_timed_out"] += 1
+    
+    async def _flush_loop(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"⚠️  Unexpected error flushing VAPI events: {str(e)}")
+    
+    def stats(self) -> Dict[str, Any]:
+        """Event, flush and buffer counters."""
+        return {
+            **self._stats,
+            "active_calls": len(self._calls),
+            "buffered_segments": sum(len(call.segments) for call in self._calls.values())
+        }
+
+
+# Singleton instance
+_event_pipeline: Optional[VapiEventPipeline] = None
+
+
+def get_event_pipeline() -> VapiEventPipeline:
+    """Get or create the VAPI event pipeline singleton"""
+    global _event_pipeline
+    if _event_pipeline is None:
+        _event_pipeline = VapiEventPipeline()
+    return _event_pipeline
@@ -29,9 +29,10 @@ interface TranscriptSegment {
   secondsSinceStart: number;
 }
 
+// Summary view of GET /api/transcripts (segments are not included)
 interface Transcript {
   id: number;
-  transcript: TranscriptSegment[];
+  transcript?: TranscriptSegment[];
   call_duration: number;
   user_messages: number;
   assistant_messages: number;
@@ -39,9 +40,24 @@ interface Transcript {
   created_at: string;
 }
 
+// GET /api/transcripts/stats (totals over every transcript, not just one page)
+interface TranscriptStats {
+  count: number;
+  total_duration: number;
+  average_duration: number;
+}
+
+// Recent sessions shown on the page; one more tells whether there are others
+const RECENT_SESSIONS = 5;
+
 export default function ProfilePage() {
   const router = useRouter();
   const [transcripts, setTranscripts] = useState<Transcript[]>([]);
+  const [stats, setStats] = useState<TranscriptStats>({
+    count: 0,
+    total_duration: 0,
+    average_duration: 0,
+  });
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState<string | null>(null);
 
@@ -52,12 +68,16 @@ export default function ProfilePage() {
   const fetchTranscripts = async () => {
     try {
       setLoading(true);
-      const response = await fetch(
-        "https://harvardapi.codestacx.com/api/transcripts",
-      );
-      if (!response.ok) throw new Error("Failed to fetch transcripts");
-      const data = await response.json();
-      setTranscripts(data);
+      const [response, statsResponse] = await Promise.all([
+        fetch(
+          `https://harvardapi.codestacx.com/api/transcripts?limit=${RECENT_SESSIONS + 1}`,
+        ),
+        fetch("https://harvardapi.codestacx.com/api/transcripts/stats"),
+      ]);
+      if (!response.ok || !statsResponse.ok)
+        throw new Error("Failed to fetch transcripts");
+      setTranscripts(await response.json());
+      setStats(await statsResponse.json());
       setError(null);
     } catch (err) {
       console.error("Error fetching transcripts:", err);
@@ -101,12 +121,8 @@ export default function ProfilePage() {
     return `${minutes}m`;
   };
 
-  const totalPracticeTime = transcripts.reduce(
-    (sum, t) => sum + t.call_duration,
-    0,
-  );
-  const avgSessionLength =
-    transcripts.length > 0 ? totalPracticeTime / transcripts.length : 0;
+  const totalPracticeTime = stats.total_duration;
+  const avgSessionLength = stats.average_duration;
 
   // Mock data for progress - in real app, this would be calculated from transcripts
   const weeklyProgress = [
@@ -149,7 +165,7 @@ export default function ProfilePage() {
                   {formatDuration(totalPracticeTime)}
                 </div>
                 <p className="text-xs text-muted-foreground mt-1">
-                  Across {transcripts.length} sessions
+                  Across {stats.count} sessions
                 </p>
               </CardContent>
             </Card>
@@ -276,7 +292,7 @@ export default function ProfilePage() {
               </Card>
             ) : (
               <div className="grid gap-4">
-                {transcripts.slice(0, 5).map((transcript) => (
+                {transcripts.slice(0, RECENT_SESSIONS).map((transcript) => (
                   <Card
                     key={transcript.id}
                     className="cursor-pointer hover:bg-muted/30 transition-colors"
@@ -311,7 +327,7 @@ export default function ProfilePage() {
                   </Card>
                 ))}
 
-                {transcripts.length > 5 && (
+                {transcripts.length > RECENT_SESSIONS && (
                   <Button variant="outline" className="w-full">
                     View All Sessions
                   </Button>
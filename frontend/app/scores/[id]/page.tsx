@@ -45,6 +45,7 @@ interface Transcript {
   metadata: Record<string, unknown>;
   created_at: string;
   ratings?: Rating | null;
+  rating_status?: "pending" | "complete" | "failed";
 }
 
 // Convert letter grade to numeric score with randomized range
@@ -108,6 +109,40 @@ export default function ScoreOverviewPage() {
     fetchTranscript();
   }, [transcriptId]);
 
+  // Ratings are generated in the background - poll until they are ready
+  const ratingPending = transcript?.rating_status === "pending";
+  const ratedTranscriptId = transcript?.id;
+
+  useEffect(() => {
+    if (!ratingPending || !ratedTranscriptId) return;
+
+    const interval = setInterval(async () => {
+      try {
+        const response = await fetch(
+          `https://harvardapi.codestacx.com/api/transcript/${ratedTranscriptId}/rating`,
+        );
+        if (!response.ok) return;
+
+        const data = await response.json();
+        if (data.rating_status !== "pending") {
+          setTranscript((prev) =>
+            prev
+              ? {
+                  ...prev,
+                  ratings: data.ratings,
+                  rating_status: data.rating_status,
+                }
+              : prev,
+          );
+        }
+      } catch (err) {
+        console.error("Error polling rating status:", err);
+      }
+    }, 3000);
+
+    return () => clearInterval(interval);
+  }, [ratingPending, ratedTranscriptId]);
+
   useEffect(() => {
     if (!transcriptId) return;
 
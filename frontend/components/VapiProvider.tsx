@@ -20,6 +20,10 @@ interface TranscriptSegment {
   secondsSinceStart: number;
 }
 
+interface SessionSegment extends TranscriptSegment {
+  seq: number;
+}
+
 interface VapiMessage {
   type: string;
   transcriptType?: string;
@@ -44,6 +48,11 @@ interface VapiContextType {
 
 const VapiContext = createContext<VapiContextType | undefined>(undefined);
 
+const API_BASE = "https://harvardapi.codestacx.com";
+
+// How often segments recorded during the call are sent to the backend
+const SEGMENT_FLUSH_INTERVAL_MS = 2000;
+
 export function VapiProvider({ children }: { children: ReactNode }) {
   const [vapi, setVapi] = useState<Vapi | null>(null);
   const [isCallActive, setIsCallActive] = useState(false);
@@ -54,6 +63,12 @@ export function VapiProvider({ children }: { children: ReactNode }) {
   const callMetadataRef = useRef<Record<string, unknown> | undefined>(
     undefined,
   );
+  // Transcript session on the backend (resolves to null if it could not be opened)
+  const sessionRef = useRef<Promise<number | null> | null>(null);
+  const nextSeqRef = useRef(0);
+  const pendingSegmentsRef = useRef<SessionSegment[]>([]);
+  const flushTimerRef = useRef<ReturnType<typeof setInterval> | null>(null);
+  const flushChainRef = useRef<Promise<void>>(Promise.resolve());
 
   // Function to upload transcript to backend
   const uploadTranscript = async (
@@ -63,7 +78,7 @@ export function VapiProvider({ children }: { children: ReactNode }) {
     try {
       console.log("Uploading transcript to backend...");
       const response = await fetch(
-        "https://harvardapi.codestacx.com/api/transcript",
+        `${API_BASE}/api/transcript`,
         {
           method: "POST",
           headers: {
@@ -89,6 +104,118 @@ export function VapiProvider({ children }: { children: ReactNode }) {
     }
   };
 
+  // Start a transcript session so segments are stored while the call runs
+  const openSession = async (
+    metadata?: Record<string, unknown>,
+  ): Promise<number | null> => {
+    try {
+      const response = await fetch(`${API_BASE}/api/transcript/session`, {
+        method: "POST",
+        headers: {
+          "Content-Type": "application/json",
+        },
+        body: JSON.stringify({ metadata: metadata || {} }),
+      });
+
+      if (!response.ok) {
+        throw new Error(`Failed to open session: ${response.statusText}`);
+      }
+
+      const result = await response.json();
+      console.log("🎙️ Transcript session opened:", result.transcript_id);
+      return result.transcript_id;
+    } catch (err) {
+      console.error("❌ Error opening transcript session:", err);
+      return null;
+    }
+  };
+
+  const queueSegment = (segment: TranscriptSegment) => {
+    pendingSegmentsRef.current.push({ ...segment, seq: nextSeqRef.current++ });
+  };
+
+  // Send buffered segments; failed batches are kept and resent (the backend ignores duplicates)
+  const sendPendingSegments = async (
+    session: Promise<number | null> | null,
+  ) => {
+    const transcriptId = session ? await session : null;
+    const batch = pendingSegmentsRef.current;
+    if (transcriptId === null || batch.length === 0) return;
+
+    pendingSegmentsRef.current = [];
+    try {
+      const response = await fetch(
+        `${API_BASE}/api/transcript/session/${transcriptId}/segments`,
+        {
+          method: "POST",
+          headers: {
+            "Content-Type": "application/json",
+          },
+          body: JSON.stringify({ segments: batch }),
+        },
+      );
+
+      if (!response.ok) {
+        throw new Error(`Failed to send segments: ${response.statusText}`);
+      }
+    } catch (err) {
+      console.error("❌ Error sending transcript segments:", err);
+      pendingSegmentsRef.current = [...batch, ...pendingSegmentsRef.current];
+    }
+  };
+
+  // Flushes run one at a time, so the session is never closed while a batch is in flight
+  const flushSegments = (session: Promise<number | null> | null) => {
+    const flush = flushChainRef.current.then(() =>
+      sendPendingSegments(session),
+    );
+    flushChainRef.current = flush;
+    return flush;
+  };
+
+  // Send the remaining segments and close the session, which queues the rating
+  const finishSession = async (
+    session: Promise<number | null> | null,
+    metadata: Record<string, unknown>,
+  ) => {
+    const transcriptId = session ? await session : null;
+    if (transcriptId === null) {
+      // No session - upload the whole transcript at once
+      const segments = pendingSegmentsRef.current;
+      pendingSegmentsRef.current = [];
+      await uploadTranscript(segments, metadata).catch(() => undefined);
+      return;
+    }
+
+    await flushSegments(session);
+    if (pendingSegmentsRef.current.length > 0) {
+      await flushSegments(session);
+    }
+
+    try {
+      const response = await fetch(
+        `${API_BASE}/api/transcript/session/${transcriptId}/close`,
+        {
+          method: "POST",
+          headers: {
+            "Content-Type": "application/json",
+          },
+          body: JSON.stringify({ metadata }),
+        },
+      );
+
+      if (!response.ok) {
+        throw new Error(`Failed to close session: ${response.statusText}`);
+      }
+
+      const result = await response.json();
+      console.log("✅ Transcript session closed:", result);
+    } catch (err) {
+      // The backend closes idle sessions by itself, so the interview is still rated
+      console.error("❌ Error closing transcript session:", err);
+    }
+  };
+
   // Initialize Vapi instance on mount
   useEffect(() => {
     const vapiInstance = new Vapi(
@@ -103,13 +230,22 @@ export function VapiProvider({ children }: { children: ReactNode }) {
       callStartTimeRef.current = now;
       setIsCallActive(true);
       setError(null);
-      setTranscript([
-        {
-          type: "call-start",
-          timestamp: new Date(now).toISOString(),
-          secondsSinceStart: 0,
-        },
-      ]);
+      const startSegment: TranscriptSegment = {
+        type: "call-start",
+        timestamp: new Date(now).toISOString(),
+        secondsSinceStart: 0,
+      };
+      setTranscript([startSegment]);
+
+      nextSeqRef.current = 0;
+      pendingSegmentsRef.current = [];
+      queueSegment(startSegment);
+      const session = openSession(callMetadataRef.current);
+      sessionRef.current = session;
+      flushTimerRef.current = setInterval(
+        () => flushSegments(session),
+        SEGMENT_FLUSH_INTERVAL_MS,
+      );
     });
 
     vapiInstance.on("call-end", () => {
@@ -118,30 +254,34 @@ export function VapiProvider({ children }: { children: ReactNode }) {
       const secondsSinceStart = callStartTimeRef.current
         ? (now - callStartTimeRef.current) / 1000
         : 0;
+      const endSegment: TranscriptSegment = {
+        type: "call-end",
+        timestamp: new Date(now).toISOString(),
+        secondsSinceStart,
+      };
       setTranscript((prev) => {
-        const finalTranscript: TranscriptSegment[] = [
-          ...prev,
-          {
-            type: "call-end" as const,
-            timestamp: new Date(now).toISOString(),
-            secondsSinceStart,
-          },
-        ];
+        const finalTranscript: TranscriptSegment[] = [...prev, endSegment];
         // Print the complete transcript to console
         console.log(
           "📝 Call Transcript:",
           JSON.stringify(finalTranscript, null, 2),
         );
-
-        // Upload transcript to backend with duration in metadata
-        const metadataWithDuration = {
-          ...callMetadataRef.current,
-          duration: secondsSinceStart,
-        };
-        uploadTranscript(finalTranscript, metadataWithDuration);
-
         return finalTranscript;
       });
+
+      // Send the rest of the transcript and close the session, with duration in metadata
+      if (flushTimerRef.current) {
+        clearInterval(flushTimerRef.current);
+        flushTimerRef.current = null;
+      }
+      queueSegment(endSegment);
+      const metadataWithDuration = {
+        ...callMetadataRef.current,
+        duration: secondsSinceStart,
+      };
+      finishSession(sessionRef.current, metadataWithDuration);
+      sessionRef.current = null;
+
       setIsCallActive(false);
       callStartTimeRef.current = null;
       callMetadataRef.current = undefined;
@@ -180,11 +320,15 @@ export function VapiProvider({ children }: { children: ReactNode }) {
         };
 
         setTranscript((prev) => [...prev, segment]);
+        queueSegment(segment);
       }
     });
 
     // Cleanup on unmount
     return () => {
+      if (flushTimerRef.current) {
+        clearInterval(flushTimerRef.current);
+      }
       vapiInstance.stop();
     };
   }, []);